@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Throughput of the user provisioning: create_user in a loop and create_users.
+
+The users are created against the local stand-in Keyrock with a configurable
+latency, first one at a time and then with IDMManager.create_users and an
+increasing number of workers; the time needed to import 50k users is
+extrapolated from the measured rate.
+
+Usage:
+    python benchmarks/bench_bulk_users.py [-u USERS] [-l LATENCY]
+"""
+
+import argparse
+import time
+
+from keyrock import IDMManager
+from standin import StandInServer
+
+
+def _users(prefix, count):
+    for _i in range(count):
+        yield (f"{prefix}_{_i}@example.com", 'password', f"{prefix} {_i}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-u', '--users', type=int, default=1000)
+    parser.add_argument('-l', '--latency', type=float, default=0.02,
+                        help='stand-in server latency in seconds')
+    parser.add_argument('-w', '--workers', type=int, nargs='+',
+                        default=[4, 16, 32])
+    args = parser.parse_args()
+
+    print(f"{'mode':<16}{'users/s':>10}{'failed':>8}{'50k users':>12}")
+    with StandInServer(args.latency) as _server:
+        _token = _server.token()
+        for _workers in [1] + args.workers:
+            _im = IDMManager(_server.host, _server.port, _token,
+                             pool_maxsize=_workers)
+            _items = _users(f"bench_{_workers}", args.users)
+            _start = time.perf_counter()
+            if _workers == 1:
+                _mode = 'create_user'
+                _failed = 0
+                for _item in _items:
+                    _im.create_user(*_item)
+            else:
+                _mode = f"{_workers} workers"
+                _failed = sum(1 for _r in _im.create_users(_items, _workers)
+                              if not _r.ok)
+            _rate = args.users / (time.perf_counter() - _start)
+            _im.close()
+            print(f"{_mode:<16}{_rate:>10.0f}{_failed:>8}"
+                  f"{50000 / _rate / 60:>10.1f} m")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Decoding time of large /v1/users responses.
+
+It compares requests' Response.json(), the previous way of decoding the
+responses, with keyrock.codec.decode_response using the standard library
+and, if installed, orjson. No IDM instance is needed: the responses are built
+in memory from the stand-in server listing.
+
+Usage:
+    python benchmarks/bench_codec.py [-u USERS ...] [-r REPEAT]
+"""
+
+import argparse
+import time
+
+import requests
+
+from keyrock.codec import JSONCodec, OrjsonCodec, decode_response, orjson
+from standin import users_body
+
+
+def _make_response(content: bytes):
+    _response = requests.Response()
+    _response.status_code = 200
+    _response._content = content
+    return _response
+
+
+def _best(func, content: bytes, repeat: int):
+    _best = None
+    for _ in range(repeat):
+        # a new response each time, the decoded body is memoized
+        _response = _make_response(content)
+        _start = time.perf_counter()
+        func(_response)
+        _elapsed = time.perf_counter() - _start
+        _best = _elapsed if _best is None else min(_best, _elapsed)
+    return _best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-u', '--users', type=int, nargs='+',
+                        default=[10000, 100000])
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    _decoders = [
+        ('Response.json', lambda _r: _r.json()),
+        ('json', lambda _r: decode_response(_r, JSONCodec()))
+    ]
+    if orjson is not None:
+        _decoders.append(
+            ('orjson', lambda _r: decode_response(_r, OrjsonCodec())))
+
+    print(f"{'users':>8}  {'MiB':>6}  {'decoder':<15}{'ms':>10}")
+    for _users in args.users:
+        _content = users_body(_users)
+        for _name, _decode in _decoders:
+            _elapsed = _best(_decode, _content, args.repeat)
+            print(f"{_users:>8}  {len(_content) / 2**20:>6.1f}  "
+                  f"{_name:<15}{_elapsed * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
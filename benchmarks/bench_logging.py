@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Micro-benchmark of the per-call cost of IDMManager._log_response.
+
+It compares the current implementation with the previous one, based on
+inspect.stack(), both with the logger disabled (the package default) and
+enabled. No IDM instance is needed: the responses are built in memory.
+
+Usage:
+    python benchmarks/bench_logging.py [-n NUMBER]
+"""
+
+import argparse
+import inspect
+import logging
+import timeit
+from http.client import responses
+from types import SimpleNamespace
+
+import requests
+
+from keyrock import IDMManager
+
+
+def _make_response(status_code, content):
+    _response = requests.Response()
+    _response.status_code = status_code
+    _response._content = content
+    _response.raw = SimpleNamespace(version=11)
+    _response.request = requests.Request(
+        'GET', 'http://localhost:3005/v1/users').prepare()
+    return _response
+
+
+def _legacy_log_response(self, response):
+    # The implementation replaced by the operation-name based logging.
+    _func_name = inspect.stack()[1].function
+    _http_ver = ('HTTP/1.1' if
+                 response.raw.version == 11 else 'HTTP/1.0')
+    _level = logging.DEBUG if response.status_code < 400 else logging.ERROR
+
+    if response.status_code < 400:
+        _reason = ""
+    elif 'error' in response.json():
+        _reason = f"\"{response.json()['error']['message']}\""
+    else:
+        _reason = f"\"{response.json()}\""
+
+    self._logger.log(
+        _level,
+        (f'{_func_name}() - '
+         f'{self._idm_url} "{response.request.method} '
+         f'{response.request.path_url} {_http_ver}" '
+         f'{response.status_code} "{responses[response.status_code]}": '
+         f'{_reason}'))
+
+
+def list_users(im, response):
+    _legacy_log_response(im, response)
+
+
+def _time(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--number', type=int, default=2000,
+                        help='calls per measurement (default: 2000)')
+    args = parser.parse_args()
+
+    im = IDMManager('localhost', 3005, 'token')
+    logger = logging.getLogger('keyrock.IDMManager')
+    ok = _make_response(200, b'{"users": []}')
+    ko = _make_response(
+        404, b'{"error": {"message": "User not found", "code": 404}}')
+
+    # The enabled case formats every message but discards it.
+    handlers, logger.handlers = logger.handlers, [logging.NullHandler()]
+    logger.propagate = False
+
+    print(f"{'case':<32}{'legacy ns/call':>16}{'current ns/call':>16}")
+    for _level_name, _level in (('disabled', logging.CRITICAL),
+                                ('enabled', logging.DEBUG)):
+        logger.setLevel(_level)
+        for _name, _response in (('200', ok), ('404', ko)):
+            _legacy = _time(lambda: list_users(im, _response), args.number)
+            _current = _time(
+                lambda: im._log_response('list_users', _response),
+                args.number)
+            print(f"{_level_name + ' / ' + _name:<32}"
+                  f"{_legacy:>16.0f}{_current:>16.0f}")
+    logger.handlers = handlers
+    logger.propagate = True
+    logger.setLevel(logging.CRITICAL)
+    im.close()
+
+
+if __name__ == '__main__':
+    main()
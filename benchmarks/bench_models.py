@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Memory retained by a listing of IDMUser objects, cost of lazy models.
+
+A users listing is decoded from JSON and turned into IDMUser objects; the
+memory still allocated once only the objects are referenced is measured with
+tracemalloc for the previous model layout (a per-instance __dict__ plus the
+source dictionary), the __slots__ layout keeping the source dictionary and
+the __slots__ layout without it (IDMManager(..., keep_dicts=False)).
+
+The time needed to build a permissions listing and read the id of each
+permission is measured for the eager and the lazy
+(IDMManager(..., lazy_models=True)) models.
+
+Usage:
+    python benchmarks/bench_models.py [-u USERS ...]
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from keyrock.models import IDMPermission, IDMUser, LazyIDMPermission
+
+
+class LegacyIDMUser(object):
+    """The IDMUser layout before the move to __slots__."""
+    def __init__(self, user_email: str = None, user_dict: dict = None):
+        self._user_email = user_email or user_dict['email']
+        self._user_dict = user_dict
+        self._user_id = user_dict.get('id', None)
+        self._user_name = user_dict.get('username', None)
+        self._user_enabled = user_dict.get('enabled', False)
+        self._user_gravatar = user_dict.get('gravatar', None)
+        self._user_website = user_dict.get('website', None)
+        self._user_expiration = user_dict.get('date_password', None)
+        self._user_description = user_dict.get('description', None)
+
+
+def users_body(count: int):
+    """Returns a users listing as the IDM would serve it."""
+    return json.dumps({'users': [
+        {
+            'id': f'{_i:08x}-0000-4000-8000-000000000000',
+            'username': f'user{_i}',
+            'email': f'user{_i}@test.com',
+            'enabled': True,
+            'gravatar': False,
+            'date_password': '2021-06-01T10:00:00.000Z',
+            'description': None,
+            'website': None
+        } for _i in range(count)]}).encode()
+
+
+def permissions(count: int):
+    """Returns the permissions of a permissions listing."""
+    return [{
+        'id': f'{_i:08x}-0000-4000-8000-000000000000',
+        'name': f'permission {_i}',
+        'description': None,
+        'action': 'GET',
+        'resource': f'/resource/{_i}',
+        'is_regex': False,
+        'xml': None
+    } for _i in range(count)]
+
+
+def _build_time(rows: list, build, repeat: int = 5):
+    _best = None
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        for _row in rows:
+            build(_row).id
+        _elapsed = time.perf_counter() - _start
+        _best = _elapsed if _best is None else min(_best, _elapsed)
+    return _best
+
+
+def _retained(body: bytes, build):
+    gc.collect()
+    tracemalloc.start()
+    _users = [build(_user) for _user in json.loads(body)['users']]
+    gc.collect()
+    _current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del _users
+    return _current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-u', '--users', type=int, nargs='+',
+                        default=[100000])
+    parser.add_argument('-p', '--permissions', type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{'users':>8}  {'layout':<22}{'MiB':>8}{'bytes/user':>12}")
+    for _users in args.users:
+        _body = users_body(_users)
+        for _name, _build in (
+                ('legacy', lambda _d: LegacyIDMUser(user_dict=_d)),
+                ('slots, keep_dict', lambda _d: IDMUser(user_dict=_d)),
+                ('slots, no dict',
+                 lambda _d: IDMUser(user_dict=_d, keep_dict=False))):
+            _bytes = _retained(_body, _build)
+            print(f"{_users:>8}  {_name:<22}{_bytes / 2**20:>8.1f}"
+                  f"{_bytes / _users:>12.0f}")
+
+    _rows = permissions(args.permissions)
+    print(f"\n{'permissions':>11}  {'models':<10}{'ms (id only)':>14}")
+    for _name, _build in (
+            ('eager', lambda _d: IDMPermission(permission_dict=_d,
+                                               application_id='app')),
+            ('lazy', lambda _d: LazyIDMPermission(_d, 'app'))):
+        _elapsed = _build_time(_rows, _build)
+        print(f"{len(_rows):>11}  {_name:<10}{_elapsed * 1000:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
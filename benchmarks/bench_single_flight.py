@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Throughput of concurrent identical reads with and without single-flight.
+
+A pool of worker threads shares one IDMManager and calls get_application,
+list_roles and check_auth_token on a few hot applications and tokens, as
+threaded web workers do, against the local stand-in Keyrock with a
+configurable latency.
+
+Usage:
+    python benchmarks/bench_single_flight.py [-c CALLS] [-t THREADS]
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+from keyrock import IDMManager, SingleFlight
+from keyrock.idm import check_auth_token
+from standin import StandInServer
+
+
+def _run(server, token, subj_tokens, apps, calls, threads, single_flight):
+    _im = IDMManager(server.host, server.port, token, pool_maxsize=threads,
+                     single_flight=single_flight)
+    _rnd = random.Random(42)
+    _sequence = [(_rnd.randrange(3), _rnd.choice(apps),
+                  _rnd.choice(subj_tokens)) for _ in range(calls)]
+
+    def _call(args):
+        _kind, _app, _subj_token = args
+        if _kind == 0:
+            _im.get_application(_app)
+        elif _kind == 1:
+            _im.list_roles(_app)
+        else:
+            check_auth_token(server.host, server.port, token, _subj_token,
+                             session=_im.session,
+                             single_flight=single_flight)
+
+    _start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as _executor:
+        list(_executor.map(_call, _sequence))
+    _elapsed = time.perf_counter() - _start
+    _im.close()
+    return _elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-c', '--calls', type=int, default=3000)
+    parser.add_argument('-t', '--threads', type=int, default=64)
+    parser.add_argument('-k', '--keys', type=int, default=4,
+                        help='number of hot applications and tokens')
+    parser.add_argument('-l', '--latency', type=float, default=0.02,
+                        help='stand-in server latency in seconds')
+    args = parser.parse_args()
+
+    print(f"{'mode':<16}{'calls/s':>12}{'IDM requests':>16}{'coalesced':>12}")
+    with StandInServer(args.latency, applications=args.keys,
+                       roles=20) as _server:
+        _token = _server.token()
+        _subj_tokens = [_server.token() for _ in range(args.keys)]
+        _apps = _server.seeded['applications']
+        for _mode in ('no coalescing', 'single-flight'):
+            _flights = SingleFlight() if _mode == 'single-flight' else None
+            _server.reset_requests()
+            _elapsed = _run(_server, _token, _subj_tokens, _apps, args.calls,
+                            args.threads, _flights)
+            _coalesced = _flights.stats['coalesced'] if _flights else 0
+            print(f"{_mode:<16}{args.calls / _elapsed:>12.0f}"
+                  f"{_server.requests:>16}{_coalesced:>12}")
+
+
+if __name__ == '__main__':
+    main()
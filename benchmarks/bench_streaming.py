@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Peak memory of list_users compared with iter_users and UserTable.
+
+The users are served by the local stand-in server; the peak of the memory
+allocated while walking the whole listing is measured with tracemalloc.
+
+Usage:
+    python benchmarks/bench_streaming.py [-u USERS ...]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from keyrock import IDMManager
+from standin import StandInServer
+
+
+def _measure(func):
+    tracemalloc.start()
+    _start = time.perf_counter()
+    _count = func()
+    _elapsed = time.perf_counter() - _start
+    _, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _count, _elapsed, _peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-u', '--users', type=int, nargs='+',
+                        default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'users':>8}  {'method':<12}{'peak MiB':>10}{'seconds':>10}")
+    for _users in args.users:
+        with StandInServer(users=_users) as _server:
+            _im = IDMManager(_server.host, _server.port, _server.token())
+            for _name, _func in (
+                    ('list_users', lambda: len(_im.list_users())),
+                    ('iter_users', lambda: sum(1 for _ in _im.iter_users())),
+                    ('as_table',
+                     lambda: len(_im.list_users(as_table=True)))):
+                _count, _elapsed, _peak = _measure(_func)
+                # the admin user is listed too
+                assert _count == _users + 1
+                print(f"{_users:>8}  {_name:<12}{_peak / 2**20:>10.1f}"
+                      f"{_elapsed:>10.2f}")
+            _im.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Latency, throughput and memory of the IDMManager hot paths.
+
+For each number of users, the stand-in Keyrock is seeded with that many
+users and with APPLICATIONS applications of ROLES roles each; every
+operation is then measured in a fresh process, which reports the latency
+percentiles and the throughput of ITERATIONS sequential calls, the peak of
+the memory allocated by a call (tracemalloc) and the peak RSS of the process.
+
+The results can be saved as a JSON baseline and compared with a previous
+one: the run fails (exit status 1) when the median latency of an operation
+grows by more than THRESHOLD.
+
+Usage:
+    python benchmarks/bench_suite.py [-u USERS ...] [-o OPERATION ...]
+        [--save FILE] [--compare FILE] [--threshold THRESHOLD]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import itertools
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from keyrock import IDMManager, IDMQuery
+from keyrock.idm import check_auth_token
+from standin import StandInServer
+
+ALLOC_SAMPLES = 3
+
+
+class _Context(object):
+    def __init__(self, host, port, token, applications, roles):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.applications = applications
+        self.roles = roles
+        self.im = IDMManager(host, port, token)
+        self._users = None
+
+    @property
+    def users(self):
+        # a sample of the seeded users, read once before the measures
+        if self._users is None:
+            self._users = [
+                _u for _u in itertools.islice(self.im.iter_users(), 1001)
+                if _u.id != 'admin'][:1000]
+        return self._users
+
+
+def _list_users(ctx):
+    return lambda _i: ctx.im.list_users()
+
+
+def _iter_users(ctx):
+    return lambda _i: sum(1 for _ in ctx.im.iter_users())
+
+
+def _get_user(ctx):
+    _ids = [_u.id for _u in ctx.users]
+    return lambda _i: ctx.im.get_user(_ids[_i % len(_ids)])
+
+
+def _get_user_by_login(ctx):
+    _logins = [_u.login for _u in ctx.users]
+    return lambda _i: ctx.im.get_user(_logins[_i % len(_logins)],
+                                      IDMQuery.BY_LOGIN)
+
+
+def _check_auth_token(ctx):
+    return lambda _i: check_auth_token(ctx.host, ctx.port, ctx.token,
+                                       ctx.token, session=ctx.im.session)
+
+
+def _authorize_user(ctx):
+    _users = [_u.id for _u in ctx.users]
+
+    def _call(index):
+        _app = ctx.applications[index % len(ctx.applications)]
+        _roles = ctx.roles[_app]
+        ctx.im.authorize_user(_app, _roles[index % len(_roles)],
+                              _users[index % len(_users)])
+    return _call
+
+
+def _list_roles(ctx):
+    return lambda _i: ctx.im.list_roles(
+        ctx.applications[_i % len(ctx.applications)])
+
+
+def _list_application_users(ctx):
+    return lambda _i: ctx.im.list_application_users(
+        ctx.applications[_i % len(ctx.applications)])
+
+
+# name: (setup, whether the cost of a call grows with the number of users)
+OPERATIONS = {
+    'list_users': (_list_users, True),
+    'iter_users': (_iter_users, True),
+    'get_user': (_get_user, False),
+    'get_user_by_login': (_get_user_by_login, True),
+    'check_auth_token': (_check_auth_token, False),
+    'authorize_user': (_authorize_user, False),
+    'list_roles': (_list_roles, False),
+    'list_application_users': (_list_application_users, False)
+}
+
+
+def _percentile(values, percent):
+    # nearest rank on sorted values
+    _index = max(0, min(len(values) - 1,
+                        round(percent / 100 * len(values) + 0.5) - 1))
+    return values[_index]
+
+
+def _peak_rss_mib():
+    if resource is None:
+        return None
+    _rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return _rss / (2**20 if sys.platform == 'darwin' else 2**10)
+
+
+def _run_operation(operation, host, port, token, applications, roles,
+                   iterations):
+    # Runs in a child process.
+    _ctx = _Context(host, port, token, applications, roles)
+    _call = OPERATIONS[operation][0](_ctx)
+    _counter = itertools.count()
+
+    # warm up the connection pool and the lazy imports
+    _call(next(_counter))
+
+    _latencies = list()
+    _start = time.perf_counter()
+    for _ in range(iterations):
+        _t = time.perf_counter()
+        _call(next(_counter))
+        _latencies.append(time.perf_counter() - _t)
+    _elapsed = time.perf_counter() - _start
+    _rss = _peak_rss_mib()
+
+    _allocs = list()
+    for _ in range(min(ALLOC_SAMPLES, iterations)):
+        tracemalloc.start()
+        _call(next(_counter))
+        _allocs.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    _ctx.im.close()
+
+    _latencies.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': 1000 * _elapsed / iterations,
+        'p50_ms': 1000 * _percentile(_latencies, 50),
+        'p90_ms': 1000 * _percentile(_latencies, 90),
+        'p99_ms': 1000 * _percentile(_latencies, 99),
+        'ops_per_s': iterations / _elapsed,
+        'alloc_peak_kib': sorted(_allocs)[len(_allocs) // 2] / 2**10,
+        'peak_rss_mib': _rss
+    }
+
+
+def run(users, operations, applications, roles, iterations,
+        listing_iterations, latency):
+    """Runs the benchmarks and returns the results by 'operation@users'."""
+    _results = dict()
+    _context = multiprocessing.get_context('spawn')
+    print(f"{'operation':<24}{'users':>8}{'p50 ms':>10}{'p90 ms':>10}"
+          f"{'p99 ms':>10}{'ops/s':>10}{'alloc KiB':>11}{'RSS MiB':>9}")
+    for _users in users:
+        with StandInServer(latency, users=_users, applications=applications,
+                           roles=roles) as _server:
+            _token = _server.token()
+            _apps = _server.seeded['applications']
+            _roles = _server.seeded['roles']
+            for _operation in operations:
+                _iterations = (listing_iterations
+                               if OPERATIONS[_operation][1] else iterations)
+                with ProcessPoolExecutor(1, mp_context=_context) as _pool:
+                    _result = _pool.submit(
+                        _run_operation, _operation, _server.host,
+                        _server.port, _token, _apps, _roles,
+                        _iterations).result()
+                _result['users'] = _users
+                _results[f"{_operation}@{_users}"] = _result
+                print(f"{_operation:<24}{_users:>8}{_result['p50_ms']:>10.2f}"
+                      f"{_result['p90_ms']:>10.2f}{_result['p99_ms']:>10.2f}"
+                      f"{_result['ops_per_s']:>10.1f}"
+                      f"{_result['alloc_peak_kib']:>11.1f}"
+                      f"{_result['peak_rss_mib'] or 0:>9.1f}")
+    return _results
+
+
+def compare(results, baseline, threshold, metric='p50_ms'):
+    """
+    Prints the change of 'metric' against 'baseline' and returns the names
+    of the operations that grew by more than 'threshold' (a fraction).
+    """
+    _regressions = list()
+    print(f"\n{'operation':<32}{'baseline':>10}{'current':>10}{'change':>9}")
+    for _name, _result in results.items():
+        _base = baseline.get(_name)
+        if _base is None or not _base.get(metric):
+            continue
+        _change = _result[metric] / _base[metric] - 1
+        _flag = ''
+        if _change > threshold:
+            _regressions.append(_name)
+            _flag = '  REGRESSION'
+        print(f"{_name:<32}{_base[metric]:>10.2f}{_result[metric]:>10.2f}"
+              f"{_change:>+9.0%}{_flag}")
+    return _regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-u', '--users', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('-o', '--operations', nargs='+',
+                        choices=list(OPERATIONS), default=list(OPERATIONS))
+    parser.add_argument('-a', '--applications', type=int, default=100)
+    parser.add_argument('-r', '--roles', type=int, default=50,
+                        help='roles of each application')
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('--listing-iterations', type=int, default=10,
+                        help='iterations of the operations whose cost grows '
+                             'with the number of users')
+    parser.add_argument('-l', '--latency', type=float, default=0.0,
+                        help='stand-in server latency in seconds')
+    parser.add_argument('--save', metavar='FILE',
+                        help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='maximum allowed growth of the median latency '
+                             '(default: 0.25)')
+    args = parser.parse_args()
+
+    _results = run(args.users, args.operations, args.applications,
+                   args.roles, args.iterations, args.listing_iterations,
+                   args.latency)
+
+    if args.save:
+        with open(args.save, 'w') as _file:
+            json.dump({
+                'created': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': _results
+            }, _file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as _file:
+            _baseline = json.load(_file)['results']
+        _regressions = compare(_results, _baseline, args.threshold)
+        if _regressions:
+            print(f"\n{len(_regressions)} regression(s) above "
+                  f"{args.threshold:.0%}: {', '.join(_regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
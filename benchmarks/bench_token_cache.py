@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Throughput of check_auth_token with and without an IDMTokenCache.
+
+A pool of worker threads validates subject tokens drawn from a small set (a
+tenth of them invalid) against the local stand-in Keyrock, with a
+configurable latency.
+
+Usage:
+    python benchmarks/bench_token_cache.py [-c CALLS] [-t THREADS]
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+from requests.exceptions import HTTPError
+
+from keyrock import IDMTokenCache, create_session, check_auth_token
+from standin import StandInServer
+
+
+def _run(port, auth_token, tokens, calls, threads, cache):
+    _session = create_session(pool_maxsize=threads)
+    _rnd = random.Random(42)
+    _sequence = [_rnd.choice(tokens) for _ in range(calls)]
+
+    def _check(subj_token):
+        try:
+            return check_auth_token('127.0.0.1', port, auth_token,
+                                    subj_token, session=_session,
+                                    cache=cache)
+        except HTTPError:
+            return (False, False)
+
+    _start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as _executor:
+        list(_executor.map(_check, _sequence))
+    _elapsed = time.perf_counter() - _start
+    _session.close()
+    return _elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-c', '--calls', type=int, default=5000)
+    parser.add_argument('-t', '--threads', type=int, default=16)
+    parser.add_argument('-k', '--tokens', type=int, default=200,
+                        help='number of distinct subject tokens')
+    parser.add_argument('-l', '--latency', type=float, default=0.002,
+                        help='stand-in server latency in seconds')
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'calls/s':>12}{'IDM requests':>16}")
+    with StandInServer(args.latency) as _server:
+        _auth_token = _server.token()
+        _tokens = [_server.token() if _i % 10 else f"invalid-{_i}"
+                   for _i in range(args.tokens)]
+        for _mode in ('no cache', 'cache'):
+            _cache = IDMTokenCache() if _mode == 'cache' else None
+            _server.reset_requests()
+            _elapsed = _run(_server.port, _auth_token, _tokens, args.calls,
+                            args.threads, _cache)
+            print(f"{_mode:<12}{args.calls / _elapsed:>12.0f}"
+                  f"{_server.requests:>16}")
+            if _cache is not None:
+                print(f"cache stats: {_cache.stats}")
+
+
+if __name__ == '__main__':
+    main()
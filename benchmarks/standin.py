@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+The local stand-in Keyrock used by the benchmarks: the fake IDM of
+keyrock.testing, seeded with a generated dataset and run in a separate
+process, so that neither its memory nor its share of the GIL is charged to
+the measured client.
+"""
+
+import json
+import multiprocessing
+
+from keyrock import get_auth_token
+from keyrock.testing import FakeKeyrock
+
+ADMIN_EMAIL = 'admin@test.com'
+ADMIN_PASSWORD = '1234'
+
+
+def users_body(count: int):
+    """Returns the encoded /v1/users listing with 'count' users."""
+    _users = [{
+        "id": f"{_i:08x}-0000-4000-8000-000000000000",
+        "username": f"user {_i}",
+        "email": f"user_{_i}@example.com",
+        "enabled": _i % 17 != 0,
+        "gravatar": False,
+        "date_password": "2021-06-01T10:00:00.000Z",
+        "description": f"Description of the user number {_i}",
+        "website": None
+    } for _i in range(count)]
+    return json.dumps({"users": _users}).encode()
+
+
+def _serve(conn, latency, seed):
+    _fake = FakeKeyrock(latency=latency).start()
+    conn.send((_fake.port, _fake.seed(**seed)))
+    while True:
+        _command = conn.recv()
+        if _command == 'requests':
+            conn.send(_fake.request_count)
+        elif _command == 'reset':
+            _fake.reset_stats()
+            conn.send(None)
+        else:
+            break
+    _fake.stop()
+
+
+class StandInServer(object):
+    """
+    Runs the fake Keyrock on a random local port in a child process.
+
+    Args:
+        latency: the number of seconds each request takes.
+        users: the number of generated users (plus the admin user).
+        applications: the number of generated applications.
+        roles: the number of generated roles of each application.
+        permissions: the number of generated permissions of each
+            application.
+    """
+    host = '127.0.0.1'
+
+    def __init__(self, latency: float = 0.0, users: int = 0,
+                 applications: int = 0, roles: int = 0,
+                 permissions: int = 0):
+        self._latency = latency
+        self._seed = dict(users=users, applications=applications,
+                          roles=roles, permissions=permissions)
+        self._conn = None
+        self._process = None
+        self.port = None
+        self.seeded = None
+
+    def token(self):
+        """Returns a new admin token."""
+        _token, _ = get_auth_token(self.host, self.port, ADMIN_EMAIL,
+                                   ADMIN_PASSWORD)
+        return _token
+
+    @property
+    def requests(self):
+        """Gets the number of requests served."""
+        self._conn.send('requests')
+        return self._conn.recv()
+
+    def reset_requests(self):
+        """Resets the number of requests served."""
+        self._conn.send('reset')
+        self._conn.recv()
+
+    def __enter__(self):
+        _context = multiprocessing.get_context('spawn')
+        self._conn, _child = _context.Pipe()
+        self._process = _context.Process(
+            target=_serve, args=(_child, self._latency, self._seed),
+            daemon=True)
+        self._process.start()
+        self.port, self.seeded = self._conn.recv()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._conn.send('stop')
+        self._process.join()
+        self._conn.close()
@@ -17,12 +17,61 @@
 .. module:: keyrock
 """
 
-from .idm import IDMManager, IDMQuery
-from .idm import get_auth_token, check_auth_token
-from .models import IDMApplication
+import importlib
+import logging
+import typing
+
 from .version import version
 
-import logging
+# The public names are imported from their modules on first access, so that
+# 'import keyrock' does not load requests, aiohttp and dateutil.
+_LAZY_NAMES = {
+    'AsyncIDMManager': '.aio',
+    'BulkOperation': '.bulk',
+    'IDMCache': '.cache',
+    'IDMOAuth2TokenCache': '.cache',
+    'IDMTokenCache': '.cache',
+    'IDMCredentials': '.credentials',
+    'IDMManager': '.idm',
+    'IDMMetrics': '.metrics',
+    'IDMQuery': '.idm',
+    'get_auth_token': '.idm',
+    'check_auth_token': '.idm',
+    'create_session': '.idm',
+    'IDMApplication': '.models',
+    'CircuitBreaker': '.retry',
+    'RetryPolicy': '.retry',
+    'SingleFlight': '.singleflight',
+    'UserTable': '.table'
+}
+
+__all__ = list(_LAZY_NAMES) + ['version']
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from .aio import AsyncIDMManager
+    from .bulk import BulkOperation
+    from .cache import IDMCache, IDMOAuth2TokenCache, IDMTokenCache
+    from .credentials import IDMCredentials
+    from .idm import IDMManager, IDMQuery
+    from .idm import get_auth_token, check_auth_token, create_session
+    from .metrics import IDMMetrics
+    from .models import IDMApplication
+    from .retry import CircuitBreaker, RetryPolicy
+    from .singleflight import SingleFlight
+    from .table import UserTable
+
+
+def __getattr__(name):
+    _module = _LAZY_NAMES.get(name)
+    if _module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    _value = getattr(importlib.import_module(_module, __name__), name)
+    globals()[name] = _value
+    return _value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
 
 
 __version__ = version
@@ -0,0 +1,956 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.aio
+
+Asyncio version of the IDMManager. It requires the optional 'aiohttp'
+dependency (pip install pykeyrock[async]).
+"""
+
+from .codec import JSONCodec, decode_response, get_codec
+from .hooks import IDMCall, IDMHooks
+from .idm import IDMQuery
+from .metrics import IDMMetrics
+from .models import IDMApplication, IDMOrganization, IDMProxy, IDMUser, IDMRole
+from .models import IDMPermission
+import asyncio
+import logging
+import time
+from collections.abc import Mapping
+from http.client import responses
+from typing import Union
+from urllib.parse import urlencode
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+def _body_size(data):
+    # Returns the size of the body sent for 'data': aiohttp url-encodes the
+    # mappings (e.g. the OAuth2 form) and sends the strings UTF-8 encoded.
+    if not data:
+        return 0
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, str):
+        return len(data.encode('utf-8'))
+    if isinstance(data, (Mapping, list, tuple)):
+        return len(urlencode(data, doseq=True).encode('utf-8'))
+    return 0
+
+
+class AsyncIDMManager(object):
+    """
+    This class manages the resources of a Keyrock IDM instance from asyncio
+    code. It offers the same methods of IDMManager as coroutines and returns
+    the same model objects.
+
+    All the coroutines share a single aiohttp ClientSession, created on first
+    use, whose connection pool is configured by the constructor arguments.
+    The instance can be used as an asynchronous context manager, or closed
+    with the 'close' coroutine, to release the pooled connections.
+
+    Args:
+        host: the IDM host name.
+        port: the IDM port.
+        auth_token: the IDM authentication token (see 'get_auth_token').
+        limit: the maximum number of simultaneous connections (default: 100).
+        limit_per_host: the maximum number of simultaneous connections
+            towards the IDM, 0 means no limit (default: 0).
+        keepalive_timeout: the number of seconds an idle connection is kept
+            open (default: 15).
+        session: an existing aiohttp ClientSession to use instead of creating
+            a new one; the pool options are ignored and the session is not
+            closed by the 'close' coroutine.
+        codec: the JSON codec used to encode the requests and decode the
+            responses (see IDMManager).
+        metrics: an IDMMetrics instance that records the requests sent by
+            each coroutine (see IDMManager).
+        hooks: a dictionary of event and callable, or list of callables,
+            called with an IDMCall around each request (see 'add_hook').
+
+    Raises:
+        ImportError if the 'aiohttp' package is not installed.
+    """
+    def __init__(self, host: str, port: int, auth_token: str,
+                 limit: int = 100, limit_per_host: int = 0,
+                 keepalive_timeout: float = 15,
+                 session: 'aiohttp.ClientSession' = None,
+                 codec: Union[str, JSONCodec] = None,
+                 metrics: IDMMetrics = None, hooks: dict = None):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncIDMManager requires the 'aiohttp' package")
+
+        self._host = host
+        self._port = port
+        self._idm_url = f"http://{host}:{port}"
+        self._auth_token = auth_token
+
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._owns_session = session is None
+        self._session = session
+        self._codec = get_codec(codec)
+        self._metrics = metrics
+        self._hooks = IDMHooks(hooks)
+
+        self._logger = logging.getLogger('keyrock.IDMManager')
+        self._logger.debug(
+            'creating an instance of AsyncIDMManager (%s, %s)',
+            self._idm_url, self._auth_token)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def session(self):
+        """Gets the aiohttp ClientSession used by the instance, if any."""
+        return self._session
+
+    @property
+    def metrics(self):
+        """Gets the IDMMetrics used by the instance, if any."""
+        return self._metrics
+
+    def add_hook(self, event: str, hook):
+        """
+        Registers a callable that is called with an IDMCall around each
+        request sent to the IDM (see IDMManager.add_hook). The hooks are
+        plain functions, called from the event loop.
+
+        Raises:
+            ValueError if 'event' is not valid.
+        """
+        self._hooks.add(event, hook)
+
+    def remove_hook(self, event: str, hook):
+        """
+        Unregisters a hook registered with 'add_hook'.
+
+        Raises:
+            ValueError if the hook is not registered.
+        """
+        self._hooks.remove(event, hook)
+
+    async def close(self):
+        """
+        Releases the pooled connections. The session is closed only if it was
+        created by the instance.
+        """
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _headers(self):
+        return {
+            'Content-Type': 'application/json',
+            'X-Auth-token': self._auth_token
+        }
+
+    async def _request(self, operation: str, method: str, url: str,
+                       **kwargs):
+        if not self._hooks.enabled:
+            return await self._send(operation, method, url, **kwargs)
+
+        _call = IDMCall(operation, method, url, self._json)
+        self._hooks.dispatch('before_request', _call)
+        _start = time.perf_counter()
+        try:
+            response = await self._send(operation, method, url, **kwargs)
+        except Exception as _error:
+            _call.elapsed = time.perf_counter() - _start
+            _call.error = _error
+            self._hooks.dispatch('on_error', _call)
+            raise
+        _call.elapsed = time.perf_counter() - _start
+        _call.status = response.status
+        _call.response = response
+        self._hooks.dispatch('after_response', _call)
+        return response
+
+    async def _send(self, operation: str, method: str, url: str, **kwargs):
+        # The session is created lazily so that it is bound to the running
+        # event loop.
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._limit,
+                    limit_per_host=self._limit_per_host,
+                    keepalive_timeout=self._keepalive_timeout))
+
+        if self._metrics is None:
+            async with self._session.request(
+                    method, url, **kwargs) as response:
+                response._keyrock_body = await response.read()
+        else:
+            _start = time.perf_counter()
+            try:
+                async with self._session.request(
+                        method, url, **kwargs) as response:
+                    response._keyrock_body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self._metrics.record(
+                    operation, 0, time.perf_counter() - _start)
+                raise
+            self._metrics.record(
+                operation, response.status, time.perf_counter() - _start,
+                len(response._keyrock_body), _body_size(kwargs.get('data')))
+        self._log_response(operation, response)
+
+        return response
+
+    def _json(self, response):
+        # Decodes the body read by _request, only once.
+        return decode_response(response, self._codec,
+                               response._keyrock_body)
+
+    def _log_response(self, operation: str, response):
+        _level = logging.DEBUG if response.status < 400 else logging.ERROR
+        if not self._logger.isEnabledFor(_level):
+            return
+
+        if response.status < 400:
+            _reason = ""
+        else:
+            try:
+                _body = self._json(response)
+            except ValueError:
+                _body = response._keyrock_body
+            if isinstance(_body, dict) and 'error' in _body:
+                _reason = f"\"{_body['error']['message']}\""
+            else:
+                _reason = f"\"{_body}\""
+
+        self._logger.log(
+            _level,
+            (f'{operation}() - '
+             f'{self._idm_url} "{response.method} '
+             f'{response.url.path_qs} HTTP/{response.version.major}.'
+             f'{response.version.minor}" '
+             f'{response.status} "{responses.get(response.status, "")}": '
+             f'{_reason}'))
+
+    async def get_oauth2_token(self, user: str, password: str,
+                               application_secret: str, permanent: bool):
+        """
+        Asynchronous version of IDMManager.get_oauth2_token.
+        """
+        url = f"{self._idm_url}/oauth2/token"
+        payload = {
+            "username": user,
+            "password": password,
+            "grant_type": "password"
+        }
+
+        if permanent:
+            payload.update({"scope": "permanent"})
+
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Authorization': f'Basic {application_secret}',
+            'Accept': 'application/json'
+        }
+
+        response = await self._request(
+            'get_oauth2_token', "POST", url, headers=headers, data=payload)
+        response.raise_for_status()
+
+        _json = self._json(response)
+        _token = _json['access_token']
+        _expires = None
+
+        if 'expires_in' in _json:
+            _expires = _json['expires_in']
+        elif 'permanent' in _json.get('scope', ''):
+            _expires = 'permanent'
+
+        return (_token, _expires)
+
+    ###########################################################################
+    # ORGANIZATIONS section
+    ###########################################################################
+    async def get_organization(self, organization_id: str,
+                               query_type=IDMQuery.BY_UID):
+        """
+        Asynchronous version of IDMManager.get_organization.
+        """
+        if query_type == IDMQuery.BY_UID:
+            url = f"{self._idm_url}/v1/organizations/{organization_id}"
+            response = await self._request(
+                'get_organization', "GET", url, headers=self._headers())
+
+            if response.status == 200:
+                _json = self._json(response)
+                _organization = IDMOrganization(
+                    org_dict=_json['organization'])
+            else:
+                _organization = None
+
+            return _organization
+
+        elif query_type == IDMQuery.BY_NAME:
+            orgs = await self.list_organizations()
+            org_list = [_org for _org in orgs if _org.name == organization_id]
+
+            if len(org_list) > 1:
+                self._logger.warning(
+                    'multiple organization with the name "%s" found',
+                    organization_id)
+
+            return org_list
+
+    async def list_organizations(self):
+        """
+        Asynchronous version of IDMManager.list_organizations.
+        """
+        url = f"{self._idm_url}/v1/organizations"
+        response = await self._request(
+            'list_organizations', "GET", url, headers=self._headers())
+
+        _org_list = list()
+        if response.status == 200:
+            _json = self._json(response)
+            for _org in _json['organizations']:
+                _org_list.append(
+                    IDMOrganization(org_dict=_org['Organization']))
+
+        return _org_list
+
+    async def delete_organization(self, organization_id: str):
+        """
+        Asynchronous version of IDMManager.delete_organization.
+        """
+        url = f"{self._idm_url}/v1/organizations/{organization_id}"
+        response = await self._request(
+            'delete_organization', "DELETE", url, headers=self._headers())
+
+        response.raise_for_status()
+
+    async def create_organization(self, name, description: str = None):
+        """
+        Asynchronous version of IDMManager.create_organization.
+        """
+        url = f"{self._idm_url}/v1/organizations"
+        payload = {
+            "organization": {
+                "name": name,
+                "description":
+                    description or f"This is the {name} organization"
+            }
+        }
+
+        response = await self._request(
+            'create_organization', "POST", url, headers=self._headers(),
+            data=self._codec.dumps(payload))
+        response.raise_for_status()
+
+        self._logger.info(
+            "IDM organizzation \"%s\" created", name)
+        _json = self._json(response)
+        return IDMOrganization(name, _json['organization'])
+
+    async def update_organization(self, organization_id: str):
+        raise NotImplementedError()
+
+    async def list_organization_members(self, organization_id):
+        """
+        Asynchronous version of IDMManager.list_organization_members.
+        """
+        url = f"{self._idm_url}/v1/organizations/{organization_id}/users"
+        response = await self._request(
+            'list_organization_members', "GET", url, headers=self._headers())
+
+        _user_list = list()
+        if response.status == 200:
+            _json = self._json(response)
+            _user_list.extend(_json['organization_users'])
+
+        return _user_list
+
+    async def add_user_to_organization(self, organization_id: str,
+                                       user_id: str, is_owner: bool = False):
+        """
+        Asynchronous version of IDMManager.add_user_to_organization.
+        """
+        _org_role = 'owner' if is_owner else 'member'
+        url = (f"{self._idm_url}/v1/organizations/{organization_id}/users/"
+               f"{user_id}/organization_roles/{_org_role}")
+
+        response = await self._request(
+            'add_user_to_organization', "PUT", url, headers=self._headers())
+        response.raise_for_status()
+
+        self._logger.info(("IDM user \"%s\" associated to \"%s\" "
+                           "organization with the \"%s\" role"),
+                          user_id, organization_id, _org_role)
+
+    async def remove_user_from_organization(self, organization_id: str,
+                                            user_id: str,
+                                            ownership: bool = False):
+        """
+        Asynchronous version of IDMManager.remove_user_from_organization.
+        """
+        _org_role = 'owner' if ownership else 'member'
+        url = (f"{self._idm_url}/v1/organizations/{organization_id}"
+               f"/users/{user_id}/organization_roles/{_org_role}")
+        response = await self._request(
+            'remove_user_from_organization', "DELETE", url,
+            headers=self._headers())
+
+        response.raise_for_status()
+
+    async def get_organization_member(self, organization_id: str,
+                                      user_id: str):
+        """
+        Asynchronous version of IDMManager.get_organization_member.
+        """
+        url = (f"{self._idm_url}/v1/organizations/{organization_id}/users/"
+               f"{user_id}/organization_roles")
+
+        response = await self._request(
+            'get_organization_member', "GET", url, headers=self._headers())
+
+        if response.status == 200:
+            _json = self._json(response)
+            _membership = _json['organization_user']
+        else:
+            _membership = None
+
+        return _membership
+
+    ###########################################################################
+    # APPLICATIONS section
+    ###########################################################################
+    async def get_application(self, application_id: str,
+                              query_type=IDMQuery.BY_UID):
+        """
+        Asynchronous version of IDMManager.get_application.
+        """
+        if query_type == IDMQuery.BY_UID:
+            url = f"{self._idm_url}/v1/applications/{application_id}"
+            response = await self._request(
+                'get_application', "GET", url, headers=self._headers())
+
+            if response.status == 200:
+                _json = self._json(response)
+                _application = IDMApplication(app_dict=_json['application'])
+            elif response.status == 404:
+                _application = None
+            else:
+                response.raise_for_status()
+
+            return _application
+
+        elif query_type == IDMQuery.BY_NAME:
+            apps = await self.list_applications()
+            app_list = [_app for _app in apps if _app.name == application_id]
+
+            if len(app_list) > 1:
+                self._logger.warning(
+                    'multiple applications with the name "%s" found',
+                    application_id)
+
+            return app_list
+
+    async def list_applications(self):
+        """
+        Asynchronous version of IDMManager.list_applications.
+        """
+        url = f"{self._idm_url}/v1/applications"
+        response = await self._request(
+            'list_applications', "GET", url, headers=self._headers())
+
+        if response.status == 200:
+            _json = self._json(response)
+            return [IDMApplication(app_dict=_app)
+                    for _app in _json['applications']]
+        elif response.status == 404:
+            return list()
+        else:
+            response.raise_for_status()
+
+    async def list_application_users(self, application_id,
+                                     user_id: str = None):
+        """
+        Asynchronous version of IDMManager.list_application_users.
+        """
+        if user_id:
+            url = (f"{self._idm_url}/v1/applications/{application_id}/users/"
+                   f"{user_id}/roles")
+        else:
+            url = f"{self._idm_url}/v1/applications/{application_id}/users"
+
+        response = await self._request(
+            'list_application_users', "GET", url, headers=self._headers())
+
+        _user_list = list()
+        if response.status == 200:
+            _json = self._json(response)
+            _user_list.extend(_json['role_user_assignments'])
+
+        return _user_list
+
+    async def authorize_user(self, application_id: str, role_id: str,
+                             user_id: str):
+        """
+        Asynchronous version of IDMManager.authorize_user.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}/users/"
+               f"{user_id}/roles/{role_id}")
+
+        response = await self._request(
+            'authorize_user', "POST", url, headers=self._headers())
+        response.raise_for_status()
+
+        self._logger.info("User \"%s\" authorized to \"%s\" application with "
+                          "the \"%s\" role",
+                          user_id, application_id, role_id)
+
+    async def revoke_user(self, application_id: str,
+                          role_id: str, user_id: str):
+        """
+        Asynchronous version of IDMManager.revoke_user.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}/users/"
+               f"{user_id}/roles/{role_id}")
+
+        response = await self._request(
+            'revoke_user', "DELETE", url, headers=self._headers())
+
+        response.raise_for_status()
+
+    async def delete_application(self, application_id: str):
+        """
+        Asynchronous version of IDMManager.delete_application.
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}"
+        response = await self._request(
+            'delete_application', "DELETE", url, headers=self._headers())
+
+        response.raise_for_status()
+
+    async def create_application(self, name, description: str = None):
+        """
+        Asynchronous version of IDMManager.create_application.
+        """
+        url = f"{self._idm_url}/v1/applications"
+        payload = {
+            "application": {
+                "name": name,
+                "description":
+                    description or f"{name} application protected by Keyrock",
+                "redirect_uri": "http://localhost",
+                "url": "http://localhost",
+                "grant_type": [
+                    "authorization_code",
+                    "implicit",
+                    "password"
+                ],
+                "token_types": ["permanent"]
+            }
+        }
+
+        response = await self._request(
+            'create_application', "POST", url, headers=self._headers(),
+            data=self._codec.dumps(payload))
+        response.raise_for_status()
+
+        self._logger.info("IDM application \"%s\" created", name)
+        _json = self._json(response)
+        return IDMApplication(name, _json['application'])
+
+    async def update_application(self, application_id: str):
+        raise NotImplementedError()
+
+    ###########################################################################
+    # APPLICATION's PROXY section
+    ###########################################################################
+    async def get_proxy(self, application_id):
+        """
+        Asynchronous version of IDMManager.get_proxy.
+        """
+        url = (
+            f"{self._idm_url}/v1/applications/"
+            f"{application_id}/pep_proxies")
+        response = await self._request(
+            'get_proxy', "GET", url, headers=self._headers())
+
+        if response.status == 200:
+            _json = self._json(response)
+            _proxy = IDMProxy(proxy_dict=_json['pep_proxy'])
+        else:
+            _proxy = None
+
+        return _proxy
+
+    async def create_proxy(self, application_id):
+        """
+        Asynchronous version of IDMManager.create_proxy.
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}/pep_proxies"
+
+        response = await self._request(
+            'create_proxy', "POST", url, headers=self._headers())
+        response.raise_for_status()
+
+        _json = self._json(response)
+        self._logger.info(
+            "IDM proxy \"%s\" created", _json['pep_proxy']['id'])
+
+        return IDMProxy(proxy_dict=_json['pep_proxy'])
+
+    async def delete_proxy(self, application_id: str):
+        """
+        Asynchronous version of IDMManager.delete_proxy.
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}/pep_proxies"
+        response = await self._request(
+            'delete_proxy', "DELETE", url, headers=self._headers())
+        response.raise_for_status()
+
+        self._logger.info(
+            "IDM proxy for application \"%s\" deleted",
+            application_id)
+
+    async def reset_proxy(self, application_id: str):
+        """
+        Asynchronous version of IDMManager.reset_proxy.
+        """
+        _proxy = await self.get_proxy(application_id)
+
+        url = f"{self._idm_url}/v1/applications/{application_id}/pep_proxies"
+        response = await self._request(
+            'reset_proxy', "PATCH", url, headers=self._headers())
+        response.raise_for_status()
+
+        self._logger.info(
+            "IDM password for PEP Proxy Account \"%s\" refreshed",
+            _proxy.id)
+
+        _proxy.update(self._json(response))
+
+        return _proxy
+
+    ###########################################################################
+    # USERS section
+    ###########################################################################
+    async def create_user(self, user_email: str, user_password: str,
+                          user_name: str = None):
+        """
+        Asynchronous version of IDMManager.create_user.
+        """
+        url = f"{self._idm_url}/v1/users"
+        payload = {
+            "user": {
+                "username": user_name,
+                "email": user_email,
+                "password": user_password
+            }
+        }
+
+        response = await self._request(
+            'create_user', "POST", url, headers=self._headers(),
+            data=self._codec.dumps(payload))
+        response.raise_for_status()
+
+        self._logger.info("IDM user \"%s\" created", user_email)
+
+        _json = self._json(response)
+        return IDMUser(user_dict=_json['user'])
+
+    async def get_user(self, user_id: str, query_type=IDMQuery.BY_UID):
+        """
+        Asynchronous version of IDMManager.get_user.
+        """
+        if query_type == IDMQuery.BY_UID:
+            url = f"{self._idm_url}/v1/users/{user_id}"
+            response = await self._request(
+                'get_user', "GET", url, headers=self._headers())
+
+            if response.status == 200:
+                _json = self._json(response)
+                _user = IDMUser(user_dict=_json['user'])
+            else:
+                _user = None
+        elif query_type == IDMQuery.BY_LOGIN:
+            _users = await self.list_users()
+            _user = None
+
+            for _u in _users:
+                if _u.login == user_id:
+                    _user = _u
+                    break
+        else:
+            raise ValueError("Query type not valid")
+
+        return _user
+
+    async def list_users(self):
+        """
+        Asynchronous version of IDMManager.list_users.
+        """
+        url = f"{self._idm_url}/v1/users"
+        response = await self._request(
+            'list_users', "GET", url, headers=self._headers())
+
+        _user_list = list()
+        if response.status == 200:
+            _json = self._json(response)
+            for _user in _json['users']:
+                _user_list.append(IDMUser(user_dict=_user))
+
+        return _user_list
+
+    async def update_user(self, user_id: str):
+        raise NotImplementedError()
+
+    async def delete_user(self, user_id: str):
+        """
+        Asynchronous version of IDMManager.delete_user.
+        """
+        url = f"{self._idm_url}/v1/users/{user_id}"
+        response = await self._request(
+            'delete_user', "DELETE", url, headers=self._headers())
+
+        response.raise_for_status()
+
+    ###########################################################################
+    # ROLES section
+    ###########################################################################
+    async def list_roles(self, application_id):
+        """
+        Asynchronous version of IDMManager.list_roles.
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}/roles"
+        response = await self._request(
+            'list_roles', "GET", url, headers=self._headers())
+
+        _role_list = list()
+        if response.status == 200:
+            _json = self._json(response)
+            for _role in _json['roles']:
+                _role_list.append(
+                    IDMRole(role_dict=_role, application_id=application_id))
+
+        return _role_list
+
+    async def create_role(self, application_id: str, role_name: str):
+        """
+        Asynchronous version of IDMManager.create_role.
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}/roles"
+        payload = {
+            "role": {
+                "name": role_name
+            }
+        }
+
+        response = await self._request(
+            'create_role', "POST", url, headers=self._headers(),
+            data=self._codec.dumps(payload))
+        response.raise_for_status()
+
+        self._logger.info("IDM role \"%s\" created", role_name)
+
+        _json = self._json(response)
+        return IDMRole(role_dict=_json['role'], application_id=application_id)
+
+    async def get_role(self, application_id: str, role_id: str,
+                       query_type=IDMQuery.BY_UID):
+        """
+        Asynchronous version of IDMManager.get_role.
+        """
+        if query_type == IDMQuery.BY_UID:
+            url = (f"{self._idm_url}/v1/applications/{application_id}"
+                   f"/roles/{role_id}")
+            response = await self._request(
+                'get_role', "GET", url, headers=self._headers())
+
+            if response.status == 200:
+                _json = self._json(response)
+                _role = IDMRole(role_dict=_json['role'],
+                                application_id=application_id)
+            else:
+                _role = None
+
+            return _role
+
+        elif query_type == IDMQuery.BY_NAME:
+            roles = await self.list_roles(application_id)
+            role_list = [_role for _role in roles if _role.name == role_id]
+
+            if len(role_list) > 1:
+                self._logger.warning(
+                    'multiple roles with the name "%s" found',
+                    role_id)
+
+            return role_list
+
+    async def update_role(self, application_id: str, roled_id: str):
+        raise NotImplementedError()
+
+    async def delete_role(self, application_id: str, role_id: str):
+        """
+        Asynchronous version of IDMManager.delete_role.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}"
+               f"/roles/{role_id}")
+        response = await self._request(
+            'delete_role', "DELETE", url, headers=self._headers())
+
+        response.raise_for_status()
+
+    async def list_role_permissions(self, application_id, role_id):
+        """
+        Asynchronous version of IDMManager.list_role_permissions.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}/roles/"
+               f"{role_id}/permissions")
+        response = await self._request(
+            'list_role_permissions', "GET", url, headers=self._headers())
+
+        _permission_list = list()
+        if response.status == 200:
+            _json = self._json(response)
+            for _permission in _json['role_permission_assignments']:
+                _permission_list.append(
+                    IDMPermission(permission_dict=_permission,
+                                  application_id=application_id))
+
+        return _permission_list
+
+    async def assign_permission_to_role(self, application_id: str,
+                                        role_id: str, permission_id: str):
+        """
+        Asynchronous version of IDMManager.assign_permission_to_role.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}/roles/"
+               f"{role_id}/permissions/{permission_id}")
+
+        response = await self._request(
+            'assign_permission_to_role', "PUT", url, headers=self._headers())
+        response.raise_for_status()
+
+        self._logger.info("IDM permission \"%s\" assigned to \"%s\" role",
+                          permission_id, role_id)
+
+    async def remove_permission_from_role(self, application_id: str,
+                                          role_id: str, permission_id: str):
+        """
+        Asynchronous version of IDMManager.remove_permission_from_role.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}/roles/"
+               f"{role_id}/permissions/{permission_id}")
+
+        response = await self._request(
+            'remove_permission_from_role', "DELETE", url,
+            headers=self._headers())
+        response.raise_for_status()
+
+        self._logger.info("IDM permission \"%s\" removed from \"%s\" role",
+                          permission_id, role_id)
+
+    ###########################################################################
+    # PERMISSIONS section
+    ###########################################################################
+    async def list_permissions(self, application_id):
+        """
+        Asynchronous version of IDMManager.list_permissions.
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}/permissions"
+        response = await self._request(
+            'list_permissions', "GET", url, headers=self._headers())
+
+        _permission_list = list()
+        if response.status == 200:
+            _json = self._json(response)
+            for _permission in _json['permissions']:
+                _permission_list.append(
+                    IDMPermission(permission_dict=_permission,
+                                  application_id=application_id))
+
+        return _permission_list
+
+    async def create_permission(self, permission_name: str,
+                                permission_action: str,
+                                permission_resource: str,
+                                is_regex: bool = False,
+                                application_id: str = None):
+        """
+        Asynchronous version of IDMManager.create_permission.
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}/permissions"
+        payload = {
+            "permission": {
+                "name": permission_name,
+                "action": permission_action,
+                "resource": permission_resource,
+                "is_regex": is_regex
+            }
+        }
+
+        response = await self._request(
+            'create_permission', "POST", url, headers=self._headers(),
+            data=self._codec.dumps(payload))
+        response.raise_for_status()
+
+        self._logger.info("IDM permission \"%s\" created", permission_name)
+
+        _json = self._json(response)
+        return IDMPermission(permission_dict=_json['permission'],
+                             application_id=application_id)
+
+    async def get_permission(self, application_id: str, permission_id: str):
+        """
+        Asynchronous version of IDMManager.get_permission.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}"
+               f"/permissions/{permission_id}")
+        response = await self._request(
+            'get_permission', "GET", url, headers=self._headers())
+
+        if response.status == 200:
+            _json = self._json(response)
+            _permission = IDMPermission(
+                permission_dict=_json['permission'],
+                application_id=application_id)
+        else:
+            _permission = None
+
+        return _permission
+
+    async def update_permission(self, application_id: str,
+                                permission_id: str):
+        raise NotImplementedError()
+
+    async def delete_permission(self, application_id: str,
+                                permission_id: str):
+        """
+        Asynchronous version of IDMManager.delete_permission.
+        """
+        url = (f"{self._idm_url}/v1/applications/{application_id}"
+               f"/permissions/{permission_id}")
+        response = await self._request(
+            'delete_permission', "DELETE", url, headers=self._headers())
+
+        response.raise_for_status()
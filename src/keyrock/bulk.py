@@ -0,0 +1,227 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.bulk
+
+Bulk operations: one IDMManager method applied to many items by a bounded
+pool of threads.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+
+_END = object()
+
+
+class BulkResult(object):
+    """
+    This class represents the outcome of a bulk operation on one item.
+
+    Attributes:
+        item: the item, as read from the iterable.
+        result: the value returned for the item (e.g. the created IDMUser),
+            or None if it failed.
+        error: the exception raised for the item, or None if it succeeded.
+        skipped: True if the item needed nothing and was not processed.
+    """
+    __slots__ = ('item', 'result', 'error', 'skipped')
+
+    def __init__(self, item, result=None, error: Exception = None,
+                 skipped: bool = False):
+        self.item = item
+        self.result = result
+        self.error = error
+        self.skipped = skipped
+
+    @property
+    def ok(self):
+        """True if the item did not fail: it succeeded or it was skipped."""
+        return self.error is None
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"<BulkResult {self.item!r} failed: {self.error!r}>"
+        if self.skipped:
+            return f"<BulkResult {self.item!r} skipped>"
+        return f"<BulkResult {self.item!r}: {self.result!r}>"
+
+
+class BulkOperation(object):
+    """
+    This class represents a function applied to the items of an iterable by
+    at most 'max_workers' threads. Iterating over an instance runs the
+    operation and yields a BulkResult per item as soon as the item is done,
+    i.e. not in the order of the iterable; a failed item does not stop the
+    others.
+
+    The iterable is read lazily, a little ahead of the workers, so that it
+    can be a generator over a file of any size. An instance can be iterated
+    only once; leaving the iteration early cancels the items not yet started
+    and waits for the running ones.
+
+    Args:
+        func:
+            the callable applied to each item; its return value is the
+            'result' of the item and an Exception it raises is the 'error'.
+        items:
+            the iterable of the items.
+        max_workers:
+            the maximum number of items processed at the same time
+            (default: 8).
+        rate:
+            the maximum number of calls of 'func' started per second, by all
+            the workers together (default: None, no limit).
+        skip:
+            a callable that returns True for the items that need nothing;
+            they are yielded at once as skipped, without calling 'func' nor
+            counting against 'rate'. It is called by the iterating thread,
+            in the order of the iterable, and an exception it raises stops
+            the operation (default: None).
+    """
+    def __init__(self, func, items, max_workers: int = 8, rate: float = None,
+                 skip=None):
+        if max_workers < 1:
+            raise ValueError("'max_workers' must be at least 1")
+        if rate is not None and rate <= 0:
+            raise ValueError("'rate' must be positive")
+        self._func = func
+        self._items = items
+        self._max_workers = max_workers
+        self._interval = 1 / rate if rate else 0
+        self._skip = skip
+
+        self._lock = threading.Lock()
+        self._next_call = 0.0
+
+        self._started = False
+        self._start = None
+        self._end = None
+        self._submitted = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._skipped = 0
+
+    def _throttle(self):
+        # The calls are spaced by the interval: each worker books the next
+        # free slot and waits for it.
+        with self._lock:
+            _now = time.monotonic()
+            _slot = max(_now, self._next_call)
+            self._next_call = _slot + self._interval
+        if _slot > _now:
+            time.sleep(_slot - _now)
+
+    def _call(self, item):
+        if self._interval:
+            self._throttle()
+        try:
+            return BulkResult(item, self._func(item))
+        except Exception as _error:
+            return BulkResult(item, error=_error)
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError("The bulk operation has already been run")
+        self._started = True
+        return self._run()
+
+    def _run(self):
+        _items = iter(self._items)
+        _pending = set()
+        _window = 2 * self._max_workers
+        self._start = time.monotonic()
+        with ThreadPoolExecutor(self._max_workers,
+                                thread_name_prefix='keyrock-bulk') as _pool:
+            try:
+                while True:
+                    # keeps the workers busy without reading the whole
+                    # iterable in advance
+                    while _items is not None and len(_pending) < _window:
+                        _item = next(_items, _END)
+                        if _item is _END:
+                            _items = None
+                            break
+                        if self._skip is not None and self._skip(_item):
+                            self._skipped += 1
+                            yield BulkResult(_item, skipped=True)
+                            continue
+                        _pending.add(_pool.submit(self._call, _item))
+                        self._submitted += 1
+                    if not _pending:
+                        break
+
+                    _done, _pending = wait(_pending,
+                                           return_when=FIRST_COMPLETED)
+                    for _future in _done:
+                        _result = _future.result()
+                        if _result.error is None:
+                            self._succeeded += 1
+                        else:
+                            self._failed += 1
+                        yield _result
+            finally:
+                for _future in _pending:
+                    _future.cancel()
+                self._end = time.monotonic()
+
+    @property
+    def stats(self):
+        """
+        Gets the statistics of the operation, as a dictionary with the number
+        of items 'submitted' to the workers, 'succeeded', 'failed',
+        'in_flight' and 'skipped', the 'elapsed' seconds since the start and
+        the 'rate' of completed (not skipped) items per second. They can be
+        read while iterating.
+        """
+        _done = self._succeeded + self._failed
+        if self._start is None:
+            _elapsed = 0.0
+        else:
+            _elapsed = (self._end or time.monotonic()) - self._start
+        return {
+            'submitted': self._submitted,
+            'succeeded': self._succeeded,
+            'failed': self._failed,
+            'in_flight': self._submitted - _done,
+            'skipped': self._skipped,
+            'elapsed': _elapsed,
+            'rate': _done / _elapsed if _elapsed > 0 else 0.0
+        }
+
+    def report(self):
+        """
+        Runs the operation to the end and returns its results grouped by
+        outcome, as a dictionary of lists of BulkResult with the
+        'succeeded', 'skipped' and 'failed' keys. All the results are kept
+        in memory: iterate the instance instead for very large operations.
+
+        Raises:
+            RuntimeError if the operation has already been run.
+        """
+        _report = {'succeeded': [], 'skipped': [], 'failed': []}
+        for _result in self:
+            if _result.skipped:
+                _report['skipped'].append(_result)
+            elif _result.error is None:
+                _report['succeeded'].append(_result)
+            else:
+                _report['failed'].append(_result)
+        return _report
+
+    def __repr__(self):
+        return (f"<BulkOperation max_workers: {self._max_workers}, "
+                f"succeeded: {self._succeeded}, failed: {self._failed}>")
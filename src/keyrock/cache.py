@@ -0,0 +1,444 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.cache
+"""
+
+from . import forksafe
+from .singleflight import SingleFlight
+from collections import OrderedDict
+from datetime import datetime, timezone
+import copy
+import threading
+import time
+
+
+class IDMCache(object):
+    """
+    This class represents a bounded, in-memory cache of IDM entities with
+    per-entity-type expiration and least-recently-used eviction.
+
+    The keys are tuples whose first item is the entity type, e.g.
+    ('role', application_id, role_id). The entities that do not exist in the
+    IDM can be cached too ('put_missing'), so that repeated lookups of a
+    missing entity do not reach the IDM either.
+
+    Args:
+        max_size:
+            the maximum number of cached entries; when it is exceeded the
+            least recently used entry is evicted (default: 1024).
+        ttl:
+            the default number of seconds an entry is valid (default: 60).
+        ttls:
+            a dictionary of entity type and number of seconds that overrides
+            'ttl' for the given types, e.g. {'user': 30, 'role': 600}.
+        negative_ttl:
+            the number of seconds a missing entity is remembered; 0 disables
+            the caching of missing entities (default: 5).
+        keep_on_fork:
+            if True, a forked child process keeps the entries cached by its
+            parent, e.g. warmed up before the workers of a pre-forking server
+            are forked; otherwise it starts empty (default: True).
+    """
+    def __init__(self, max_size: int = 1024, ttl: float = 60,
+                 ttls: dict = None, negative_ttl: float = 5,
+                 keep_on_fork: bool = True):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._ttls = dict(ttls or {})
+        self._negative_ttl = negative_ttl
+        self._keep_on_fork = keep_on_fork
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        if not self._keep_on_fork:
+            self._entries = OrderedDict()
+
+    def get(self, key: tuple):
+        """
+        Looks up the given key.
+
+        Returns:
+            - a (hit, value) tuple: 'hit' is False if the key is not cached or
+              is expired; 'value' is None for a cached missing entity.
+        """
+        with self._lock:
+            _entry = self._entries.get(key)
+            if _entry is not None:
+                _value, _expires = _entry
+                if _expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return (True, _value)
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return (False, None)
+
+    def _store(self, key: tuple, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def put(self, key: tuple, value):
+        """Caches an entity under the given key."""
+        _ttl = self._ttls.get(key[0], self._ttl)
+        if _ttl:
+            self._store(key, value, _ttl)
+
+    def put_missing(self, key: tuple):
+        """Records that the entity with the given key does not exist."""
+        if self._negative_ttl:
+            self._store(key, None, self._negative_ttl)
+
+    def invalidate(self, *key):
+        """
+        Removes the entries with the given key. A partial key removes all the
+        entries that start with it, e.g. invalidate('role', application_id)
+        removes all the cached roles of the application.
+        """
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                return
+            _len = len(key)
+            for _key in [_k for _k in self._entries if _k[:_len] == key]:
+                del self._entries[_key]
+
+    def clear(self):
+        """Removes all the entries."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        """
+        Gets the cache statistics as a dictionary with the 'hits', 'misses',
+        'evictions', 'expirations' and 'size' keys.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'size': len(self._entries)
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (f"<IDMCache size: {len(self._entries)}/{self._max_size}, "
+                f"hits: {self._hits}, misses: {self._misses}, "
+                f"evictions: {self._evictions}>")
+
+
+class IDMTokenCache(object):
+    """
+    This class represents a bounded cache of token introspection results
+    (see 'get_token_info' and 'check_auth_token'), keyed by subject token
+    and by the authentication token used to look it up: the IDM answers 401
+    when the latter is not valid, and such an answer must not be returned
+    to the callers that use a valid one.
+
+    A valid token is cached until its own expiration time, but not longer
+    than 'ttl' seconds, so that revoked tokens are eventually seen. Invalid
+    tokens (the IDM answers 401 or 404, or the token is not valid) are
+    remembered for 'negative_ttl' seconds and the same error is raised again.
+    Concurrent lookups of the same token that miss the cache share a single
+    request to the IDM.
+
+    Args:
+        max_size:
+            the maximum number of cached tokens; when it is exceeded the
+            least recently used token is evicted (default: 10000).
+        ttl:
+            the maximum number of seconds a valid token is cached
+            (default: 300).
+        negative_ttl:
+            the number of seconds an invalid token is remembered; 0 disables
+            the caching of invalid tokens (default: 5).
+        keep_on_fork:
+            if True, a forked child process keeps the entries cached by its
+            parent, e.g. warmed up before the workers of a pre-forking server
+            are forked; otherwise it starts empty (default: True).
+    """
+    def __init__(self, max_size: int = 10000, ttl: float = 300,
+                 negative_ttl: float = 5, keep_on_fork: bool = True):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._keep_on_fork = keep_on_fork
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = SingleFlight()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        if not self._keep_on_fork:
+            self._entries = OrderedDict()
+
+    def _lifetime(self, token_info: dict):
+        if not token_info.get('valid', False):
+            return self._negative_ttl
+        # imported on first use, to keep 'import keyrock' fast
+        import dateutil.parser
+        try:
+            _expires = dateutil.parser.isoparse(token_info['expires'])
+        except (KeyError, TypeError, ValueError):
+            return self._ttl
+        if _expires.tzinfo is None:
+            _expires = _expires.replace(tzinfo=timezone.utc)
+        _left = (_expires - datetime.now(timezone.utc)).total_seconds()
+        return min(self._ttl, _left)
+
+    def _store(self, key, value, is_error: bool, lifetime: float):
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, is_error,
+                                  time.monotonic() + lifetime)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _fetch(self, key, fetch):
+        try:
+            _token_info = fetch()
+        except Exception as _error:
+            _response = getattr(_error, 'response', None)
+            if (_response is not None and
+                    _response.status_code in (401, 404)):
+                self._store(key, _error, True, self._negative_ttl)
+            raise
+        self._store(key, _token_info, False, self._lifetime(_token_info))
+        return _token_info
+
+    def get(self, key, fetch):
+        """
+        Returns the cached token information for 'key' or calls 'fetch' to
+        retrieve it from the IDM.
+
+        Args:
+            key: the cache key; it must include the subject token and the
+                authentication token.
+            fetch: a callable without arguments that returns the token
+                information or raises an HTTPError.
+
+        Raises:
+            HTTPError if the token is not valid (it may be a cached error).
+        """
+        with self._lock:
+            _entry = self._entries.get(key)
+            if _entry is not None:
+                _value, _is_error, _expires = _entry
+                if _expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    if _is_error:
+                        raise copy.copy(_value)
+                    return _value
+                del self._entries[key]
+            self._misses += 1
+
+        return self._flights.do(key, self._fetch, key, fetch)
+
+    def invalidate(self, subj_token: str):
+        """Removes the cached entries of the given subject token."""
+        with self._lock:
+            for _key in [_k for _k in self._entries if subj_token in _k]:
+                del self._entries[_key]
+
+    def clear(self):
+        """Removes all the entries."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        """
+        Gets the cache statistics as a dictionary with the 'hits', 'misses',
+        'evictions', 'coalesced' (misses that shared an in-flight request)
+        and 'size' keys.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'coalesced': self._flights.stats['coalesced'],
+                'size': len(self._entries)
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class IDMOAuth2TokenCache(object):
+    """
+    This class represents a bounded cache of OAuth2 access tokens (see
+    IDMManager.get_oauth2_token), keyed by user and application.
+
+    A token is handed out until 'refresh_margin' seconds before its
+    expiration; after that the next request obtains a new one, so an expired
+    token is never returned. Permanent tokens never expire. Concurrent
+    requests for the same user and application share a single request to the
+    IDM.
+
+    Args:
+        max_size:
+            the maximum number of cached tokens; when it is exceeded the
+            least recently used token is evicted (default: 1024).
+        refresh_margin:
+            the number of seconds before the expiration at which a token is
+            renewed (default: 60).
+        keep_on_fork:
+            if True, a forked child process keeps the entries cached by its
+            parent, e.g. warmed up before the workers of a pre-forking server
+            are forked; otherwise it starts empty (default: True).
+    """
+    def __init__(self, max_size: int = 1024, refresh_margin: float = 60,
+                 keep_on_fork: bool = True):
+        self._max_size = max_size
+        self._refresh_margin = refresh_margin
+        self._keep_on_fork = keep_on_fork
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = SingleFlight()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        if not self._keep_on_fork:
+            self._entries = OrderedDict()
+
+    def _lookup(self, key):
+        with self._lock:
+            _entry = self._entries.get(key)
+            if _entry is not None:
+                _token, _renew_at, _expires_at = _entry
+                _now = time.monotonic()
+                if _expires_at is None:
+                    self._entries.move_to_end(key)
+                    return (_token, 'permanent')
+                if _now < _renew_at:
+                    self._entries.move_to_end(key)
+                    return (_token, int(_expires_at - _now))
+                del self._entries[key]
+            return None
+
+    def _fetch(self, key, fetch):
+        # another caller may have renewed the token in the meantime
+        _cached = self._lookup(key)
+        if _cached is not None:
+            return _cached
+
+        _token, _expires = fetch()
+        _now = time.monotonic()
+        if _expires is None:
+            # the lifetime is unknown: the token is not cached
+            return (_token, _expires)
+        if _expires == 'permanent':
+            _entry = (_token, None, None)
+        else:
+            _expires_at = _now + float(_expires)
+            _margin = min(self._refresh_margin, float(_expires) / 2)
+            _entry = (_token, _expires_at - _margin, _expires_at)
+
+        with self._lock:
+            self._entries[key] = _entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        return (_token, _expires)
+
+    def get(self, key, fetch):
+        """
+        Returns the cached token for 'key' or calls 'fetch' to obtain it.
+
+        Args:
+            key: the cache key; it must identify the user, its password and
+                the application.
+            fetch: a callable without arguments that returns a
+                (token, expires_in) tuple, where 'expires_in' is a number of
+                seconds or 'permanent'.
+
+        Returns:
+            - a (token, expires) tuple, where 'expires' is the number of
+              seconds the token is still valid or 'permanent'.
+        """
+        _cached = self._lookup(key)
+        with self._lock:
+            if _cached is not None:
+                self._hits += 1
+                return _cached
+            self._misses += 1
+
+        return self._flights.do(key, self._fetch, key, fetch)
+
+    def clear(self):
+        """Removes all the entries."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        """
+        Gets the cache statistics as a dictionary with the 'hits', 'misses',
+        'evictions', 'coalesced' (misses that shared an in-flight request)
+        and 'size' keys.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'coalesced': self._flights.stats['coalesced'],
+                'size': len(self._entries)
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,120 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.codec
+
+JSON encoding of the requests and decoding of the responses.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONCodec(object):
+    """
+    This class encodes and decodes JSON with the standard library.
+    """
+    name = 'json'
+
+    def dumps(self, obj):
+        """Encodes 'obj' into a JSON document (str or bytes)."""
+        return json.dumps(obj)
+
+    def loads(self, data):
+        """
+        Decodes a JSON document given as str or bytes.
+
+        Raises:
+            ValueError if the document is not valid JSON.
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    This class encodes and decodes JSON with orjson, a faster drop-in
+    replacement of the standard library (pip install orjson).
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError(
+                "orjson is required by OrjsonCodec: pip install orjson")
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        # orjson.JSONDecodeError is a ValueError
+        return orjson.loads(data)
+
+
+_CODECS = {
+    'json': JSONCodec,
+    'orjson': OrjsonCodec
+}
+
+
+def get_codec(codec=None):
+    """
+    Returns a codec instance.
+
+    Args:
+        codec: a codec instance, a codec name ('json' or 'orjson') or None
+            for the fastest available one (orjson if it is installed,
+            otherwise the standard library).
+    """
+    if codec is None:
+        return OrjsonCodec() if orjson is not None else JSONCodec()
+    if isinstance(codec, str):
+        try:
+            return _CODECS[codec]()
+        except KeyError:
+            raise ValueError(f"Unknown JSON codec: {codec}") from None
+    return codec
+
+
+_DEFAULT_CODEC = get_codec()
+
+
+def decode_response(response, codec: JSONCodec = None, body: bytes = None):
+    """
+    Returns the decoded JSON body of a response. The body is decoded only
+    once: the result is stored on the response and returned by the following
+    calls.
+
+    Args:
+        response: a requests Response, or an aiohttp ClientResponse whose
+            body is passed as 'body'.
+        codec: the codec to use (default: the fastest installed).
+        body: the body of the response, if it is not a requests Response.
+
+    Raises:
+        ValueError if the body is not valid JSON.
+    """
+    try:
+        return response._keyrock_json
+    except AttributeError:
+        pass
+    _json = (codec or _DEFAULT_CODEC).loads(
+        response.content if body is None else body)
+    response._keyrock_json = _json
+    return _json
@@ -0,0 +1,222 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.credentials
+"""
+
+from . import forksafe
+from .codec import decode_response
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import requests
+import threading
+
+
+def fetch_auth_token(host: str, port: int, user: str, password: str,
+                     session: requests.Session = None):
+    """
+    Requests a new IDM authentication token.
+
+    Returns:
+        - a (token, expires) tuple, where 'expires' is a timezone aware
+          datetime.
+
+    Raises:
+        HTTPError if the credentials are not valid.
+    """
+    url = f"http://{host}:{port}/v1/auth/tokens"
+    payload = {
+        "name": user,
+        "password": password
+    }
+
+    headers = {
+        'Content-Type': 'application/json',
+    }
+
+    response = (session or requests).request(
+        "POST", url, headers=headers, data=json.dumps(payload))
+    response.raise_for_status()
+
+    # dateutil is loaded only when a token is requested
+    import dateutil.parser
+    expires = dateutil.parser.isoparse(
+        decode_response(response)["token"]["expires_at"])
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+
+    token = response.headers['X-Subject-Token']
+
+    return (token, expires)
+
+
+class IDMCredentials(object):
+    """
+    This class provides an IDM authentication token that is renewed before
+    its expiration. An instance can be passed to IDMManager in place of the
+    token.
+
+    The token is requested on first use. If 'background' is True, a daemon
+    thread renews it 'refresh_margin' seconds before the expiration;
+    otherwise it is renewed by the first caller that finds it about to
+    expire. In both cases only one renewal is performed at a time and the
+    concurrent callers receive its result.
+
+    A forked child process keeps the current token; the background renewal,
+    if it was running in the parent, is started again in the child on the
+    first use of the token.
+
+    Args:
+        host: the IDM host name.
+        port: the IDM port.
+        user: the IDM admin user.
+        password: the IDM admin password.
+        refresh_margin: the number of seconds before the expiration at which
+            the token is renewed (default: 300).
+        background: whether to renew the token in a background thread
+            (default: True).
+        session: the requests Session used to request the tokens (see
+            'create_session').
+    """
+    def __init__(self, host: str, port: int, user: str, password: str,
+                 refresh_margin: float = 300, background: bool = True,
+                 session: requests.Session = None):
+        self._host = host
+        self._port = port
+        self._user = user
+        self._password = password
+        self._refresh_margin = timedelta(seconds=refresh_margin)
+        self._background = background
+        self._session = session
+
+        self._logger = logging.getLogger('keyrock.IDMCredentials')
+
+        self._lock = threading.Lock()
+        # (token, renewal time, expiration time)
+        self._current = (None, None, None)
+        self._refreshes = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._restart = False
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        # the refresher thread does not exist in the child process
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._restart = self._thread is not None
+        self._thread = None
+
+    def _stale(self, renew_at):
+        return renew_at is None or datetime.now(timezone.utc) >= renew_at
+
+    def _start(self):
+        # the first callers may get here together: only one thread starts
+        with self._lock:
+            self._restart = False
+            if self._background and self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._refresher, name='keyrock-credentials',
+                    daemon=True)
+                self._thread.start()
+
+    def _refresher(self):
+        while not self._stop.is_set():
+            _token, _renew_at, _expires = self._current
+            if _renew_at is not None:
+                _wait = (_renew_at -
+                         datetime.now(timezone.utc)).total_seconds()
+                if _wait > 0 and self._stop.wait(_wait):
+                    break
+            try:
+                self.refresh(_token)
+            except Exception:
+                self._logger.exception('unable to renew the IDM token')
+                # retries later, before the expiration if possible
+                _left = ((_expires - datetime.now(timezone.utc))
+                         .total_seconds() if _expires else 0)
+                self._stop.wait(max(1, min(30, _left / 2)))
+
+    def refresh(self, stale_token: str = None):
+        """
+        Renews the token. If the current token is different from
+        'stale_token' and it is not about to expire, it has already been
+        renewed by someone else and it is returned without contacting the
+        IDM.
+
+        Returns:
+            - the current token.
+        """
+        with self._lock:
+            _token, _renew_at, _ = self._current
+            if (_token is not None and _token != stale_token and
+                    not self._stale(_renew_at)):
+                return _token
+
+            _token, _expires = fetch_auth_token(
+                self._host, self._port, self._user, self._password,
+                self._session)
+
+            # tokens shorter lived than the margin are renewed halfway
+            _now = datetime.now(timezone.utc)
+            _renew_at = _expires - min(self._refresh_margin,
+                                       (_expires - _now) / 2)
+            self._current = (_token, _renew_at, _expires)
+            self._refreshes += 1
+            self._logger.debug('IDM token renewed, expires at %s',
+                               _expires.isoformat())
+
+            return _token
+
+    @property
+    def token(self):
+        """Gets a valid token, requesting or renewing it if needed."""
+        _token, _renew_at, _ = self._current
+        if _token is None or self._stale(_renew_at):
+            _token = self.refresh(_token)
+            self._start()
+        elif self._restart:
+            self._start()
+        return _token
+
+    @property
+    def expires(self):
+        """Gets the expiration datetime of the current token, if any."""
+        return self._current[2]
+
+    @property
+    def refreshes(self):
+        """Gets the number of times a token has been requested."""
+        return self._refreshes
+
+    def close(self):
+        """
+        Stops the background renewal, if running. The instance can still be
+        used: the renewal is started again on the next use of the token.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._restart = True
+        self._stop.clear()
+
+    def __repr__(self):
+        return (f"<IDMCredentials user: \"{self._user}\", "
+                f"expires: {self.expires}>")
@@ -0,0 +1,66 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.forksafe
+
+Reinitialization of the pykeyrock objects in the forked child processes.
+
+A child process inherits the memory of its parent but only the thread that
+called fork(): the locks held by the other threads stay locked forever, the
+background threads are gone and the pooled sockets are shared with the
+parent. The objects that own such resources register here and their
+'_after_fork' method is called in the child, right after the fork.
+"""
+
+import logging
+import os
+import weakref
+
+_objects = weakref.WeakSet()
+_pid = os.getpid()
+
+
+def register(obj):
+    """
+    Registers 'obj', whose '_after_fork' method is called without arguments
+    in the child processes. Only a weak reference to 'obj' is kept.
+    """
+    _objects.add(obj)
+
+
+def _reinit():
+    global _pid
+    _pid = os.getpid()
+    for _obj in list(_objects):
+        try:
+            _obj._after_fork()
+        except Exception:
+            logging.getLogger('keyrock').exception(
+                'unable to reinitialize %r after fork', _obj)
+
+
+def check():
+    """
+    Reinitializes the registered objects if the process id has changed since
+    the last check, i.e. the process was forked without running the
+    os.register_at_fork handlers (e.g. by an extension module).
+    """
+    if os.getpid() != _pid:
+        _reinit()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit)
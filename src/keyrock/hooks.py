@@ -0,0 +1,171 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.hooks
+
+Request hooks of the IDM managers.
+"""
+
+from urllib.parse import urlsplit
+import logging
+
+HOOK_EVENTS = ('before_request', 'after_response', 'on_error')
+
+# The placeholders of the ids that follow each collection in the IDM paths.
+_PLACEHOLDERS = {
+    'applications': 'application_id',
+    'organizations': 'organization_id',
+    'users': 'user_id',
+    'roles': 'role_id',
+    'permissions': 'permission_id',
+    'organization_roles': 'organization_role'
+}
+
+
+def url_template(url: str):
+    """
+    Splits the path of an IDM URL into a template and its parameters, e.g.
+    'http://idm:3005/v1/applications/abc/roles' into
+    ('/v1/applications/{application_id}/roles', {'application_id': 'abc'}).
+    """
+    _segments = urlsplit(url).path.split('/')
+    _params = dict()
+    for _index in range(1, len(_segments)):
+        _name = _PLACEHOLDERS.get(_segments[_index - 1])
+        if _name is not None:
+            _params[_name] = _segments[_index]
+            _segments[_index] = '{' + _name + '}'
+    return '/'.join(_segments), _params
+
+
+class IDMCall(object):
+    """
+    This class represents a request sent to the IDM by a manager method, as
+    seen by the hooks. The same instance is passed to all the hooks of a
+    request, so 'context' can carry data (e.g. a tracing span) from the
+    'before_request' hooks to the 'after_response' and 'on_error' ones.
+
+    Attributes:
+        operation: the name of the manager method, e.g. 'get_role'.
+        method: the HTTP method.
+        url: the requested URL.
+        url_template: the path of the URL with the ids replaced by
+            placeholders, e.g. '/v1/applications/{application_id}/roles'.
+        params: the ids replaced in 'url_template', by placeholder name.
+        elapsed: the number of seconds the request took (None before the
+            request is sent).
+        status: the HTTP status code of the response (None if there is no
+            response).
+        response: the response object (None if there is no response).
+        error: the exception raised by the request, for 'on_error' hooks.
+        context: a dictionary reserved to the hooks.
+    """
+    __slots__ = ('operation', 'method', 'url', 'url_template', 'params',
+                 'elapsed', 'status', 'response', 'error', 'context',
+                 '_decode')
+
+    def __init__(self, operation: str, method: str, url: str, decode=None):
+        self.operation = operation
+        self.method = method
+        self.url = url
+        self.url_template, self.params = url_template(url)
+        self.elapsed = None
+        self.status = None
+        self.response = None
+        self.error = None
+        self.context = dict()
+        self._decode = decode
+
+    @property
+    def result(self):
+        """
+        Gets the decoded JSON body of the response, or None if there is no
+        response, it has no JSON body or it is streamed. The body is decoded
+        only if this property is accessed, and only once.
+        """
+        if self.response is None or self._decode is None:
+            return None
+        try:
+            return self._decode(self.response)
+        except ValueError:
+            return None
+
+    def __repr__(self):
+        return (f"<IDMCall {self.operation} {self.method} "
+                f"{self.url_template} status: {self.status}>")
+
+
+class IDMHooks(object):
+    """
+    This class represents the hooks registered on a manager, as lists of
+    callables by event:
+
+    - 'before_request': called with an IDMCall before the request is sent;
+    - 'after_response': called when a response is received, whatever its
+      status code;
+    - 'on_error': called when the request raises an exception, e.g. a
+      connection error.
+
+    An exception raised by a hook is logged and does not stop the request.
+
+    Args:
+        hooks:
+            a dictionary of event and callable, or list of callables.
+    """
+    def __init__(self, hooks: dict = None):
+        self._hooks = {_event: list() for _event in HOOK_EVENTS}
+        self.enabled = False
+        self._logger = logging.getLogger('keyrock.IDMManager')
+
+        for _event, _hooks in (hooks or {}).items():
+            if not isinstance(_hooks, (list, tuple)):
+                _hooks = [_hooks]
+            for _hook in _hooks:
+                self.add(_event, _hook)
+
+    def _list(self, event: str):
+        try:
+            return self._hooks[event]
+        except KeyError:
+            raise ValueError(f"Unknown hook event: {event}") from None
+
+    # The lists are replaced, not modified, so that a dispatch running in
+    # another thread is not affected.
+    def add(self, event: str, hook):
+        """Registers 'hook' for 'event'."""
+        self._hooks[event] = self._list(event) + [hook]
+        self.enabled = True
+
+    def remove(self, event: str, hook):
+        """
+        Unregisters 'hook' for 'event'.
+
+        Raises:
+            ValueError if the hook is not registered.
+        """
+        _hooks = list(self._list(event))
+        _hooks.remove(hook)
+        self._hooks[event] = _hooks
+        self.enabled = any(self._hooks.values())
+
+    def dispatch(self, event: str, call: IDMCall):
+        """Calls the hooks registered for 'event' with 'call'."""
+        for _hook in self._hooks[event]:
+            try:
+                _hook(call)
+            except Exception:
+                self._logger.exception(
+                    '%s hook %r failed on %s()', event, _hook, call.operation)
@@ -14,14 +14,32 @@
 #  limitations under the License.
 
 from .models import IDMApplication, IDMOrganization, IDMProxy, IDMUser, IDMRole
-from .models import IDMPermission
-import dateutil.parser
+from .models import IDMPermission, LazyIDMPermission, LazyIDMRole
+from .codec import JSONCodec, decode_response, get_codec
+from .bulk import BulkOperation
+from .cache import IDMCache, IDMOAuth2TokenCache, IDMTokenCache
+from .credentials import IDMCredentials, fetch_auth_token
+from . import forksafe
+from .hooks import IDMCall, IDMHooks
+from .index import IDMIndex
+from .metrics import IDMMetrics
+from .retry import CircuitBreaker, RetryPolicy
+from .singleflight import SingleFlight
+from .stream import iter_json_array
+from .table import UserTable
 import enum
-import inspect
-import json
+import hashlib
 import logging
 import requests
+import requests.adapters
+import threading
+import time
 from http.client import responses
+from typing import Union
+
+
+# size of the chunks read from the socket by the iter_* methods
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class IDMQuery(enum.Enum):
@@ -30,84 +48,639 @@ class IDMQuery(enum.Enum):
     BY_LOGIN = 2
 
 
-def get_auth_token(host: str, port: int, user: str, password: str):
-    url = f"http://{host}:{port}/v1/auth/tokens"
-    payload = {
-        "name": user,
-        "password": password
-    }
+def create_session(pool_connections: int = 10, pool_maxsize: int = 10,
+                   keep_alive: bool = True):
+    """
+    Creates a requests Session backed by a persistent connection pool. The
+    session can be shared between an IDMManager instance and the module level
+    functions (get_auth_token, get_token_info, check_auth_token).
 
-    headers = {
-        'Content-Type': 'application/json',
-    }
+    Args:
+        pool_connections (int): the number of per-host connection pools to
+            cache (default: 10).
+        pool_maxsize (int): the maximum number of connections kept open
+            towards the same host (default: 10).
+        keep_alive (bool): if False, the connections are closed after each
+            request (default: True).
 
-    response = requests.request(
-        "POST", url, headers=headers, data=json.dumps(payload))
-    response.raise_for_status()
+    Returns:
+        - the requests Session object.
+    """
+    _adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize)
 
-    expires = dateutil.parser.isoparse(response.json()['token']['expires_at'])
-    expires = expires.strftime("%c")
+    _session = requests.Session()
+    _session.mount('http://', _adapter)
+    _session.mount('https://', _adapter)
+    if not keep_alive:
+        _session.headers['Connection'] = 'close'
 
-    token = response.headers['X-Subject-Token']
+    return _session
 
-    return(token, expires)
 
+def get_auth_token(host: str, port: int, user: str, password: str,
+                   session: requests.Session = None):
+    token, expires = fetch_auth_token(host, port, user, password, session)
+    expires = expires.strftime("%c")
+
+    return(token, expires)
 
-def get_token_info(host: str, port: int, auth_token: str, subj_token: str):
-    url = f"http://{host}:{port}/v1/auth/tokens"
 
+def _get_token_info(url: str, auth_token: str, subj_token: str,
+                    session: requests.Session = None):
     headers = {
         'Content-Type': 'application/json',
         'X-Auth-token': auth_token,
         'X-Subject-token': subj_token
     }
 
-    response = requests.request("GET", url, headers=headers)
+    response = (session or requests).request("GET", url, headers=headers)
     response.raise_for_status()
 
-    return response.json()
+    return decode_response(response)
 
 
-def check_auth_token(host: str, port: int, auth_token: str, subj_token: str):
-    _token_info = get_token_info(host, port, auth_token, subj_token)
+def get_token_info(host: str, port: int, auth_token: str, subj_token: str,
+                   session: requests.Session = None,
+                   cache: IDMTokenCache = None,
+                   single_flight: SingleFlight = None):
+    url = f"http://{host}:{port}/v1/auth/tokens"
+
+    # the IDM answers 401 when the authentication token is not valid: the
+    # results are cached per authentication token, so that a stale one does
+    # not affect the others
+    if cache is not None:
+        return cache.get(
+            (host, port, auth_token, subj_token),
+            lambda: _get_token_info(url, auth_token, subj_token, session))
+
+    # the concurrent lookups of the same token share a single request
+    if single_flight is not None:
+        return single_flight.do(
+            ('token_info', url, auth_token, subj_token), _get_token_info,
+            url, auth_token, subj_token, session)
+
+    return _get_token_info(url, auth_token, subj_token, session)
+
+
+def check_auth_token(host: str, port: int, auth_token: str, subj_token: str,
+                     session: requests.Session = None,
+                     cache: IDMTokenCache = None,
+                     single_flight: SingleFlight = None):
+    _token_info = get_token_info(
+        host, port, auth_token, subj_token, session, cache, single_flight)
     return(_token_info['valid'] and _token_info['User']['enabled'], _token_info['User']['admin'])
 
 
 class IDMManager(object):
-    def __init__(self, host: str, port: int, auth_token: str):
+    """
+    This class manages the resources of a Keyrock IDM instance.
+
+    All the requests are sent through a persistent, keep-alive connection
+    pool that is owned by the instance; the instance can be used as a context
+    manager, or closed with the 'close' method, to release the pooled
+    connections.
+
+    An instance is thread-safe and is meant to be shared by the threads of a
+    process: the caches, the indexes, the metrics, the hooks and the token
+    renewal are synchronized, and the threads share the connection pool
+    (whose 'pool_maxsize' should match the number of threads) or, with
+    'per_thread_session', use one session each. 'close' must be called when
+    no request is in flight.
+
+    An instance can also be created before forking worker processes, e.g.
+    at import time by an application preloaded by a pre-forking server. In
+    a child process the connections pooled by the parent are dropped and the
+    sessions created by the instance are replaced with new ones, the locks
+    are replaced, the token renewal of IDMCredentials is started again, and
+    the caches and the indexes keep the entries loaded by the parent, unless
+    created with 'keep_on_fork=False'. A session passed with 'session' is
+    not replaced: it must not be used by both processes.
+
+    Args:
+        host: the IDM host name.
+        port: the IDM port.
+        auth_token: the IDM authentication token (see 'get_auth_token') or an
+            IDMCredentials instance that renews it before the expiration; in
+            the latter case a request rejected with 401 is sent again, once,
+            with a renewed token.
+        pool_connections: the number of per-host connection pools to cache
+            (default: 10).
+        pool_maxsize: the maximum number of connections kept open towards the
+            IDM (default: 10).
+        keep_alive: if False, the connections are closed after each request
+            (default: True).
+        session: an existing requests Session to use instead of creating a
+            new one; the pool options are ignored and the session is not
+            closed by the 'close' method.
+        per_thread_session: if True, each thread sends its requests through
+            its own session, created on first use with the pool options and
+            closed by the 'close' method, instead of sharing one; it cannot
+            be used with 'session' (default: False).
+        indexes: if True, the lookups by login of the users and by name of
+            the organizations, applications and roles are served by local
+            indexes built from the IDM listings and updated by the create and
+            delete methods of the instance; a lookup raises HTTPError if the
+            listing fails (default: False).
+        index_ttl: the number of seconds after which the local indexes are
+            rebuilt; None means never (default: 300).
+        cache: an IDMCache instance used to cache the results of
+            get_application, get_role, get_permission and get_user (by id);
+            the entries are invalidated by the mutating methods of the
+            instance (default: None, no caching).
+        oauth2_cache: an IDMOAuth2TokenCache instance used to reuse the
+            tokens returned by get_oauth2_token until they are about to
+            expire (default: None, no caching).
+        keep_dicts: if False, the returned entities do not keep the
+            dictionaries they are built from, which reduces the memory used
+            by large listings; their 'dict' property is then rebuilt from the
+            known attributes (default: True).
+        lazy_models: if True, the roles and the permissions returned by the
+            list methods keep the dictionaries they are built from and read
+            their attributes only when accessed (see LazyIDMRole and
+            LazyIDMPermission), so that the cost of a large listing depends
+            on the attributes actually used; it overrides 'keep_dicts' for
+            those methods (default: False).
+        codec: the JSON codec used to encode the requests and decode the
+            responses: 'json' (standard library), 'orjson', a JSONCodec
+            instance or None for the fastest installed (default: None). Each
+            response body is decoded once and the result is shared by the
+            logging and the model construction.
+        metrics: an IDMMetrics instance that records the count, the status
+            codes, the bytes and the latency of the requests sent by each
+            method (default: None, no metrics).
+        hooks: a dictionary of event ('before_request', 'after_response' or
+            'on_error') and callable, or list of callables, called with an
+            IDMCall around each request (see 'add_hook').
+        retry: a RetryPolicy used to send again the requests that fail for
+            transient reasons (connection errors, 429, 502, 503, 504), with
+            jittered exponential backoff (default: None, no retries).
+        circuit_breaker: a CircuitBreaker that makes the requests fail
+            immediately, with CircuitOpenError, while the IDM keeps failing
+            (default: None).
+        single_flight: a SingleFlight instance that coalesces the concurrent
+            identical GET requests (same URL and headers): while one is in
+            flight, the others wait for it and share its response, or its
+            exception; the entities returned to the waiting callers are
+            built from the same decoded body, which must not be modified
+            (default: None, no coalescing). The streamed listings (iter_*)
+            are not coalesced.
+    """
+    def __init__(self, host: str, port: int,
+                 auth_token: Union[str, IDMCredentials],
+                 pool_connections: int = 10, pool_maxsize: int = 10,
+                 keep_alive: bool = True, session: requests.Session = None,
+                 indexes: bool = False, index_ttl: float = 300,
+                 cache: IDMCache = None,
+                 oauth2_cache: IDMOAuth2TokenCache = None,
+                 keep_dicts: bool = True, lazy_models: bool = False,
+                 codec: Union[str, JSONCodec] = None,
+                 metrics: IDMMetrics = None, hooks: dict = None,
+                 retry: RetryPolicy = None,
+                 circuit_breaker: CircuitBreaker = None,
+                 single_flight: SingleFlight = None,
+                 per_thread_session: bool = False):
+        if per_thread_session and session is not None:
+            raise ValueError(
+                "'per_thread_session' cannot be used with 'session'")
+
         self._host = host
         self._port = port
         self._idm_url = f"http://{host}:{port}"
-        self._auth_token = auth_token
+        if isinstance(auth_token, IDMCredentials):
+            self._credentials = auth_token
+            self._static_token = None
+        else:
+            self._credentials = None
+            self._static_token = auth_token
+
+        self._owns_session = session is None
+        self._pool_options = (pool_connections, pool_maxsize, keep_alive)
+        self._sessions_lock = threading.Lock()
+        if per_thread_session:
+            self._session = None
+            self._local = threading.local()
+            self._sessions = list()
+        else:
+            self._session = session or create_session(*self._pool_options)
+            self._local = None
+
+        self._cache = cache
+        self._oauth2_cache = oauth2_cache
+        self._keep_dicts = keep_dicts
+        self._lazy_models = lazy_models
+        self._codec = get_codec(codec)
+        self._metrics = metrics
+        self._hooks = IDMHooks(hooks)
+        self._retry = retry
+        self._breaker = circuit_breaker
+        self._flights = single_flight
+
+        self._index_ttl = index_ttl
+        self._user_index = None
+        self._org_index = None
+        self._app_index = None
+        self._role_indexes = None
+        if indexes:
+            # the streamed listings raise on errors, that would otherwise
+            # build empty indexes
+            self._user_index = IDMIndex(
+                self.iter_users, lambda _user: _user.login, index_ttl)
+            self._org_index = IDMIndex(
+                self.iter_organizations, lambda _org: _org.name, index_ttl)
+            self._app_index = IDMIndex(
+                self.iter_applications, lambda _app: _app.name, index_ttl)
+            self._role_indexes = dict()
 
         self._logger = logging.getLogger('keyrock.IDMManager')
         self._logger.debug(
             'creating an instance of IDMManager (%s, %s)',
-            self._idm_url, self._auth_token)
+            self._idm_url, self._credentials or self._static_token)
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        # The pooled sockets are shared with the parent process: the
+        # sessions are dropped without being closed, their connections are
+        # closed in the child only when they are garbage collected.
+        self._sessions_lock = threading.Lock()
+        if self._local is not None:
+            self._local = threading.local()
+            self._sessions = list()
+        elif self._owns_session:
+            self._session = create_session(*self._pool_options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def _auth_token(self):
+        # every request starts here: a fork that did not run the handlers of
+        # os.register_at_fork is detected by the change of the process id
+        forksafe.check()
+        if self._credentials is not None:
+            return self._credentials.token
+        return self._static_token
+
+    @property
+    def session(self):
+        """
+        Gets the requests Session used by the instance, or by the calling
+        thread with 'per_thread_session' (it can be passed to the module
+        level functions to share the connection pool).
+        """
+        if self._local is None:
+            return self._session
+
+        _session = getattr(self._local, 'session', None)
+        if _session is None:
+            _session = create_session(*self._pool_options)
+            self._local.session = _session
+            with self._sessions_lock:
+                self._sessions.append(_session)
+        return _session
+
+    def close(self):
+        """
+        Releases the pooled connections. The session is closed only if it was
+        created by the instance.
+        """
+        if self._local is not None:
+            with self._sessions_lock:
+                _sessions, self._sessions = self._sessions, list()
+                self._local = threading.local()
+            for _session in _sessions:
+                _session.close()
+        elif self._owns_session:
+            self._session.close()
+
+    @property
+    def index_stats(self):
+        """
+        Gets the statistics of the local indexes, as a dictionary of index
+        name and statistics ('hits', 'misses', 'rebuilds' and 'size'). It is
+        empty if the indexes are not enabled.
+        """
+        _stats = dict()
+        if self._user_index is not None:
+            _stats['users_by_login'] = self._user_index.stats
+            _stats['organizations_by_name'] = self._org_index.stats
+            _stats['applications_by_name'] = self._app_index.stats
+
+            # the per-application role indexes are reported as a whole
+            _role_stats = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'size': 0}
+            for _index in list(self._role_indexes.values()):
+                for _key, _value in _index.stats.items():
+                    _role_stats[_key] += _value
+            _stats['roles_by_name'] = _role_stats
+        return _stats
+
+    def refresh_indexes(self):
+        """
+        Rebuilds the local indexes, if enabled, from the IDM. The role
+        indexes are rebuilt only for the applications already looked up.
+
+        Raises:
+            HTTPError if a listing fails; the index is left as it was.
+        """
+        if self._user_index is not None:
+            self._user_index.refresh()
+            self._org_index.refresh()
+            self._app_index.refresh()
+            for _index in list(self._role_indexes.values()):
+                _index.refresh()
+
+    def _role_index(self, application_id: str):
+        _index = self._role_indexes.get(application_id)
+        if _index is None:
+            _index = self._role_indexes.setdefault(
+                application_id,
+                IDMIndex(lambda: self._iter_roles(application_id),
+                         lambda _role: _role.name, self._index_ttl))
+        return _index
+
+    def _iter_roles(self, application_id: str):
+        # Yields the roles of the application; unlike list_roles the errors
+        # are raised, so that they do not build an empty role index.
+        url = f"{self._idm_url}/v1/applications/{application_id}/roles"
+        for _role in self._iter_listing('list_roles', url, 'roles'):
+            yield self._listed_role(_role, application_id)
+
+    @property
+    def cache(self):
+        """Gets the IDMCache used by the instance, if any."""
+        return self._cache
+
+    @property
+    def metrics(self):
+        """Gets the IDMMetrics used by the instance, if any."""
+        return self._metrics
+
+    @property
+    def single_flight(self):
+        """Gets the SingleFlight used by the instance, if any."""
+        return self._flights
+
+    def add_hook(self, event: str, hook):
+        """
+        Registers a callable that is called with an IDMCall (operation name,
+        method, URL template and parameters, elapsed time, status code and
+        decoded result) around each request sent to the IDM:
+
+        - 'before_request': before the request is sent;
+        - 'after_response': after a response is received, whatever its
+          status code;
+        - 'on_error': after the request raised an exception.
+
+        The hooks are called in the thread of the request; an exception
+        raised by a hook is logged and ignored.
+
+        Raises:
+            ValueError if 'event' is not valid.
+        """
+        self._hooks.add(event, hook)
+
+    def remove_hook(self, event: str, hook):
+        """
+        Unregisters a hook registered with 'add_hook'.
+
+        Raises:
+            ValueError if the hook is not registered.
+        """
+        self._hooks.remove(event, hook)
+
+    def _cache_response(self, key: tuple, value, response):
+        # Only the found entities and the missing ones (404) are cached.
+        if self._cache is None:
+            return
+        if response.status_code == requests.codes.ok:
+            self._cache.put(key, value)
+        elif response.status_code == requests.codes.not_found:
+            self._cache.put_missing(key)
+
+    def _invalidate(self, *key):
+        if self._cache is not None:
+            self._cache.invalidate(*key)
+
+    def _request(self, operation: str, method: str, url: str, **kwargs):
+        """
+        Sends a request to the IDM through the pooled session and logs the
+        response on behalf of 'operation', the name of the calling method.
+        """
+        if (self._flights is not None and method == "GET" and
+                not kwargs.get('stream')):
+            _key = (url,
+                    tuple(sorted((kwargs.get('headers') or {}).items())),
+                    tuple(sorted((kwargs.get('params') or {}).items())))
+            return self._flights.do(
+                _key, self._observed_request, operation, method, url,
+                **kwargs)
+        return self._observed_request(operation, method, url, **kwargs)
+
+    def _observed_request(self, operation: str, method: str, url: str,
+                          **kwargs):
+        if not self._hooks.enabled:
+            return self._renewing_request(operation, method, url, **kwargs)
+
+        _call = IDMCall(operation, method, url,
+                        None if kwargs.get('stream') else self._json)
+        self._hooks.dispatch('before_request', _call)
+        _start = time.perf_counter()
+        try:
+            response = self._renewing_request(
+                operation, method, url, **kwargs)
+        except Exception as _error:
+            _call.elapsed = time.perf_counter() - _start
+            _call.error = _error
+            self._hooks.dispatch('on_error', _call)
+            raise
+        _call.elapsed = time.perf_counter() - _start
+        _call.status = response.status_code
+        _call.response = response
+        self._hooks.dispatch('after_response', _call)
+        return response
+
+    def _renewing_request(self, operation: str, method: str, url: str,
+                          **kwargs):
+        response = self._retrying_send(operation, method, url, **kwargs)
+        self._log_response(operation, response)
+
+        # An expired or revoked token is renewed and the request is sent
+        # again, only once.
+        _headers = kwargs.get('headers') or {}
+        if (response.status_code == requests.codes.unauthorized and
+                self._credentials is not None and
+                'X-Auth-token' in _headers):
+            kwargs['headers'] = dict(_headers)
+            kwargs['headers']['X-Auth-token'] = self._credentials.refresh(
+                _headers['X-Auth-token'])
+            response.close()
+            response = self._retrying_send(operation, method, url, **kwargs)
+            self._log_response(operation, response)
+
+        return response
+
+    def _retrying_send(self, operation: str, method: str, url: str,
+                       **kwargs):
+        # Sends a request through the circuit breaker, if any, and sends it
+        # again on the transient failures allowed by the retry policy.
+        if self._retry is None and self._breaker is None:
+            return self._send(operation, method, url, **kwargs)
+
+        _attempt = 0
+        while True:
+            if self._breaker is not None:
+                self._breaker.before_request(self._idm_url)
+            try:
+                response = self._send(operation, method, url, **kwargs)
+            except requests.RequestException as _error:
+                if self._breaker is not None:
+                    self._breaker.record(self._idm_url, False)
+                _delay = None if self._retry is None else \
+                    self._retry.retry_error(operation, method, _error,
+                                            _attempt)
+                if _delay is None:
+                    raise
+                _reason = type(_error).__name__
+            else:
+                if self._breaker is not None:
+                    self._breaker.record_response(self._idm_url, response)
+                _delay = None if self._retry is None else \
+                    self._retry.retry_response(operation, method, response,
+                                               _attempt)
+                if _delay is None:
+                    return response
+                _reason = response.status_code
+                response.close()
+
+            self._logger.warning(
+                '%s() - %s %s failed (%s), retry %d in %.2f seconds',
+                operation, method, url, _reason, _attempt + 1, _delay)
+            time.sleep(_delay)
+            _attempt += 1
+
+    def _send(self, operation: str, method: str, url: str, **kwargs):
+        # Sends a request and records it in the metrics, if enabled.
+        if self._metrics is None:
+            return self.session.request(method, url, **kwargs)
+
+        _start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._metrics.record(operation, 0, time.perf_counter() - _start)
+            raise
+        _elapsed = time.perf_counter() - _start
+
+        # the body of a streamed response is not read yet: its size is
+        # taken from the headers, which may lack it (e.g. chunked responses)
+        if kwargs.get('stream'):
+            _size = int(response.headers.get('Content-Length') or 0)
+        else:
+            _size = len(response.content)
+        _body = response.request.body
+        self._metrics.record(
+            operation, response.status_code, _elapsed, _size,
+            len(_body) if _body else 0)
+        return response
+
+    def _json(self, response):
+        # Decodes the response body, only once.
+        return decode_response(response, self._codec)
+
+    def _listed_role(self, role_dict: dict, application_id: str):
+        if self._lazy_models:
+            return LazyIDMRole(role_dict, application_id)
+        return IDMRole(role_dict=role_dict, application_id=application_id,
+                       keep_dict=self._keep_dicts)
+
+    def _listed_permission(self, permission_dict: dict, application_id: str):
+        if self._lazy_models:
+            return LazyIDMPermission(permission_dict, application_id)
+        return IDMPermission(permission_dict=permission_dict,
+                             application_id=application_id,
+                             keep_dict=self._keep_dicts)
+
+    def _iter_listing(self, operation: str, url: str, key: str):
+        # Yields the items of a listing while the response is received.
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Auth-token': self._auth_token
+        }
+        response = self._request(
+            operation, "GET", url, headers=headers, stream=True)
+
+        with response:
+            if response.status_code == requests.codes.ok:
+                yield from iter_json_array(
+                    response.iter_content(STREAM_CHUNK_SIZE), key)
+            elif response.status_code != requests.codes.not_found:
+                response.raise_for_status()
+
+    def _log_response(self, operation: str, response):
+        _level = logging.DEBUG if response.status_code < 400 else logging.ERROR
+
+        # Nothing is computed unless the message is going to be emitted: the
+        # package logger is set to CRITICAL by default.
+        if not self._logger.isEnabledFor(_level):
+            return
 
-    def _log_response(self, response):
-        _func_name = inspect.stack()[1].function
         _http_ver = ('HTTP/1.1' if
                      response.raw.version == 11 else 'HTTP/1.0')
-        _level = logging.DEBUG if response.status_code < 400 else logging.ERROR
 
         if response.status_code < 400:
             _reason = ""
-        elif 'error' in response.json():
-            _reason = f"\"{response.json()['error']['message']}\""
         else:
-            _reason = f"\"{response.json()}\""
+            try:
+                _body = self._json(response)
+            except ValueError:
+                _body = response.text
+            if isinstance(_body, dict) and 'error' in _body:
+                _reason = f"\"{_body['error']['message']}\""
+            else:
+                _reason = f"\"{_body}\""
 
         self._logger.log(
-            _level,
-            (f'{_func_name}() - '
-             f'{self._idm_url} "{response.request.method} '
-             f'{response.request.path_url} {_http_ver}" '
-             f'{response.status_code} "{responses[response.status_code]}": '
-             f'{_reason}'))
+            _level, '%s() - %s "%s %s %s" %s "%s": %s',
+            operation, self._idm_url, response.request.method,
+            response.request.path_url, _http_ver, response.status_code,
+            responses.get(response.status_code, ''), _reason)
 
     def get_oauth2_token(self, user: str, password: str,
                          application_secret: str, permanent: bool):
+        """
+        Requests an OAuth2 access token for the user with the password grant.
+        If an IDMOAuth2TokenCache is set, a cached token of the same user and
+        application is returned while it is still valid.
+
+        Args:
+            user (str): the user's login.
+            password (str): the user's password.
+            application_secret (str): the base64 encoded
+                'client_id:client_secret' of the application.
+            permanent (bool): whether to request a permanent token.
+
+        Returns:
+            - a (token, expires) tuple, where 'expires' is the number of
+              seconds the token is valid or 'permanent'.
+        """
+        if self._oauth2_cache is not None:
+            # the password is part of the key, so that a wrong one is not
+            # accepted because of a cached token
+            _key = (user, hashlib.sha256(password.encode()).hexdigest(),
+                    application_secret, permanent)
+            return self._oauth2_cache.get(
+                _key, lambda: self._request_oauth2_token(
+                    user, password, application_secret, permanent))
+
+        return self._request_oauth2_token(
+            user, password, application_secret, permanent)
+
+    def _request_oauth2_token(self, user: str, password: str,
+                              application_secret: str, permanent: bool):
         url = f"{self._idm_url}/oauth2/token"
         payload = {
             "username": user,
@@ -124,21 +697,21 @@ class IDMManager(object):
             'Accept': 'application/json'
         }
 
-        response = requests.request(
-            "POST", url, headers=headers, data=payload)
-        self._log_response(response)
+        response = self._request(
+            'get_oauth2_token', "POST", url, headers=headers, data=payload)
         response.raise_for_status()
 
-        _token = response.json()['access_token']
+        _json = self._json(response)
+        _token = _json['access_token']
+        _expires = None
 
-        if 'expires_in' in response.json():
-            _expires = response.json()['expires_in']
-        elif 'permanent' in response.json()['scope']:
+        if 'expires_in' in _json:
+            _expires = _json['expires_in']
+        elif 'permanent' in _json.get('scope', ''):
             _expires = 'permanent'
 
         return (_token, _expires)
 
-
     ###########################################################################
     # ORGANIZATIONS section
     ###########################################################################
@@ -150,6 +723,8 @@ class IDMManager(object):
         'IDMQuery.BY_UID' the 'organization_id' parameter is searched by name.
         Warning: in this way more than one organization can exist with the same
         name.
+        If the local indexes are enabled, the lookups by name are served by
+        the index and do not query the IDM.
 
         Args:
             organization_id (str): The organization id.
@@ -164,6 +739,7 @@ class IDMManager(object):
         Raises:
             - ValueError if the 'query_type' is not equal to IDMQuery.BY_UID or
                          IDMQuery.BY_NAME.
+            - HTTPError if the local index of the organizations cannot be built.
 
         Reference:
             https://keyrock.docs.apiary.io/#reference/keyrock-api/organization/read-info-about-an-organization
@@ -174,17 +750,29 @@ class IDMManager(object):
                 'Content-Type': 'application/json',
                 'X-Auth-token': self._auth_token
             }
-            response = requests.request("GET", url, headers=headers)
-            self._log_response(response)
+            response = self._request(
+                'get_organization', "GET", url, headers=headers)
 
             if response.status_code == requests.codes.ok:
                 _organization = IDMOrganization(
-                    org_dict=response.json()['organization'])
+                    org_dict=self._json(response)['organization'],
+                    keep_dict=self._keep_dicts)
             else:
                 _organization = None
 
             return _organization
 
+        elif (query_type == IDMQuery.BY_NAME and
+              self._org_index is not None):
+            org_list = self._org_index.lookup(organization_id)
+
+            if len(org_list) > 1:
+                self._logger.warning(
+                    'multiple organization with the name "%s" found',
+                    organization_id)
+
+            return org_list
+
         elif query_type == IDMQuery.BY_NAME:
             orgs = self.list_organizations()
             org_list = list()
@@ -212,17 +800,34 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_organizations', "GET", url, headers=headers)
 
         _org_list = list()
         if response.status_code == requests.codes.ok:
-            for _org in response.json()['organizations']:
+            for _org in self._json(response)['organizations']:
                 _org_list.append(
-                    IDMOrganization(org_dict=_org['Organization']))
+                    IDMOrganization(org_dict=_org['Organization'],
+                                    keep_dict=self._keep_dicts))
 
         return _org_list
 
+    def iter_organizations(self):
+        """
+        Iterates over all the organizations in the IDM. Unlike
+        'list_organizations', the response is parsed while it is received
+        and the organizations are yielded one at a time, so the memory used
+        does not depend on their number.
+
+        Yields:
+            - IDMOrganization objects.
+        """
+        url = f"{self._idm_url}/v1/organizations"
+        for _org in self._iter_listing(
+                'iter_organizations', url, 'organizations'):
+            yield IDMOrganization(org_dict=_org['Organization'],
+                                  keep_dict=self._keep_dicts)
+
     def delete_organization(self, organization_id: str):
         """
         Deletes the organizations with the given id, if exist.
@@ -242,11 +847,14 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'delete_organization', "DELETE", url, headers=headers)
 
         response.raise_for_status()
 
+        if self._org_index is not None:
+            self._org_index.discard(organization_id)
+
     def create_organization(self, name, description: str = None):
         """
         Creates a new organization.
@@ -277,15 +885,20 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request(
-            "POST", url, headers=headers, data=json.dumps(payload))
-        self._log_response(response)
+        response = self._request(
+            'create_organization', "POST", url, headers=headers,
+            data=self._codec.dumps(payload))
         response.raise_for_status()
 
         self._logger.info(
             "IDM organizzation \"%s\" created", name)
-        return IDMOrganization(
-            name, response.json()['organization'])
+        _organization = IDMOrganization(
+            name, self._json(response)['organization'],
+            keep_dict=self._keep_dicts)
+        if self._org_index is not None:
+            self._org_index.add(_organization)
+
+        return _organization
 
     def update_organization(self, organization_id: str):
         raise NotImplementedError()
@@ -304,12 +917,12 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_organization_members', "GET", url, headers=headers)
 
         _user_list = list()
         if response.status_code == requests.codes.ok:
-            for _user in response.json()['organization_users']:
+            for _user in self._json(response)['organization_users']:
                 _user_list.append(_user)
 
         return _user_list
@@ -338,8 +951,8 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request("PUT", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'add_user_to_organization', "PUT", url, headers=headers)
         response.raise_for_status()
 
         self._logger.info(("IDM user \"%s\" associated to \"%s\" "
@@ -372,8 +985,8 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'remove_user_from_organization', "DELETE", url, headers=headers)
 
         response.raise_for_status()
 
@@ -396,11 +1009,11 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'get_organization_member', "GET", url, headers=headers)
 
         if response.status_code == requests.codes.ok:
-            _membership = response.json()['organization_user']
+            _membership = self._json(response)['organization_user']
         else:
             _membership = None
 
@@ -417,6 +1030,8 @@ class IDMManager(object):
         'IDMQuery.BY_UID' the 'application_id' parameter is searched by name.
         Warning: in this way more than one application can exist with the same
         name.
+        If the local indexes are enabled, the lookups by name are served by
+        the index and do not query the IDM.
 
         Args:
             application_id (str): The application id.
@@ -431,30 +1046,50 @@ class IDMManager(object):
         Raises:
             - ValueError if the 'query_type' is not equal to IDMQuery.BY_UID or
                          IDMQuery.BY_NAME.
+            - HTTPError if the local index of the applications cannot be built.
 
         References:
             https://keyrock.docs.apiary.io/reference/keyrock-api/applications/list-applications
             https://keyrock.docs.apiary.io/reference/keyrock-api/application/read-application-details
         """
         if query_type == IDMQuery.BY_UID:
+            _key = ('application', str(application_id))
+            if self._cache is not None:
+                _hit, _application = self._cache.get(_key)
+                if _hit:
+                    return _application
+
             url = f"{self._idm_url}/v1/applications/{application_id}"
             headers = {
                 'Content-Type': 'application/json',
                 'X-Auth-token': self._auth_token
             }
-            response = requests.request("GET", url, headers=headers)
-            self._log_response(response)
+            response = self._request(
+                'get_application', "GET", url, headers=headers)
 
             if response.status_code == requests.codes.ok:
                 _application = IDMApplication(
-                    app_dict=response.json()['application'])
+                    app_dict=self._json(response)['application'],
+                    keep_dict=self._keep_dicts)
             elif response.status_code == requests.codes.not_found:
                 _application = None
             else:
                 response.raise_for_status()
 
+            self._cache_response(_key, _application, response)
             return _application
 
+        elif (query_type == IDMQuery.BY_NAME and
+              self._app_index is not None):
+            app_list = self._app_index.lookup(application_id)
+
+            if len(app_list) > 1:
+                self._logger.warning(
+                    'multiple applications with the name "%s" found',
+                    application_id)
+
+            return app_list
+
         elif query_type == IDMQuery.BY_NAME:
             apps = self.list_applications()
             app_list = list()
@@ -482,20 +1117,35 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_applications', "GET", url, headers=headers)
 
         if response.status_code == requests.codes.ok:
             _app_list = list()
-            for _app in response.json()['applications']:
+            for _app in self._json(response)['applications']:
                 _app_list.append(
-                    IDMApplication(app_dict=_app))
+                    IDMApplication(app_dict=_app, keep_dict=self._keep_dicts))
             return _app_list
         elif response.status_code == requests.codes.not_found:
             return list()
         else:
             response.raise_for_status()
 
+    def iter_applications(self):
+        """
+        Iterates over all the applications in the IDM. Unlike
+        'list_applications', the response is parsed while it is received and
+        the applications are yielded one at a time, so the memory used does
+        not depend on their number.
+
+        Yields:
+            - IDMApplication objects.
+        """
+        url = f"{self._idm_url}/v1/applications"
+        for _app in self._iter_listing(
+                'iter_applications', url, 'applications'):
+            yield IDMApplication(app_dict=_app, keep_dict=self._keep_dicts)
+
     def list_application_users(self, application_id, user_id: str=None):
         """
         Returns a list of authorized user for the applications with the related
@@ -526,12 +1176,12 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_application_users', "GET", url, headers=headers)
 
         _user_list = list()
         if response.status_code == requests.codes.ok:
-            for _user in response.json()['role_user_assignments']:
+            for _user in self._json(response)['role_user_assignments']:
                 _user_list.append(_user)
 
         return _user_list
@@ -556,8 +1206,8 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request("POST", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'authorize_user', "POST", url, headers=headers)
         response.raise_for_status()
 
         self._logger.info("User \"%s\" authorized to \"%s\" application with "
@@ -590,11 +1240,119 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'revoke_user', "DELETE", url, headers=headers)
 
         response.raise_for_status()
 
+    def _role_assignments(self, application_id: str):
+        # Returns the set of the (user id, role id) assignments of the
+        # application. Unlike list_application_users the errors are raised:
+        # the bulk operations cannot tell the granted pairs without them.
+        url = f"{self._idm_url}/v1/applications/{application_id}/users"
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Auth-token': self._auth_token
+        }
+        response = self._request(
+            'list_application_users', "GET", url, headers=headers)
+        if response.status_code == requests.codes.not_found:
+            return set()
+        response.raise_for_status()
+
+        return {(_a['user_id'], _a['role_id']) for _a in
+                self._json(response)['role_user_assignments']}
+
+    def _bulk_assignments(self, operation, application_id: str, assignments,
+                          grant: bool, max_workers: int, rate: float):
+        # The snapshot of the assignments is read when the iteration starts;
+        # it is updated with the pairs submitted, so that a repeated pair is
+        # skipped too.
+        _snapshot = None
+
+        def _skip(pair):
+            nonlocal _snapshot
+            if _snapshot is None:
+                _snapshot = self._role_assignments(application_id)
+            _pair = tuple(pair)
+            if (_pair in _snapshot) == grant:
+                return True
+            # the state the pair will have once sent
+            if grant:
+                _snapshot.add(_pair)
+            else:
+                _snapshot.discard(_pair)
+            return False
+
+        def _assign(pair):
+            _user_id, _role_id = pair
+            return operation(application_id, _role_id, _user_id)
+
+        return BulkOperation(_assign, assignments, max_workers, rate, _skip)
+
+    def authorize_users(self, application_id: str, assignments,
+                        max_workers: int = 8, rate: float = None):
+        """
+        Authorizes many users in the application, each with a given role,
+        with at most 'max_workers' requests in flight and at most 'rate'
+        requests started per second. The users are authorized when the
+        returned BulkOperation is iterated: the application assignments are
+        read once, with a single request, and the pairs already granted (or
+        repeated) are skipped; the others are sent concurrently. A failure
+        does not stop the other pairs.
+
+        Args:
+            application_id (str): The application id.
+            assignments (iterable): the (user_id, role_id) pairs to grant.
+            max_workers (int): the maximum number of requests in flight; it
+                should not exceed the 'pool_maxsize' of the instance
+                (default: 8).
+            rate (float): the maximum number of requests started per second
+                (default: None, no limit).
+
+        Returns:
+            - a BulkOperation that yields a BulkResult per pair, granted,
+              skipped or failed; its 'report' method returns the outcome of
+              all the pairs.
+
+        Raises:
+            HTTPError, while iterating, if the application assignments cannot
+            be read.
+
+        Example:
+            _report = idm.authorize_users(app_id, [(user_id, role_id) for
+                                                   user_id in members],
+                                          rate=50).report()
+        """
+        return self._bulk_assignments(self.authorize_user, application_id,
+                                      assignments, True, max_workers, rate)
+
+    def revoke_users(self, application_id: str, assignments,
+                     max_workers: int = 8, rate: float = None):
+        """
+        Removes many role assignments from the users of the application, as
+        authorize_users grants them: the pairs that are not granted (or
+        repeated) are skipped, the others are revoked concurrently.
+
+        Args:
+            application_id (str): The application id.
+            assignments (iterable): the (user_id, role_id) pairs to revoke.
+            max_workers (int): the maximum number of requests in flight
+                (default: 8).
+            rate (float): the maximum number of requests started per second
+                (default: None, no limit).
+
+        Returns:
+            - a BulkOperation that yields a BulkResult per pair, revoked,
+              skipped or failed.
+
+        Raises:
+            HTTPError, while iterating, if the application assignments cannot
+            be read.
+        """
+        return self._bulk_assignments(self.revoke_user, application_id,
+                                      assignments, False, max_workers, rate)
+
     def delete_application(self, application_id: str):
         """
         Deletes the application with the given id, if exist.
@@ -611,11 +1369,18 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'delete_application', "DELETE", url, headers=headers)
+        self._invalidate('application', str(application_id))
+        self._invalidate('role', str(application_id))
+        self._invalidate('permission', str(application_id))
 
         response.raise_for_status()
 
+        if self._app_index is not None:
+            self._app_index.discard(application_id)
+            self._role_indexes.pop(application_id, None)
+
     def create_application(self, name, description: str = None):
         """
         Creates a new application.
@@ -654,13 +1419,19 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request(
-            "POST", url, headers=headers, data=json.dumps(payload))
-        self._log_response(response)
+        response = self._request(
+            'create_application', "POST", url, headers=headers,
+            data=self._codec.dumps(payload))
         response.raise_for_status()
 
         self._logger.info("IDM application \"%s\" created", name)
-        return IDMApplication(name, response.json()['application'])
+        _application = IDMApplication(
+            name, self._json(response)['application'],
+            keep_dict=self._keep_dicts)
+        if self._app_index is not None:
+            self._app_index.add(_application)
+
+        return _application
 
     def update_application(self, application_id: str):
         raise NotImplementedError()
@@ -690,11 +1461,11 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'get_proxy', "GET", url, headers=headers)
 
         if response.status_code == requests.codes.ok:
-            _proxy = IDMProxy(proxy_dict=response.json()['pep_proxy'])
+            _proxy = IDMProxy(proxy_dict=self._json(response)['pep_proxy'])
         else:
             _proxy = None
 
@@ -720,15 +1491,15 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request("POST", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'create_proxy', "POST", url, headers=headers)
         response.raise_for_status()
 
         self._logger.info(
             "IDM proxy \"%s\" created",
-            response.json()['pep_proxy']['id'])
+            self._json(response)['pep_proxy']['id'])
 
-        return IDMProxy(proxy_dict=response.json()['pep_proxy'])
+        return IDMProxy(proxy_dict=self._json(response)['pep_proxy'])
 
     def delete_proxy(self, application_id: str):
         """
@@ -749,8 +1520,8 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'delete_proxy', "DELETE", url, headers=headers)
         response.raise_for_status()
 
         self._logger.info(
@@ -777,14 +1548,15 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("PATCH", url, headers=headers)
+        response = self._request(
+            'reset_proxy', "PATCH", url, headers=headers)
         response.raise_for_status()
 
         self._logger.info(
             "IDM password for PEP Proxy Account \"%s\" refreshed",
             _proxy.id)
 
-        _proxy.update(response.json())
+        _proxy.update(self._json(response))
 
         return _proxy
 
@@ -822,20 +1594,64 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request(
-            "POST", url, headers=headers, data=json.dumps(payload))
-        self._log_response(response)
+        response = self._request(
+            'create_user', "POST", url, headers=headers,
+            data=self._codec.dumps(payload))
         response.raise_for_status()
 
         self._logger.info("IDM user \"%s\" created", user_email)
 
-        return IDMUser(user_dict=response.json()['user'])
+        _user = IDMUser(user_dict=self._json(response)['user'],
+                        keep_dict=self._keep_dicts)
+        if self._user_index is not None:
+            self._user_index.add(_user)
+
+        return _user
+
+    def _create_user_item(self, item):
+        if isinstance(item, dict):
+            return self.create_user(item['email'], item['password'],
+                                    item.get('username'))
+        return self.create_user(*item)
+
+    def create_users(self, users, max_workers: int = 8):
+        """
+        Creates many users in the IDM System concurrently, with at most
+        'max_workers' requests in flight. The users are created when the
+        returned BulkOperation is iterated: it yields a BulkResult per user,
+        as soon as the user is created or fails, and its 'stats' property
+        reports the progress and the throughput. A failure does not stop
+        the creation of the other users.
+
+        Args:
+            users (iterable): the users to create, each a dictionary with
+                              the 'email', 'password' and optional
+                              'username' keys or an (email, password[, name])
+                              tuple; it is read lazily, so it can be a
+                              generator;
+            max_workers (int): the maximum number of users created at the
+                               same time; it should not exceed the
+                               'pool_maxsize' of the instance (default: 8);
+
+        Returns:
+            - a BulkOperation whose results hold the IDMUser objects, or the
+              errors (e.g. an HTTPError with status 409 for an email already
+              in use).
+
+        Example:
+            for _result in idm.create_users(rows, max_workers=16):
+                if not _result.ok:
+                    print(_result.item['email'], _result.error)
+        """
+        return BulkOperation(self._create_user_item, users, max_workers)
 
     def get_user(self, user_id: str, query_type=IDMQuery.BY_UID):
         """
         Retrieves information about the user with the given id, if exists. If
         the parameter 'query_type' is different from 'IDMQuery.BY_UID' the
         'user_id' parameter is searched per name, login, etc.
+        If the local indexes are enabled, the lookups by login are served by
+        the index and do not query the IDM.
 
         Args:
             user_id (str): The user's id
@@ -848,24 +1664,38 @@ class IDMManager(object):
         Raises:
             - ValueError if the 'query_type' is not equal to IDMQuery.BY_UID or
                          IDMQuery.BY_LOGIN.
+            - HTTPError if the local index of the users cannot be built.
 
         Reference:
             https://fiware-tutorials.readthedocs.io/en/stable/identity-management/#user-crud-actions
         """
         if query_type == IDMQuery.BY_UID:
+            _key = ('user', str(user_id))
+            if self._cache is not None:
+                _hit, _user = self._cache.get(_key)
+                if _hit:
+                    return _user
+
             url = f"{self._idm_url}/v1/users/{user_id}"
             headers = {
                 'Content-Type': 'application/json',
                 'X-Auth-token': self._auth_token
             }
-            response = requests.request("GET", url, headers=headers)
-            self._log_response(response)
+            response = self._request(
+                'get_user', "GET", url, headers=headers)
 
             if response.status_code == requests.codes.ok:
                 _user = IDMUser(
-                    user_dict=response.json()['user'])
+                    user_dict=self._json(response)['user'],
+                    keep_dict=self._keep_dicts)
             else:
                 _user = None
+
+            self._cache_response(_key, _user, response)
+        elif (query_type == IDMQuery.BY_LOGIN and
+              self._user_index is not None):
+            _users = self._user_index.lookup(user_id)
+            _user = _users[0] if _users else None
         elif query_type == IDMQuery.BY_LOGIN:
             _users = self.list_users()
             _user = None
@@ -879,32 +1709,65 @@ class IDMManager(object):
 
         return _user
 
-    def list_users(self):
+    def list_users(self, as_table: bool = False):
         """
         Returns a list of all the users in the IDM.
 
+        Args:
+            as_table: if True, the users are returned as a UserTable, a
+                columnar list of their id, email, username, enabled and
+                date_password fields that is built while the response is
+                received and is suited to very large listings
+                (default: False).
+
         Returns:
-            - a list of IDMUser objects.
+            - a list of IDMUser objects, or a UserTable; both are empty if
+              the IDM answers with an error.
 
         Reference:
             https://fiware-tutorials.readthedocs.io/en/stable/identity-management/#user-crud-actions
         """
         url = f"{self._idm_url}/v1/users"
+        if as_table:
+            # the streamed listing raises on errors: they give an empty
+            # table, as they give an empty list below
+            try:
+                return UserTable(
+                    self._iter_listing('list_users', url, 'users'))
+            except requests.HTTPError:
+                return UserTable()
+
         headers = {
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_users', "GET", url, headers=headers)
 
         _user_list = list()
         if response.status_code == requests.codes.ok:
-            for _user in response.json()['users']:
+            for _user in self._json(response)['users']:
                 _user_list.append(
-                    IDMUser(user_dict=_user))
+                    IDMUser(user_dict=_user, keep_dict=self._keep_dicts))
 
         return _user_list
 
+    def iter_users(self):
+        """
+        Iterates over all the users in the IDM. Unlike 'list_users', the
+        response is parsed while it is received and the users are yielded one
+        at a time, so the memory used does not depend on their number.
+
+        Yields:
+            - IDMUser objects.
+
+        Reference:
+            https://fiware-tutorials.readthedocs.io/en/stable/identity-management/#user-crud-actions
+        """
+        url = f"{self._idm_url}/v1/users"
+        for _user in self._iter_listing('iter_users', url, 'users'):
+            yield IDMUser(user_dict=_user, keep_dict=self._keep_dicts)
+
     def update_user(self, user_id: str):
         raise NotImplementedError()
 
@@ -927,11 +1790,15 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'delete_user', "DELETE", url, headers=headers)
+        self._invalidate('user', str(user_id))
 
         response.raise_for_status()
 
+        if self._user_index is not None:
+            self._user_index.discard(user_id)
+
     ###########################################################################
     # ROLES section
     ###########################################################################
@@ -953,14 +1820,14 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_roles', "GET", url, headers=headers)
 
         _role_list = list()
         if response.status_code == requests.codes.ok:
-            for _role in response.json()['roles']:
+            for _role in self._json(response)['roles']:
                 _role_list.append(
-                    IDMRole(role_dict=_role, application_id=application_id))
+                    self._listed_role(_role, application_id))
 
         return _role_list
 
@@ -997,15 +1864,20 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request(
-            "POST", url, headers=headers, data=json.dumps(payload))
-        self._log_response(response)
+        response = self._request(
+            'create_role', "POST", url, headers=headers,
+            data=self._codec.dumps(payload))
         response.raise_for_status()
 
         self._logger.info("IDM role \"%s\" created", role_name)
 
-        return IDMRole(role_dict=response.json()['role'],
-                       application_id=application_id)
+        _role = IDMRole(role_dict=self._json(response)['role'],
+                        application_id=application_id,
+                        keep_dict=self._keep_dicts)
+        if self._role_indexes is not None:
+            self._role_index(application_id).add(_role)
+
+        return _role
 
     def get_role(self, application_id: str, role_id: str, query_type=IDMQuery.BY_UID):
         """
@@ -1014,6 +1886,8 @@ class IDMManager(object):
         different from 'IDMQuery.BY_UID' the 'role_id' parameter is
         searched by name.  Warning: in this way more than one role can
         exist with the same name.
+        If the local indexes are enabled, the lookups by name are served by
+        the index and do not query the IDM.
 
         Args:
             application_id (str): mandatory, the id of the application to which
@@ -1030,29 +1904,49 @@ class IDMManager(object):
         Raises:
             - ValueError if the 'query_type' is not equal to IDMQuery.BY_UID or
                          IDMQuery.BY_NAME.
+            - HTTPError if the local index of the roles cannot be built.
 
         Reference:
             https://keyrock.docs.apiary.io/reference/keyrock-api/roles
         """
         if query_type == IDMQuery.BY_UID:
+            _key = ('role', str(application_id), str(role_id))
+            if self._cache is not None:
+                _hit, _role = self._cache.get(_key)
+                if _hit:
+                    return _role
+
             url = (f"{self._idm_url}/v1/applications/{application_id}"
                    f"/roles/{role_id}")
             headers = {
                 'Content-Type': 'application/json',
                 'X-Auth-token': self._auth_token
             }
-            response = requests.request("GET", url, headers=headers)
-            self._log_response(response)
+            response = self._request(
+                'get_role', "GET", url, headers=headers)
 
             if response.status_code == requests.codes.ok:
                 _role = IDMRole(
-                    role_dict=response.json()['role'],
-                    application_id=application_id)
+                    role_dict=self._json(response)['role'],
+                    application_id=application_id,
+                    keep_dict=self._keep_dicts)
             else:
                 _role = None
 
+            self._cache_response(_key, _role, response)
             return _role
 
+        elif (query_type == IDMQuery.BY_NAME and
+              self._role_indexes is not None):
+            role_list = self._role_index(application_id).lookup(role_id)
+
+            if len(role_list) > 1:
+                self._logger.warning(
+                    'multiple roles with the name "%s" found',
+                    role_id)
+
+            return role_list
+
         elif query_type == IDMQuery.BY_NAME:
             roles = self.list_roles(application_id)
             role_list = list()
@@ -1094,11 +1988,15 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'delete_role', "DELETE", url, headers=headers)
+        self._invalidate('role', str(application_id), str(role_id))
 
         response.raise_for_status()
 
+        if self._role_indexes is not None:
+            self._role_index(application_id).discard(role_id)
+
     def list_role_permissions(self, application_id, role_id):
         """
         Returns a list of all the permissions in the IDM associated to the
@@ -1120,15 +2018,15 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_role_permissions', "GET", url, headers=headers)
 
         _permission_list = list()
         if response.status_code == requests.codes.ok:
-            for _permission in response.json()['role_permission_assignments']:
+            for _permission in self._json(response)[
+                    'role_permission_assignments']:
                 _permission_list.append(
-                    IDMPermission(permission_dict=_permission,
-                                  application_id=application_id))
+                    self._listed_permission(_permission, application_id))
 
         return _permission_list
 
@@ -1156,8 +2054,10 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request("PUT", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'assign_permission_to_role', "PUT", url, headers=headers)
+        self._invalidate('role', str(application_id), str(role_id))
+        self._invalidate('permission', str(application_id), str(permission_id))
         response.raise_for_status()
 
         self._logger.info("IDM permission \"%s\" assigned to \"%s\" role",
@@ -1187,8 +2087,10 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'remove_permission_from_role', "DELETE", url, headers=headers)
+        self._invalidate('role', str(application_id), str(role_id))
+        self._invalidate('permission', str(application_id), str(permission_id))
         response.raise_for_status()
 
         self._logger.info("IDM permission \"%s\" removed from \"%s\" role",
@@ -1216,18 +2118,37 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'list_permissions', "GET", url, headers=headers)
 
         _permission_list = list()
         if response.status_code == requests.codes.ok:
-            for _permission in response.json()['permissions']:
+            for _permission in self._json(response)['permissions']:
                 _permission_list.append(
-                    IDMPermission(permission_dict=_permission,
-                                  application_id=application_id))
+                    self._listed_permission(_permission, application_id))
 
         return _permission_list
 
+    def iter_permissions(self, application_id):
+        """
+        Iterates over all the permissions in the IDM for the given
+        application. Unlike 'list_permissions', the response is parsed while
+        it is received and the permissions are yielded one at a time.
+
+        Args:
+            application_id (str): The application id.
+
+        Yields:
+            - IDMPermission objects.
+
+        Reference:
+            https://keyrock.docs.apiary.io/reference/keyrock-api/permissions
+        """
+        url = f"{self._idm_url}/v1/applications/{application_id}/permissions"
+        for _permission in self._iter_listing(
+                'iter_permissions', url, 'permissions'):
+            yield self._listed_permission(_permission, application_id)
+
     def create_permission(self, permission_name: str, permission_action: str,
                           permission_resource: str, is_regex: bool = False,
                           application_id: str = None):
@@ -1275,15 +2196,17 @@ class IDMManager(object):
             'X-Auth-token': self._auth_token
         }
 
-        response = requests.request(
-            "POST", url, headers=headers, data=json.dumps(payload))
-        self._log_response(response)
+        response = self._request(
+            'create_permission', "POST", url, headers=headers,
+            data=self._codec.dumps(payload))
         response.raise_for_status()
 
         self._logger.info("IDM permission \"%s\" created", permission_name)
 
-        return IDMPermission(permission_dict=response.json()['permission'],
-                             application_id=application_id)
+        return IDMPermission(permission_dict=self._json(response)[
+                                 'permission'],
+                             application_id=application_id,
+                             keep_dict=self._keep_dicts)
 
     def get_permission(self, application_id: str, permission_id: str):
         """
@@ -1302,22 +2225,30 @@ class IDMManager(object):
         Reference:
             https://keyrock.docs.apiary.io/reference/keyrock-api/permission
         """
+        _key = ('permission', str(application_id), str(permission_id))
+        if self._cache is not None:
+            _hit, _permission = self._cache.get(_key)
+            if _hit:
+                return _permission
+
         url = (f"{self._idm_url}/v1/applications/{application_id}"
                f"/permissions/{permission_id}")
         headers = {
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("GET", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'get_permission', "GET", url, headers=headers)
 
         if response.status_code == requests.codes.ok:
             _permission = IDMPermission(
-                permission_dict=response.json()['permission'],
-                application_id=application_id)
+                permission_dict=self._json(response)['permission'],
+                application_id=application_id,
+                keep_dict=self._keep_dicts)
         else:
             _permission = None
 
+        self._cache_response(_key, _permission, response)
         return _permission
 
     def update_permission(self, application_id: str, permission_id: str):
@@ -1346,7 +2277,8 @@ class IDMManager(object):
             'Content-Type': 'application/json',
             'X-Auth-token': self._auth_token
         }
-        response = requests.request("DELETE", url, headers=headers)
-        self._log_response(response)
+        response = self._request(
+            'delete_permission', "DELETE", url, headers=headers)
+        self._invalidate('permission', str(application_id), str(permission_id))
 
         response.raise_for_status()
@@ -0,0 +1,152 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.index
+"""
+
+from . import forksafe
+import threading
+import time
+
+
+class IDMIndex(object):
+    """
+    This class represents a local, in-memory index of IDM entities (users,
+    applications, roles etc.) that maps a key (e.g. the login or the name) to
+    the list of entities with that key.
+
+    The index is built on the first lookup by calling 'loader' and it is
+    rebuilt on the first lookup after 'ttl' seconds. Between rebuilds it can
+    be patched with 'add' and 'discard', so that the changes made through the
+    same IDMManager are visible immediately.
+
+    Args:
+        loader:
+            a callable without arguments that returns all the entities to
+            index (e.g. IDMManager.iter_users). An exception it raises is
+            propagated by the lookup and the index is left unchanged.
+        key:
+            a callable that returns the key of an entity.
+        ttl:
+            the number of seconds after which the index is rebuilt; if None
+            the index is built only once (or after 'invalidate').
+    """
+    def __init__(self, loader, key, ttl: float = None):
+        self._loader = loader
+        self._key = key
+        self._ttl = ttl
+
+        self._lock = threading.RLock()
+        self._entries = None
+        self._keys = None
+        self._built_at = None
+
+        self._hits = 0
+        self._misses = 0
+        self._rebuilds = 0
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        # the index is kept: only the lock is replaced
+        self._lock = threading.RLock()
+
+    def _expired(self):
+        return (self._entries is None or
+                (self._ttl is not None and
+                 time.monotonic() - self._built_at >= self._ttl))
+
+    def refresh(self):
+        """Rebuilds the index from the loader."""
+        # The lock is held while loading, so that an entity added or
+        # discarded meanwhile is not lost when the new index replaces the
+        # old one.
+        with self._lock:
+            _entries = dict()
+            _keys = dict()
+            for _entity in self._loader():
+                _key = self._key(_entity)
+                _entries.setdefault(_key, list()).append(_entity)
+                _keys[_entity.id] = _key
+
+            self._entries = _entries
+            self._keys = _keys
+            self._built_at = time.monotonic()
+            self._rebuilds += 1
+
+    def invalidate(self):
+        """Drops the index: it will be rebuilt on the next lookup."""
+        with self._lock:
+            self._entries = None
+            self._keys = None
+
+    def lookup(self, key):
+        """
+        Returns the list of the entities with the given key; the list is
+        empty if no entity is found.
+        """
+        with self._lock:
+            if self._expired():
+                self.refresh()
+
+            _found = self._entries.get(key)
+            if _found:
+                self._hits += 1
+                return list(_found)
+
+            self._misses += 1
+            return list()
+
+    def add(self, entity):
+        """Adds an entity to the index, if the index is built."""
+        with self._lock:
+            if self._entries is None:
+                return
+            self.discard(entity.id)
+            _key = self._key(entity)
+            self._entries.setdefault(_key, list()).append(entity)
+            self._keys[entity.id] = _key
+
+    def discard(self, entity_id):
+        """Removes the entity with the given id from the index, if present."""
+        with self._lock:
+            if self._entries is None or entity_id not in self._keys:
+                return
+            _key = self._keys.pop(entity_id)
+            _remaining = [_e for _e in self._entries[_key]
+                          if _e.id != entity_id]
+            if _remaining:
+                self._entries[_key] = _remaining
+            else:
+                del self._entries[_key]
+
+    @property
+    def stats(self):
+        """
+        Gets the index statistics as a dictionary with the 'hits', 'misses',
+        'rebuilds' and 'size' (number of indexed entities) keys.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'rebuilds': self._rebuilds,
+                'size': len(self._keys) if self._keys is not None else 0
+            }
+
+    def __repr__(self):
+        return (f"<IDMIndex hits: {self._hits}, misses: {self._misses}, "
+                f"rebuilds: {self._rebuilds}>")
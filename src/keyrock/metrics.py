@@ -0,0 +1,207 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.metrics
+
+Request metrics of the IDM managers.
+"""
+
+from . import forksafe
+from bisect import bisect_left
+import math
+import threading
+
+# The upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+class _Series(object):
+    __slots__ = ('requests', 'bytes_in', 'bytes_out', 'latency_sum',
+                 'counts')
+
+    def __init__(self, buckets: int):
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latency_sum = 0.0
+        # one count per bucket, plus the +Inf bucket
+        self.counts = [0] * (buckets + 1)
+
+
+def _histogram(buckets, counts, total):
+    _cumulative = 0
+    _buckets = dict()
+    for _bound, _count in zip(buckets + (math.inf,), counts):
+        _cumulative += _count
+        _buckets[_bound] = _cumulative
+    return {'count': _cumulative, 'sum': total, 'buckets': _buckets}
+
+
+def _label(value: str):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+class IDMMetrics(object):
+    """
+    This class represents a collector of the requests sent to the IDM by an
+    IDMManager or an AsyncIDMManager: for each operation (the name of the
+    manager method, e.g. 'list_users') and response status code it counts the
+    requests and the bytes sent and received, and keeps a histogram of the
+    latencies. A request that gets no response (e.g. a connection error) is
+    recorded with status code 0; status codes 0 and 400 or above are counted
+    as errors.
+
+    A collector can be shared by several managers. The managers created
+    without a collector do not measure their requests at all. In a forked
+    child process the collector starts again from zero, so that the metrics
+    of the worker processes of a pre-forking server can be summed.
+
+    Args:
+        buckets:
+            the upper bounds, in seconds, of the latency histogram buckets
+            (default: DEFAULT_BUCKETS).
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = dict()
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._series = dict()
+
+    @property
+    def buckets(self):
+        """Gets the upper bounds of the latency histogram buckets."""
+        return self._buckets
+
+    def record(self, operation: str, status: int, elapsed: float,
+               bytes_in: int = 0, bytes_out: int = 0):
+        """
+        Records a request of 'operation' answered with 'status' (0 if no
+        response was received) after 'elapsed' seconds.
+        """
+        _bucket = bisect_left(self._buckets, elapsed)
+        with self._lock:
+            _series = self._series.get((operation, status))
+            if _series is None:
+                _series = _Series(len(self._buckets))
+                self._series[(operation, status)] = _series
+            _series.requests += 1
+            _series.bytes_in += bytes_in
+            _series.bytes_out += bytes_out
+            _series.latency_sum += elapsed
+            _series.counts[_bucket] += 1
+
+    def snapshot(self):
+        """
+        Returns the metrics recorded so far, as a dictionary keyed by
+        operation. Each value has the 'requests', 'errors', 'bytes_in',
+        'bytes_out' and 'latency' of the operation and, under 'statuses',
+        the same values (except 'errors') by status code. A 'latency'
+        histogram is a dictionary with the 'count' and the 'sum' of the
+        latencies and the cumulative 'buckets' counts keyed by upper bound.
+        """
+        with self._lock:
+            _series = [(_op, _status, _s.requests, _s.bytes_in, _s.bytes_out,
+                        _s.latency_sum, list(_s.counts))
+                       for (_op, _status), _s in self._series.items()]
+
+        _snapshot = dict()
+        _empty = [0] * (len(self._buckets) + 1)
+        for (_op, _status, _requests, _in, _out, _sum,
+             _counts) in sorted(_series):
+            _operation = _snapshot.setdefault(_op, {
+                'requests': 0, 'errors': 0, 'bytes_in': 0, 'bytes_out': 0,
+                'latency': (0.0, list(_empty)), 'statuses': {}})
+            _operation['requests'] += _requests
+            if _status == 0 or _status >= 400:
+                _operation['errors'] += _requests
+            _operation['bytes_in'] += _in
+            _operation['bytes_out'] += _out
+            _total, _totals = _operation['latency']
+            _operation['latency'] = (
+                _total + _sum, [_a + _b for _a, _b in zip(_totals, _counts)])
+            _operation['statuses'][_status] = {
+                'requests': _requests, 'bytes_in': _in, 'bytes_out': _out,
+                'latency': _histogram(self._buckets, _counts, _sum)}
+
+        for _operation in _snapshot.values():
+            _total, _totals = _operation['latency']
+            _operation['latency'] = _histogram(self._buckets, _totals, _total)
+        return _snapshot
+
+    def prometheus(self, prefix: str = 'pykeyrock'):
+        """
+        Returns the metrics in the Prometheus text exposition format, with
+        the series labelled by 'operation' and 'status'.
+        """
+        _lines = list()
+
+        def _metric(name, kind, help_text):
+            _lines.append(f"# HELP {prefix}_{name} {help_text}")
+            _lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        _snapshot = self.snapshot()
+        _samples = [(_label(_op), _status, _values)
+                    for _op, _operation in _snapshot.items()
+                    for _status, _values in _operation['statuses'].items()]
+
+        for _name, _key, _help in (
+                ('requests_total', 'requests', 'Requests sent to the IDM.'),
+                ('received_bytes_total', 'bytes_in',
+                 'Bytes received from the IDM.'),
+                ('sent_bytes_total', 'bytes_out', 'Bytes sent to the IDM.')):
+            _metric(_name, 'counter', _help)
+            for _op, _status, _values in _samples:
+                _lines.append(
+                    f'{prefix}_{_name}{{operation="{_op}",'
+                    f'status="{_status}"}} {_values[_key]}')
+
+        _metric('errors_total', 'counter',
+                'Requests that failed or were answered with an error.')
+        for _op, _operation in _snapshot.items():
+            _lines.append(f'{prefix}_errors_total{{operation="{_label(_op)}"}}'
+                          f' {_operation["errors"]}')
+
+        _metric('request_duration_seconds', 'histogram',
+                'Latency of the requests sent to the IDM.')
+        _name = f'{prefix}_request_duration_seconds'
+        for _op, _status, _values in _samples:
+            _labels = f'operation="{_op}",status="{_status}"'
+            _latency = _values['latency']
+            for _bound, _count in _latency['buckets'].items():
+                _le = '+Inf' if _bound == math.inf else repr(_bound)
+                _lines.append(
+                    f'{_name}_bucket{{{_labels},le="{_le}"}} {_count}')
+            _lines.append(f'{_name}_sum{{{_labels}}} {_latency["sum"]}')
+            _lines.append(f'{_name}_count{{{_labels}}} {_latency["count"]}')
+
+        return '\n'.join(_lines) + '\n'
+
+    def reset(self):
+        """Drops the metrics recorded so far."""
+        with self._lock:
+            self._series = dict()
+
+    def __repr__(self):
+        with self._lock:
+            _requests = sum(_s.requests for _s in self._series.values())
+        return f"<IDMMetrics requests: {_requests}>"
@@ -15,6 +15,12 @@
 
 """
 .. module:: keyrock
+
+The model classes use compact '__slots__' layouts. By default each instance
+keeps the dictionary it is built from (see the 'dict' property); with
+'keep_dict=False' the dictionary is dropped and rebuilt on demand from the
+known attributes, which saves memory on large listings but loses the
+optional attributes returned by the IDM.
 """
 
 
@@ -29,11 +35,15 @@ class IDMOrganization(object):
         org_dict: a dictionary used to initialize the instance with the
             result of an IDM query. If 'org_name' argument is not provided,
             'org_dict' must be provided and have the 'name' key.
+        keep_dict: whether to keep 'org_dict' (default: True).
 
     """
-    def __init__(self, org_name: str = None, org_dict: dict = None):
+    __slots__ = ('_org_name', '_org_dict', '_org_id', '_org_description')
+
+    def __init__(self, org_name: str = None, org_dict: dict = None,
+                 keep_dict: bool = True):
         self._org_name = org_name or org_dict['name']
-        self._org_dict = org_dict
+        self._org_dict = org_dict if keep_dict else None
         self._org_id = org_dict.get('id', None)
         self._org_description = org_dict.get('description', None)
 
@@ -56,6 +66,9 @@ class IDMOrganization(object):
     def dict(self):
         """Gets the dictionary that is passed to the constructor (it can be used to
         retrieve optional attributes returned by the IDM)."""
+        if self._org_dict is None:
+            return {'id': self._org_id, 'name': self._org_name,
+                    'description': self._org_description}
         return self._org_dict
 
     def __repr__(self):
@@ -77,12 +90,17 @@ class IDMApplication(object):
             a dictionary used to initialize the instance with the result of an
             IDM query. If 'app_name' argument is not provided, 'app_dict' must
             be provided and have the 'name' key.
+        keep_dict:
+            whether to keep 'app_dict' (default: True).
 
     """
+    __slots__ = ('_app_name', '_app_dict', '_app_id', '_app_secret',
+                 '_app_description')
+
     def __init__(self, app_name: str = None,
-                 app_dict: dict = None):
+                 app_dict: dict = None, keep_dict: bool = True):
         self._app_name = app_name or app_dict['name']
-        self._app_dict = app_dict
+        self._app_dict = app_dict if keep_dict else None
         self._app_id = app_dict.get('id', None)
         self._app_secret = app_dict.get('secret', None)
         self._app_description = app_dict.get('description', None)
@@ -112,6 +130,12 @@ class IDMApplication(object):
     def dict(self):
         """Gets the dictionary that is passed to the constructor (it can be used to
         retrieve optional attributes returned by the IDM)."""
+        if self._app_dict is None:
+            _dict = {'id': self._app_id, 'name': self._app_name,
+                     'description': self._app_description}
+            if self._app_secret is not None:
+                _dict['secret'] = self._app_secret
+            return _dict
         return self._app_dict
 
     def __repr__(self):
@@ -133,11 +157,17 @@ class IDMProxy(object):
             a dictionary used to initialize the instance with the result of an
             IDM query. If 'proxy_id' argument is not provided, 'proxy_dict'
             must be provided and have the 'id' key.
+        keep_dict:
+            whether to keep 'proxy_dict' (default: True).
 
         """
-    def __init__(self, proxy_id: str = None, proxy_dict: dict = None):
+    __slots__ = ('_proxy_dict', '_proxy_id', '_proxy_password',
+                 '_proxy_oauth_client_id')
 
-        self._proxy_dict = proxy_dict
+    def __init__(self, proxy_id: str = None, proxy_dict: dict = None,
+                 keep_dict: bool = True):
+
+        self._proxy_dict = proxy_dict if keep_dict else None
         self._proxy_id = proxy_id or proxy_dict['id']
         self._proxy_password = proxy_dict.get('password', None)
         self._proxy_oauth_client_id = proxy_dict.get('oauth_client_id', None)
@@ -150,10 +180,10 @@ class IDMProxy(object):
         """
         if 'password' in [*proxy_dict]:
             self._proxy_password = proxy_dict['password']
-            self._proxy_dict.update({'password': proxy_dict['password']})
         if 'new_password' in [*proxy_dict]:
             self._proxy_password = proxy_dict['new_password']
-            self._proxy_dict.update({'password': proxy_dict['new_password']})
+        if self._proxy_dict is not None:
+            self._proxy_dict.update({'password': self._proxy_password})
 
     @property
     def id(self):
@@ -178,6 +208,9 @@ class IDMProxy(object):
     def dict(self):
         """Gets the dictionary that is passed to the constructor (it can be used to
         retrieve optional attributes returned by the IDM)."""
+        if self._proxy_dict is None:
+            return {'id': self._proxy_id, 'password': self._proxy_password,
+                    'oauth_client_id': self._proxy_oauth_client_id}
         return self._proxy_dict
 
     def __repr__(self):
@@ -199,12 +232,18 @@ class IDMUser(object):
             a dictionary used to initialize the instance with the result of an
             IDM query. If 'user_email' argument is not provided, 'user_dict'
             must be provided and have the 'email' key.
+        keep_dict:
+            whether to keep 'user_dict' (default: True).
 
     """
+    __slots__ = ('_user_email', '_user_dict', '_user_id', '_user_name',
+                 '_user_enabled', '_user_gravatar', '_user_website',
+                 '_user_expiration', '_user_description')
+
     def __init__(self, user_email: str = None,
-                 user_dict: dict = None):
+                 user_dict: dict = None, keep_dict: bool = True):
         self._user_email = user_email or user_dict['email']
-        self._user_dict = user_dict
+        self._user_dict = user_dict if keep_dict else None
         self._user_id = user_dict.get('id', None)
         self._user_name = user_dict.get('username', None)
         self._user_enabled = user_dict.get('enabled', False)
@@ -245,6 +284,14 @@ class IDMUser(object):
     def dict(self):
         """Gets the dictionary that is passed to the constructor (it can be used to
         retrieve optional attributes returned by the IDM)."""
+        if self._user_dict is None:
+            return {'id': self._user_id, 'username': self._user_name,
+                    'email': self._user_email,
+                    'enabled': self._user_enabled,
+                    'gravatar': self._user_gravatar,
+                    'website': self._user_website,
+                    'date_password': self._user_expiration,
+                    'description': self._user_description}
         return self._user_dict
 
     def __repr__(self):
@@ -270,10 +317,14 @@ class IDMRole(object):
             must be provided and have the 'name' key.
         application_id:
             the application id to which the role belongs to.
+        keep_dict:
+            whether to keep 'role_dict' (default: True).
     """
+    __slots__ = ('_role_dict', '_role_name', '_role_id', '_role_app_id')
+
     def __init__(self, role_name: str = None, role_dict: dict = None,
-                 application_id: str = None):
-        self._role_dict = role_dict
+                 application_id: str = None, keep_dict: bool = True):
+        self._role_dict = role_dict if keep_dict else None
         self._role_name = role_name or role_dict['name']
         self._role_id = role_dict.get('id', None)
         self._role_app_id = application_id
@@ -297,6 +348,8 @@ class IDMRole(object):
     def dict(self):
         """Gets the dictionary that is passed to the constructor (it can be used to
         retrieve optional attributes returned by the IDM)."""
+        if self._role_dict is None:
+            return {'id': self._role_id, 'name': self._role_name}
         return self._role_dict
 
     def __repr__(self):
@@ -333,16 +386,25 @@ class IDMPermission(object):
             must be provided and have the 'name' key.
         application_id:
             the application id to which the permission belongs to.
+        keep_dict:
+            whether to keep 'permission_dict' (default: True).
     """
+    __slots__ = ('_permission_dict', '_permission_name',
+                 '_permission_action', '_permission_resource',
+                 '_permission_is_regex', '_permission_id',
+                 '_permission_app_id')
+
     def __init__(self, permission_name: str = None,
                  permission_action: str = None,
                  permission_resource: str = None,
                  is_regex: bool = False,
                  permission_dict: dict = None,
-                 application_id: str = None):
-        self._permission_dict = permission_dict
+                 application_id: str = None,
+                 keep_dict: bool = True):
+        self._permission_dict = permission_dict if keep_dict else None
         self._permission_name = permission_name or permission_dict['name']
-        self._permission_action = permission_name or permission_dict['action']
+        self._permission_action = (permission_action or
+                                   permission_dict['action'])
         self._permission_resource = (permission_resource or
                                      permission_dict['resource'])
         self._permission_is_regex = is_regex
@@ -383,6 +445,12 @@ class IDMPermission(object):
     def dict(self):
         """Gets the dictionary that is passed to the constructor (it can be used to
         retrieve optional attributes returned by the IDM)."""
+        if self._permission_dict is None:
+            return {'id': self._permission_id,
+                    'name': self._permission_name,
+                    'action': self._permission_action,
+                    'resource': self._permission_resource,
+                    'is_regex': self._permission_is_regex}
         return self._permission_dict
 
     def __repr__(self):
@@ -392,3 +460,103 @@ class IDMPermission(object):
                 f"resource: \"{self._permission_resource}\" "
                 f"(is regex: {self._permission_is_regex}), "
                 f"app_id: {self._permission_app_id}>")
+
+
+class _LazyModel(object):
+    """
+    Resolves the attributes of a model from the dictionary it is built from,
+    when they are accessed. The public properties read the dictionary
+    directly; the private attributes of the eager class (e.g. used by
+    __repr__) are mapped by '_LAZY_FIELDS' to their key in the dictionary,
+    which is stored in the '_LAZY_DICT' attribute.
+    """
+    __slots__ = ()
+
+    _LAZY_DICT = None
+    _LAZY_FIELDS = {}
+
+    def __getattr__(self, name):
+        # called only for the attributes that are not set
+        _key = self._LAZY_FIELDS.get(name)
+        if _key is None:
+            raise AttributeError(name)
+        return getattr(self, self._LAZY_DICT).get(_key, None)
+
+
+class LazyIDMRole(_LazyModel, IDMRole):
+    """
+    This class represents a role of an application, as IDMRole, whose
+    attributes are read from 'role_dict' only when they are accessed.
+
+    Args:
+        role_dict:
+            the dictionary returned by the IDM for the role.
+        application_id:
+            the application id to which the role belongs to.
+    """
+    __slots__ = ()
+
+    _LAZY_DICT = '_role_dict'
+    _LAZY_FIELDS = {'_role_name': 'name', '_role_id': 'id'}
+
+    def __init__(self, role_dict: dict, application_id: str = None):
+        self._role_dict = role_dict
+        self._role_app_id = application_id
+
+    @property
+    def name(self):
+        """Gets the role's name."""
+        return self._role_dict.get('name', None)
+
+    @property
+    def id(self):
+        """Gets the role's id."""
+        return self._role_dict.get('id', None)
+
+
+class LazyIDMPermission(_LazyModel, IDMPermission):
+    """
+    This class represents a permission of an application, as IDMPermission,
+    whose attributes are read from 'permission_dict' only when they are
+    accessed.
+
+    Args:
+        permission_dict:
+            the dictionary returned by the IDM for the permission.
+        application_id:
+            the application id to which the permission belongs to.
+    """
+    __slots__ = ()
+
+    _LAZY_DICT = '_permission_dict'
+    _LAZY_FIELDS = {
+        '_permission_name': 'name',
+        '_permission_action': 'action',
+        '_permission_resource': 'resource',
+        '_permission_id': 'id'
+    }
+
+    def __init__(self, permission_dict: dict, application_id: str = None):
+        self._permission_dict = permission_dict
+        self._permission_is_regex = False
+        self._permission_app_id = application_id
+
+    @property
+    def name(self):
+        """Gets the permission's name."""
+        return self._permission_dict.get('name', None)
+
+    @property
+    def action(self):
+        """Gets the permission's action."""
+        return self._permission_dict.get('action', None)
+
+    @property
+    def resource(self):
+        """Gets the permission's resource."""
+        return self._permission_dict.get('resource', None)
+
+    @property
+    def id(self):
+        """Gets the permission's id."""
+        return self._permission_dict.get('id', None)
@@ -0,0 +1,328 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.retry
+
+Retries of the transient IDM failures and circuit breaking.
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+import requests
+import urllib3.exceptions
+
+from . import forksafe
+
+# The methods that can be sent again without changing the outcome.
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+# The POST operations of IDMManager that can be sent again: an assignment
+# that already exists is left as is, a token request returns a new token.
+IDEMPOTENT_OPERATIONS = frozenset(('authorize_user', 'get_oauth2_token'))
+
+# The status codes answered before the request is processed, after which
+# any request can be sent again.
+SAFE_STATUSES = frozenset((429, 503))
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of sending a request to an IDM whose circuit is open.
+    """
+
+
+def _not_sent(error: Exception):
+    # True if the connection could not be established, so that the request
+    # has certainly not reached the IDM.
+    if isinstance(error, (requests.exceptions.ConnectTimeout,
+                          CircuitOpenError)):
+        return True
+    _reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(_reason, urllib3.exceptions.NewConnectionError)
+
+
+def _retry_after(response):
+    # Returns the number of seconds requested by the Retry-After header of
+    # the response, or None.
+    _value = response.headers.get('Retry-After')
+    if not _value:
+        return None
+    try:
+        return max(0.0, float(_value))
+    except ValueError:
+        pass
+    try:
+        _date = parsedate_to_datetime(_value)
+    except (TypeError, ValueError):
+        return None
+    if _date.tzinfo is None:
+        _date = _date.replace(tzinfo=timezone.utc)
+    return max(0.0, (_date - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy(object):
+    """
+    This class represents the policy used by IDMManager to send again the
+    requests that fail for transient reasons: connection errors and the
+    'statuses' answers (by default 429, 502, 503 and 504).
+
+    The delay before the n-th retry is drawn uniformly between 0 and
+    min(backoff_max, backoff_base * 2 ** n) ("full jitter"), so that the
+    clients that failed together do not retry together; when the IDM answers
+    with a Retry-After header, its delay is used instead.
+
+    A request that is not idempotent (a POST or a PATCH) is retried only when
+    it certainly was not processed: the connection could not be established
+    or the IDM answered 429 or 503. The POST operations listed in
+    'idempotent_operations' are retried as the idempotent methods.
+
+    Args:
+        max_retries:
+            the maximum number of retries of a request (default: 3).
+        backoff_base:
+            the number of seconds of the first backoff (default: 0.1).
+        backoff_max:
+            the maximum number of seconds of a backoff (default: 10).
+        statuses:
+            the status codes that are retried (default: 429, 502, 503, 504).
+        max_retry_after:
+            the maximum number of seconds of a Retry-After delay; a response
+            that asks for a longer delay is not retried (default: 60).
+        idempotent_operations:
+            the names of the POST operations that are retried as idempotent
+            requests (default: IDEMPOTENT_OPERATIONS).
+    """
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.1,
+                 backoff_max: float = 10, statuses=(429, 502, 503, 504),
+                 max_retry_after: float = 60,
+                 idempotent_operations=IDEMPOTENT_OPERATIONS):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.statuses = frozenset(statuses)
+        self.max_retry_after = max_retry_after
+        self.idempotent_operations = frozenset(idempotent_operations)
+
+        self._lock = threading.Lock()
+        self._retries = 0
+        self._give_ups = 0
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def _idempotent(self, operation: str, method: str):
+        return (method.upper() in IDEMPOTENT_METHODS or
+                operation in self.idempotent_operations)
+
+    def backoff(self, attempt: int):
+        """Returns the jittered delay before the retry number 'attempt'."""
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry(self, attempt: int, retryable: bool, delay: float):
+        # Returns the delay before the retry, or None; counts the outcome.
+        with self._lock:
+            if not retryable:
+                return None
+            if attempt >= self.max_retries or delay is None:
+                self._give_ups += 1
+                return None
+            self._retries += 1
+            return delay
+
+    def retry_error(self, operation: str, method: str, error: Exception,
+                    attempt: int):
+        """
+        Returns the number of seconds to wait before sending again a request
+        that raised 'error' at the (zero based) 'attempt', or None if it must
+        not be retried.
+        """
+        _retryable = (
+            isinstance(error, (requests.exceptions.ConnectionError,
+                               requests.exceptions.Timeout)) and
+            not isinstance(error, CircuitOpenError) and
+            (self._idempotent(operation, method) or _not_sent(error)))
+        return self._retry(attempt, _retryable, self.backoff(attempt))
+
+    def retry_response(self, operation: str, method: str, response,
+                       attempt: int):
+        """
+        Returns the number of seconds to wait before sending again a request
+        answered with 'response' at the (zero based) 'attempt', or None if it
+        must not be retried.
+        """
+        _status = response.status_code
+        _retryable = (_status in self.statuses and
+                      (self._idempotent(operation, method) or
+                       _status in SAFE_STATUSES))
+        _delay = _retry_after(response)
+        if _delay is None:
+            _delay = self.backoff(attempt)
+        elif _delay > self.max_retry_after:
+            _delay = None
+        return self._retry(attempt, _retryable, _delay)
+
+    @property
+    def stats(self):
+        """
+        Gets the statistics of the policy, as a dictionary with the number
+        of 'retries' and of the retryable failures given up ('give_ups').
+        """
+        with self._lock:
+            return {'retries': self._retries, 'give_ups': self._give_ups}
+
+    def __repr__(self):
+        return (f"<RetryPolicy max_retries: {self.max_retries}, "
+                f"backoff: {self.backoff_base}-{self.backoff_max}s>")
+
+
+class _Circuit(object):
+    __slots__ = ('failures', 'opened_at', 'probing')
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+
+class CircuitBreaker(object):
+    """
+    This class represents a circuit breaker that stops sending requests to
+    an IDM host that keeps failing. After 'failure_threshold' consecutive
+    failures (connection errors and 'failure_statuses' answers) the circuit
+    of the host opens and the requests fail immediately with
+    CircuitOpenError; after 'reset_timeout' seconds a single probe request is
+    let through: the circuit closes if it succeeds and opens again if it
+    fails.
+
+    The state is kept per host, so a breaker can be shared by the managers
+    of several IDM instances.
+
+    Args:
+        failure_threshold:
+            the number of consecutive failures that opens the circuit
+            (default: 5).
+        reset_timeout:
+            the number of seconds the circuit stays open (default: 30).
+        failure_statuses:
+            the status codes counted as failures (default: 429, 500, 502, 503,
+            504).
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30,
+                 failure_statuses=(429, 500, 502, 503, 504)):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_statuses = frozenset(failure_statuses)
+
+        self._lock = threading.Lock()
+        self._circuits = dict()
+        self._opened = 0
+        self._rejected = 0
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        # the probes in flight belong to the threads of the parent process
+        self._lock = threading.Lock()
+        for _circuit in self._circuits.values():
+            _circuit.probing = False
+
+    def state(self, host: str):
+        """Returns the state of the circuit of 'host'."""
+        with self._lock:
+            _circuit = self._circuits.get(host)
+            if _circuit is None or _circuit.opened_at is None:
+                return self.CLOSED
+            if (_circuit.probing or time.monotonic() - _circuit.opened_at >=
+                    self.reset_timeout):
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def before_request(self, host: str):
+        """
+        Checks that a request can be sent to 'host'.
+
+        Raises:
+            CircuitOpenError if the circuit of 'host' is open.
+        """
+        with self._lock:
+            _circuit = self._circuits.get(host)
+            if _circuit is None or _circuit.opened_at is None:
+                return
+            if (not _circuit.probing and time.monotonic() -
+                    _circuit.opened_at >= self.reset_timeout):
+                _circuit.probing = True
+                return
+            self._rejected += 1
+        raise CircuitOpenError(f"The circuit of {host} is open")
+
+    def record(self, host: str, success: bool):
+        """Records the outcome of a request sent to 'host'."""
+        with self._lock:
+            _circuit = self._circuits.get(host)
+            if success:
+                if _circuit is not None:
+                    del self._circuits[host]
+                return
+            if _circuit is None:
+                _circuit = self._circuits[host] = _Circuit()
+            _circuit.failures += 1
+            if _circuit.probing or (
+                    _circuit.opened_at is None and
+                    _circuit.failures >= self.failure_threshold):
+                _circuit.opened_at = time.monotonic()
+                _circuit.probing = False
+                self._opened += 1
+
+    def record_response(self, host: str, response):
+        """Records the outcome of a request answered with 'response'."""
+        self.record(host, response.status_code not in self.failure_statuses)
+
+    def reset(self, host: str = None):
+        """Closes the circuit of 'host', or all the circuits."""
+        with self._lock:
+            if host is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(host, None)
+
+    @property
+    def stats(self):
+        """
+        Gets the statistics of the breaker, as a dictionary with the number
+        of times a circuit was 'opened', of the requests 'rejected' and of
+        the hosts whose circuit is not closed ('open_circuits').
+        """
+        with self._lock:
+            return {'opened': self._opened, 'rejected': self._rejected,
+                    'open_circuits': sum(
+                        1 for _c in self._circuits.values()
+                        if _c.opened_at is not None)}
+
+    def __repr__(self):
+        return (f"<CircuitBreaker failure_threshold: "
+                f"{self.failure_threshold}, reset_timeout: "
+                f"{self.reset_timeout}s>")
@@ -0,0 +1,105 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.singleflight
+"""
+
+from . import forksafe
+import threading
+
+
+class _Call(object):
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    This class coalesces concurrent calls with the same key: while a call is
+    in flight, the other callers with the same key wait for it and receive
+    its result, or its exception, instead of running the function again.
+
+    In a forked child process the calls in flight in the parent are
+    forgotten.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = dict()
+
+        self._executed = 0
+        self._coalesced = 0
+
+        forksafe.register(self)
+
+    def _after_fork(self):
+        # the calls in flight belong to the threads of the parent process
+        self._lock = threading.Lock()
+        self._calls = dict()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Calls 'func(*args, **kwargs)' unless a call with the same 'key' is
+        already in flight, in which case it waits for that call.
+
+        Returns:
+            - the result of the call.
+
+        Raises:
+            the exception raised by the call, if any.
+        """
+        with self._lock:
+            _call = self._calls.get(key)
+            if _call is not None:
+                self._coalesced += 1
+                _leader = False
+            else:
+                _call = self._calls[key] = _Call()
+                self._executed += 1
+                _leader = True
+
+        if _leader:
+            try:
+                _call.result = func(*args, **kwargs)
+            except BaseException as _error:
+                _call.error = _error
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                _call.event.set()
+        else:
+            _call.event.wait()
+
+        if _call.error is not None:
+            raise _call.error
+        return _call.result
+
+    @property
+    def stats(self):
+        """
+        Gets the statistics as a dictionary with the 'executed' (calls that
+        actually ran), 'coalesced' (calls that shared an in-flight call) and
+        'in_flight' keys.
+        """
+        with self._lock:
+            return {
+                'executed': self._executed,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls)
+            }
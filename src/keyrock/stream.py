@@ -0,0 +1,129 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.stream
+
+Incremental parsing of the IDM listings.
+"""
+
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader(object):
+    """
+    A cursor over a JSON document received as a sequence of byte chunks;
+    only the part of the document not yet consumed is kept in memory.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+
+    def _fill(self):
+        for _chunk in self._chunks:
+            _text = self._text_decoder.decode(_chunk)
+            if _text:
+                self._buffer = self._buffer[self._pos:] + _text
+                self._pos = 0
+                return True
+        return False
+
+    def peek(self):
+        """Returns the next non-whitespace character, without consuming it."""
+        while True:
+            _buffer, _len = self._buffer, len(self._buffer)
+            while self._pos < _len and _buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < _len:
+                return _buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of the JSON document")
+
+    def next(self):
+        """Consumes and returns the next non-whitespace character."""
+        _char = self.peek()
+        self._pos += 1
+        return _char
+
+    def value(self):
+        """Consumes and returns the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                _value, _end = self._json_decoder.raw_decode(
+                    self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number or a literal at the end of the buffer may continue in
+            # the next chunk
+            if (_end == len(self._buffer) and
+                    not isinstance(_value, (dict, list, str)) and
+                    self._fill()):
+                continue
+            self._pos = _end
+            return _value
+
+
+def iter_json_array(chunks, key: str):
+    """
+    Parses a JSON object while it is received and yields, one at a time, the
+    items of the array stored under its top-level 'key'. The memory used
+    depends on the size of a single item, not on the size of the document.
+
+    Args:
+        chunks: an iterable of bytes, e.g. response.iter_content().
+        key: the key of the array in the top-level object.
+
+    Raises:
+        ValueError if the document is not a JSON object or it is truncated.
+    """
+    _reader = _Reader(chunks)
+
+    if _reader.next() != '{':
+        raise ValueError("The JSON document is not an object")
+    if _reader.peek() == '}':
+        return
+
+    while True:
+        _key = _reader.value()
+        if _reader.next() != ':':
+            raise ValueError("Malformed JSON object")
+
+        if _key == key and _reader.peek() == '[':
+            _reader.next()
+            if _reader.peek() == ']':
+                return
+            while True:
+                yield _reader.value()
+                _char = _reader.next()
+                if _char == ']':
+                    return
+                if _char != ',':
+                    raise ValueError("Malformed JSON array")
+
+        _reader.value()
+        _char = _reader.next()
+        if _char == '}':
+            return
+        if _char != ',':
+            raise ValueError("Malformed JSON object")
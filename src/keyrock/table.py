@@ -0,0 +1,232 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.table
+
+Columnar storage of the IDM listings.
+"""
+
+from .models import IDMUser
+from array import array
+from datetime import datetime, timezone
+import math
+
+
+def _timestamp(value):
+    """Converts an IDM date string into a POSIX timestamp (NaN if None)."""
+    if value is None:
+        return math.nan
+    try:
+        # fast path for the format used by Keyrock, e.g.
+        # 2021-06-01T10:00:00.000Z
+        if value.endswith('Z'):
+            _date = datetime.fromisoformat(value[:-1] + '+00:00')
+        else:
+            _date = datetime.fromisoformat(value)
+    except ValueError:
+        import dateutil.parser
+        _date = dateutil.parser.isoparse(value)
+    if _date.tzinfo is None:
+        _date = _date.replace(tzinfo=timezone.utc)
+    return _date.timestamp()
+
+
+def _date_string(timestamp: float):
+    if math.isnan(timestamp):
+        return None
+    _date = datetime.fromtimestamp(timestamp, timezone.utc)
+    return _date.strftime('%Y-%m-%dT%H:%M:%S.') + \
+        f'{_date.microsecond // 1000:03d}Z'
+
+
+class _StringColumn(object):
+    """
+    A column of strings packed, utf-8 encoded, into a single buffer: a row
+    costs the length of its value plus 9 bytes, instead of a str object and
+    a list slot.
+    """
+    __slots__ = ('_data', '_offsets', '_nulls')
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+        self._nulls = bytearray()
+
+    def append(self, value: str):
+        if value is None:
+            self._nulls.append(1)
+        else:
+            self._data += value.encode()
+            self._nulls.append(0)
+        self._offsets.append(len(self._data))
+
+    def take(self, indexes):
+        """Returns a new column with the rows at 'indexes'."""
+        _column = _StringColumn()
+        _data, _offsets = self._data, self._offsets
+        for _index in indexes:
+            _column._data += _data[_offsets[_index]:_offsets[_index + 1]]
+            _column._offsets.append(len(_column._data))
+            _column._nulls.append(self._nulls[_index])
+        return _column
+
+    def __getitem__(self, index: int):
+        if self._nulls[index]:
+            return None
+        return self._data[
+            self._offsets[index]:self._offsets[index + 1]].decode()
+
+    def __len__(self):
+        return len(self._nulls)
+
+    @property
+    def nbytes(self):
+        return (len(self._data) + len(self._nulls) +
+                self._offsets.itemsize * len(self._offsets))
+
+
+class UserTable(object):
+    """
+    This class represents a list of IDM users stored by column: the id,
+    email, username, enabled and date_password fields of each user are
+    kept in compact array-backed columns, which uses a fraction of the
+    memory of the IDMUser objects returned by 'list_users' and scales to
+    millions of users.
+
+    The filters ('disabled', 'expiring_before', 'select') work on whole
+    columns and return new tables; the rows are turned into IDMUser objects
+    only when accessed, by index or by iteration.
+
+    Args:
+        users:
+            an iterable of user dictionaries as returned by the IDM
+            (e.g. the items of a '/v1/users' listing).
+    """
+    COLUMNS = ('id', 'email', 'username', 'enabled', 'date_password')
+
+    def __init__(self, users=()):
+        self._ids = _StringColumn()
+        self._emails = _StringColumn()
+        self._usernames = _StringColumn()
+        self._enabled = bytearray()
+        self._date_passwords = array('d')
+
+        for _user in users:
+            self.append(_user)
+
+    def append(self, user_dict: dict):
+        """Appends a user, given as a dictionary returned by the IDM."""
+        self._ids.append(user_dict.get('id', None))
+        self._emails.append(user_dict['email'])
+        self._usernames.append(user_dict.get('username', None))
+        self._enabled.append(1 if user_dict.get('enabled', False) else 0)
+        self._date_passwords.append(
+            _timestamp(user_dict.get('date_password', None)))
+
+    def _take(self, indexes):
+        _indexes = list(indexes)
+        _table = UserTable()
+        _table._ids = self._ids.take(_indexes)
+        _table._emails = self._emails.take(_indexes)
+        _table._usernames = self._usernames.take(_indexes)
+        _table._enabled = bytearray(self._enabled[_i] for _i in _indexes)
+        _table._date_passwords = array(
+            'd', (self._date_passwords[_i] for _i in _indexes))
+        return _table
+
+    def row(self, index: int):
+        """
+        Returns the user at 'index' as a dictionary with the 'COLUMNS' keys.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('UserTable index out of range')
+        return {
+            'id': self._ids[index],
+            'email': self._emails[index],
+            'username': self._usernames[index],
+            'enabled': bool(self._enabled[index]),
+            'date_password': _date_string(self._date_passwords[index])
+        }
+
+    def column(self, name: str):
+        """
+        Returns the values of the column 'name' (one of 'COLUMNS') as a list;
+        the 'date_password' column holds POSIX timestamps (NaN if missing).
+        """
+        if name == 'enabled':
+            return [bool(_v) for _v in self._enabled]
+        if name == 'date_password':
+            return self._date_passwords.tolist()
+        _column = {
+            'id': self._ids,
+            'email': self._emails,
+            'username': self._usernames
+        }.get(name)
+        if _column is None:
+            raise KeyError(name)
+        return [_column[_i] for _i in range(len(_column))]
+
+    def select(self, mask):
+        """
+        Returns a new table with the users whose item in 'mask' (an iterable
+        of booleans, one per row) is true.
+        """
+        return self._take(_i for _i, _keep in enumerate(mask) if _keep)
+
+    def disabled(self):
+        """Returns a new table with the disabled users."""
+        _indexes = list()
+        _index = self._enabled.find(0)
+        while _index != -1:
+            _indexes.append(_index)
+            _index = self._enabled.find(0, _index + 1)
+        return self._take(_indexes)
+
+    def expiring_before(self, when: datetime):
+        """
+        Returns a new table with the users whose password expiration
+        (date_password) is before 'when'; a naive 'when' is taken as UTC.
+        """
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        _limit = when.timestamp()
+        # NaN (no date) compares false
+        return self._take(_i for _i, _t in enumerate(self._date_passwords)
+                          if _t < _limit)
+
+    @property
+    def nbytes(self):
+        """Gets the number of bytes used by the columns."""
+        return (self._ids.nbytes + self._emails.nbytes +
+                self._usernames.nbytes + len(self._enabled) +
+                self._date_passwords.itemsize * len(self._date_passwords))
+
+    def __len__(self):
+        return len(self._enabled)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._take(range(*index.indices(len(self))))
+        return IDMUser(user_dict=self.row(index), keep_dict=False)
+
+    def __iter__(self):
+        for _index in range(len(self)):
+            yield IDMUser(user_dict=self.row(_index), keep_dict=False)
+
+    def __repr__(self):
+        return f"<UserTable users: {len(self)}, bytes: {self.nbytes}>"
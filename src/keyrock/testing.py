@@ -0,0 +1,1048 @@
+#  Copyright 2021, CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+.. module:: keyrock.testing
+
+A fake Keyrock IDM, with in-memory state, for tests and benchmarks.
+
+It implements the '/v1' and '/oauth2/token' endpoints used by pykeyrock,
+with the behaviour the library relies on (default roles and permissions,
+status codes, error bodies), and it can add latency, inject errors and be
+seeded with large datasets. It can also be run from the command line:
+
+    python -m keyrock.testing --port 3005
+"""
+
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import base64
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+
+ADMIN_ID = 'admin'
+
+# The roles and permissions that every Keyrock application has.
+DEFAULT_ROLES = (
+    {'id': 'provider', 'name': 'Provider'},
+    {'id': 'purchaser', 'name': 'Purchaser'}
+)
+
+DEFAULT_PERMISSIONS = (
+    ('1', 'Get and assign all internal application roles'),
+    ('2', 'Manage the application'),
+    ('3', 'Manage roles'),
+    ('4', 'Manage authorizations'),
+    ('5', 'Get and assign all public application roles'),
+    ('6', 'Get and assign only public owned roles')
+)
+
+DEFAULT_ROLE_PERMISSIONS = {
+    'provider': ['1', '2', '3', '4', '5', '6'],
+    'purchaser': ['5']
+}
+
+_TITLES = {
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+    502: 'Bad Gateway',
+    503: 'Service Unavailable'
+}
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _date(when: datetime):
+    return when.strftime('%Y-%m-%dT%H:%M:%S.') + \
+        f'{when.microsecond // 1000:03d}Z'
+
+
+class IDMError(Exception):
+    """An error answered by the fake IDM."""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _Fault(object):
+    __slots__ = ('status', 'method', 'path', 'count', 'headers', 'delay')
+
+    def __init__(self, status, method, path, count, headers, delay):
+        self.status = status
+        self.method = method
+        self.path = re.compile(path) if path else None
+        self.count = count
+        self.headers = headers
+        self.delay = delay
+
+    def matches(self, method, path):
+        return ((self.method is None or self.method == method) and
+                (self.path is None or self.path.search(path) is not None))
+
+
+def _route(pattern):
+    return re.compile(
+        '^' + re.sub(r'{(\w+)}', r'(?P<\1>[^/]+)', pattern) + '$')
+
+
+class FakeKeyrock(object):
+    """
+    This class represents a fake Keyrock IDM served by a background HTTP
+    server, on 'host' and 'port', with its state kept in memory.
+
+    The admin user ('admin_email' / 'admin_password', id 'admin') always
+    exists. The instance can be used as a context manager, which starts and
+    stops the server.
+
+    Args:
+        host:
+            the address the server listens on (default: 127.0.0.1).
+        port:
+            the port the server listens on; 0 picks a free one (default: 0).
+        latency:
+            the number of seconds added to each request (default: 0).
+        token_ttl:
+            the number of seconds the IDM tokens are valid (default: 3600).
+        oauth2_ttl:
+            the number of seconds the OAuth2 access tokens are valid
+            (default: 3600).
+        admin_email:
+            the login of the admin user (default: admin@test.com).
+        admin_password:
+            the password of the admin user (default: 1234).
+    """
+    ROUTES = (
+        ('POST', '/v1/auth/tokens', 'create_token'),
+        ('GET', '/v1/auth/tokens', 'token_info'),
+        ('DELETE', '/v1/auth/tokens', 'delete_token'),
+        ('POST', '/oauth2/token', 'oauth2_token'),
+
+        ('GET', '/v1/users', 'list_users'),
+        ('POST', '/v1/users', 'create_user'),
+        ('GET', '/v1/users/{user}', 'get_user'),
+        ('DELETE', '/v1/users/{user}', 'delete_user'),
+
+        ('GET', '/v1/organizations', 'list_organizations'),
+        ('POST', '/v1/organizations', 'create_organization'),
+        ('GET', '/v1/organizations/{org}', 'get_organization'),
+        ('DELETE', '/v1/organizations/{org}', 'delete_organization'),
+        ('GET', '/v1/organizations/{org}/users', 'list_members'),
+        ('GET', '/v1/organizations/{org}/users/{user}/organization_roles',
+         'get_member'),
+        ('PUT',
+         '/v1/organizations/{org}/users/{user}/organization_roles/{role}',
+         'add_member'),
+        ('DELETE',
+         '/v1/organizations/{org}/users/{user}/organization_roles/{role}',
+         'remove_member'),
+
+        ('GET', '/v1/applications', 'list_applications'),
+        ('POST', '/v1/applications', 'create_application'),
+        ('GET', '/v1/applications/{app}', 'get_application'),
+        ('DELETE', '/v1/applications/{app}', 'delete_application'),
+        ('GET', '/v1/applications/{app}/users', 'list_authorizations'),
+        ('GET', '/v1/applications/{app}/users/{user}/roles',
+         'list_authorizations'),
+        ('POST', '/v1/applications/{app}/users/{user}/roles/{role}',
+         'authorize'),
+        ('PUT', '/v1/applications/{app}/users/{user}/roles/{role}',
+         'authorize'),
+        ('DELETE', '/v1/applications/{app}/users/{user}/roles/{role}',
+         'revoke'),
+
+        ('GET', '/v1/applications/{app}/pep_proxies', 'get_proxy'),
+        ('POST', '/v1/applications/{app}/pep_proxies', 'create_proxy'),
+        ('PATCH', '/v1/applications/{app}/pep_proxies', 'reset_proxy'),
+        ('DELETE', '/v1/applications/{app}/pep_proxies', 'delete_proxy'),
+
+        ('GET', '/v1/applications/{app}/roles', 'list_roles'),
+        ('POST', '/v1/applications/{app}/roles', 'create_role'),
+        ('GET', '/v1/applications/{app}/roles/{role}', 'get_role'),
+        ('DELETE', '/v1/applications/{app}/roles/{role}', 'delete_role'),
+        ('GET', '/v1/applications/{app}/roles/{role}/permissions',
+         'list_role_permissions'),
+        ('PUT', '/v1/applications/{app}/roles/{role}/permissions/{perm}',
+         'assign_permission'),
+        ('POST', '/v1/applications/{app}/roles/{role}/permissions/{perm}',
+         'assign_permission'),
+        ('DELETE', '/v1/applications/{app}/roles/{role}/permissions/{perm}',
+         'remove_permission'),
+
+        ('GET', '/v1/applications/{app}/permissions', 'list_permissions'),
+        ('POST', '/v1/applications/{app}/permissions', 'create_permission'),
+        ('GET', '/v1/applications/{app}/permissions/{perm}',
+         'get_permission'),
+        ('DELETE', '/v1/applications/{app}/permissions/{perm}',
+         'delete_permission')
+    )
+
+    _ROUTES = tuple((_m, _route(_p), _p, _h) for _m, _p, _h in ROUTES)
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, token_ttl: float = 3600,
+                 oauth2_ttl: float = 3600,
+                 admin_email: str = 'admin@test.com',
+                 admin_password: str = '1234'):
+        self._host = host
+        self._port = port
+        self.latency = latency
+        self.token_ttl = token_ttl
+        self.oauth2_ttl = oauth2_ttl
+        self._admin_email = admin_email
+        self._admin_password = admin_password
+
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+        self._faults = list()
+        self._requests = dict()
+        self.reset()
+
+    ###########################################################################
+    # Server
+    ###########################################################################
+    def start(self):
+        """Starts serving in a background thread."""
+        if self._server is not None:
+            return self
+        self._server = _Server((self._host, self._port), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='keyrock-fake',
+            daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def host(self):
+        """Gets the address the server listens on."""
+        return self._host
+
+    @property
+    def port(self):
+        """Gets the port the server listens on."""
+        if self._server is not None:
+            return self._server.server_address[1]
+        return self._port
+
+    @property
+    def url(self):
+        """Gets the base URL of the server."""
+        return f"http://{self._host}:{self.port}"
+
+    ###########################################################################
+    # State
+    ###########################################################################
+    def reset(self):
+        """Drops all the state, except the admin user."""
+        with self._lock:
+            self._users = dict()
+            self._passwords = dict()
+            self._tokens = dict()
+            self._oauth2_tokens = dict()
+            self._organizations = dict()
+            self._members = dict()
+            self._applications = dict()
+            self._roles = dict()
+            self._permissions = dict()
+            self._role_permissions = dict()
+            self._authorizations = dict()
+            self._proxies = dict()
+            self._faults = list()
+            self._requests = dict()
+            self.add_user(self._admin_email, self._admin_password,
+                          'admin', admin=True, user_id=ADMIN_ID)
+
+    def add_user(self, email: str, password: str, username: str = None,
+                 admin: bool = False, enabled: bool = True,
+                 user_id: str = None):
+        """
+        Adds a user directly to the state.
+
+        Returns:
+            - the user dictionary, as returned by the IDM.
+        """
+        _user = {
+            'id': user_id or str(uuid.uuid4()),
+            'username': username,
+            'email': email,
+            'enabled': enabled,
+            'admin': admin,
+            'image': 'default',
+            'gravatar': False,
+            'date_password': _date(_now()),
+            'description': None,
+            'website': None,
+            'eidas_id': None,
+            'starters_tour_ended': False
+        }
+        with self._lock:
+            self._users[_user['id']] = _user
+            self._passwords[_user['id']] = password
+        return _user
+
+    def seed(self, users: int = 0, organizations: int = 0,
+             applications: int = 0, roles: int = 0, permissions: int = 0,
+             password: str = 'password'):
+        """
+        Adds generated entities to the state: 'users' users, 'organizations'
+        organizations and 'applications' applications, each with 'roles'
+        roles and 'permissions' permissions. All the entities are owned by
+        the admin user.
+
+        Returns:
+            - a dictionary with the ids of the created 'users',
+              'organizations' and 'applications' and, by application id, of
+              the 'roles' and the 'permissions'.
+        """
+        _seeded = {'users': [], 'organizations': [], 'applications': [],
+                   'roles': {}, 'permissions': {}}
+        with self._lock:
+            _base = len(self._users)
+            for _i in range(users):
+                _user = self.add_user(
+                    f'seed_user_{_base + _i}@example.com', password,
+                    f'seed user {_base + _i}')
+                _seeded['users'].append(_user['id'])
+            for _i in range(organizations):
+                _org = self._new_organization(
+                    ADMIN_ID, f'Seed organization {_i}', None)
+                _seeded['organizations'].append(_org['id'])
+            for _i in range(applications):
+                _app = self._new_application(
+                    ADMIN_ID, {'name': f'Seed application {_i}'})
+                _seeded['applications'].append(_app['id'])
+                _seeded['roles'][_app['id']] = [
+                    self._new_role(_app['id'], f'Seed role {_j}')['id']
+                    for _j in range(roles)]
+                _seeded['permissions'][_app['id']] = [
+                    self._new_permission(_app['id'], {
+                        'name': f'Seed permission {_j}',
+                        'action': 'GET',
+                        'resource': f'seed/resource/{_j}'})['id']
+                    for _j in range(permissions)]
+        return _seeded
+
+    ###########################################################################
+    # Faults and statistics
+    ###########################################################################
+    def inject_error(self, status: int = 500, method: str = None,
+                     path: str = None, count: int = 1, headers: dict = None,
+                     delay: float = 0.0):
+        """
+        Makes the next 'count' requests matching 'method' and the regular
+        expression 'path' (None matches any) fail with 'status'. A 'status'
+        of 0 closes the connection without answering. 'headers' are added to
+        the error response (e.g. {'Retry-After': '1'}) and 'delay' seconds
+        are waited before failing. A 'count' of None never expires.
+        """
+        with self._lock:
+            self._faults.append(
+                _Fault(status, method, path, count, headers or {}, delay))
+
+    def clear_errors(self):
+        """Removes the injected errors."""
+        with self._lock:
+            self._faults = list()
+
+    def _fault(self, method, path):
+        with self._lock:
+            for _fault in self._faults:
+                if _fault.matches(method, path):
+                    if _fault.count is not None:
+                        _fault.count -= 1
+                        if _fault.count <= 0:
+                            self._faults.remove(_fault)
+                    return _fault
+        return None
+
+    @property
+    def requests(self):
+        """
+        Gets the number of requests received, as a dictionary keyed by
+        method and route (e.g. 'GET /v1/users/{user}').
+        """
+        with self._lock:
+            return dict(self._requests)
+
+    @property
+    def request_count(self):
+        """Gets the total number of requests received."""
+        with self._lock:
+            return sum(self._requests.values())
+
+    def reset_stats(self):
+        """Resets the request counters."""
+        with self._lock:
+            self._requests = dict()
+
+    ###########################################################################
+    # Dispatching
+    ###########################################################################
+    def handle(self, method: str, path: str, headers, body: bytes):
+        """
+        Serves a request.
+
+        Returns:
+            - a (status, body, headers) tuple, where 'body' is a JSON
+              serializable object or None.
+        """
+        _path, _, _query = path.partition('?')
+        _allowed = False
+        for _method, _pattern, _template, _name in self._ROUTES:
+            _match = _pattern.match(_path)
+            if _match is None:
+                continue
+            if _method != method:
+                _allowed = True
+                continue
+            with self._lock:
+                _key = f'{method} {_template}'
+                self._requests[_key] = self._requests.get(_key, 0) + 1
+            try:
+                _request = _Request(headers, body, parse_qs(_query))
+                if _name not in ('create_token', 'oauth2_token'):
+                    _request.user = self._authenticate(
+                        headers.get('X-Auth-token'))
+                return getattr(self, '_' + _name)(
+                    _request, **_match.groupdict())
+            except IDMError as _error:
+                return self._error(_error.status, _error.message)
+        if _allowed:
+            return self._error(405, 'Method not allowed')
+        return self._error(404, 'Path not found')
+
+    def _error(self, status, message):
+        return (status, {'error': {'message': message, 'code': status,
+                                   'title': _TITLES.get(status, '')}}, {})
+
+    def _authenticate(self, token):
+        with self._lock:
+            _entry = self._tokens.get(token)
+            if _entry is None or _entry[1] <= time.time():
+                raise IDMError(401, 'Invalid token')
+            _user = self._users.get(_entry[0])
+            if _user is None:
+                raise IDMError(401, 'Invalid token')
+            return _user
+
+    def _find(self, collection, key, what):
+        _item = collection.get(key)
+        if _item is None:
+            raise IDMError(404, f'{what} not found')
+        return _item
+
+    ###########################################################################
+    # Tokens
+    ###########################################################################
+    def _user_by_login(self, login):
+        for _user in self._users.values():
+            if login in (_user['email'], _user['username']):
+                return _user
+        return None
+
+    def _create_token(self, request):
+        _payload = request.json()
+        with self._lock:
+            _user = self._user_by_login(_payload.get('name'))
+            if (_user is None or
+                    self._passwords[_user['id']] != _payload.get('password')):
+                raise IDMError(401, 'Invalid email or password')
+            _token = str(uuid.uuid4())
+            _expires = time.time() + self.token_ttl
+            self._tokens[_token] = (_user['id'], _expires)
+        _expires_at = datetime.fromtimestamp(_expires, timezone.utc)
+        return (201, {
+            'token': {'methods': ['password'],
+                      'expires_at': _date(_expires_at)},
+            'idm_authorization_config': {'level': 'basic',
+                                         'authzforce': False}
+        }, {'X-Subject-Token': _token})
+
+    def _token_info(self, request):
+        _subject = request.headers.get('X-Subject-token')
+        with self._lock:
+            _entry = self._tokens.get(_subject)
+            if _entry is None:
+                raise IDMError(404, 'Subject token not found')
+            _user = self._users.get(_entry[0])
+            if _user is None:
+                raise IDMError(404, 'Subject token not found')
+            _valid = _entry[1] > time.time()
+        _expires = datetime.fromtimestamp(_entry[1], timezone.utc)
+        return (200, {
+            'access_token': _subject,
+            'expires': _date(_expires),
+            'valid': _valid,
+            'User': {_k: _user[_k] for _k in (
+                'id', 'username', 'email', 'date_password', 'enabled',
+                'admin')}
+        }, {})
+
+    def _delete_token(self, request):
+        with self._lock:
+            self._find(self._tokens, request.headers.get('X-Subject-token'),
+                       'Subject token')
+            del self._tokens[request.headers.get('X-Subject-token')]
+        return (204, None, {})
+
+    def _oauth2_token(self, request):
+        try:
+            _scheme, _credentials = request.headers.get(
+                'Authorization', '').split(' ', 1)
+            _client_id, _secret = base64.b64decode(
+                _credentials).decode().split(':', 1)
+        except ValueError:
+            raise IDMError(400, 'Invalid client: cannot retrieve client '
+                                'credentials') from None
+        _form = {_k: _v[0] for _k, _v in parse_qs(
+            request.body.decode()).items()}
+        with self._lock:
+            _app = self._applications.get(_client_id)
+            if _app is None or _app['secret'] != _secret:
+                raise IDMError(401, 'Invalid client: client is invalid')
+            if _form.get('grant_type') != 'password':
+                raise IDMError(400, 'Unsupported grant type')
+            _user = self._user_by_login(_form.get('username'))
+            if (_user is None or
+                    self._passwords[_user['id']] != _form.get('password')):
+                raise IDMError(
+                    400, 'Invalid grant: user credentials are invalid')
+            _token = uuid.uuid4().hex
+            if _form.get('scope') == 'permanent':
+                self._oauth2_tokens[_token] = (_user['id'], _client_id, None)
+                return (200, {'access_token': _token,
+                              'token_type': 'bearer',
+                              'scope': ['permanent']}, {})
+            self._oauth2_tokens[_token] = (
+                _user['id'], _client_id, time.time() + self.oauth2_ttl)
+        return (200, {'access_token': _token,
+                      'token_type': 'bearer',
+                      'expires_in': int(self.oauth2_ttl) - 1,
+                      'refresh_token': uuid.uuid4().hex,
+                      'scope': ['bearer']}, {})
+
+    ###########################################################################
+    # Users
+    ###########################################################################
+    def _list_users(self, request):
+        with self._lock:
+            return (200, {'users': list(self._users.values())}, {})
+
+    def _create_user(self, request):
+        _payload = request.json().get('user') or {}
+        if not _payload.get('email'):
+            raise IDMError(400, 'Missing parameter email')
+        if not _payload.get('password'):
+            raise IDMError(400, 'Missing parameter password')
+        with self._lock:
+            for _user in self._users.values():
+                if _user['email'] == _payload['email']:
+                    raise IDMError(409, 'Email already used')
+            _user = self.add_user(_payload['email'], _payload['password'],
+                                  _payload.get('username'))
+        return (201, {'user': _user}, {})
+
+    def _get_user(self, request, user):
+        with self._lock:
+            return (200, {'user': self._find(self._users, user, 'User')}, {})
+
+    def _delete_user(self, request, user):
+        with self._lock:
+            self._find(self._users, user, 'User')
+            if user == ADMIN_ID:
+                raise IDMError(403, 'The admin user cannot be deleted')
+            del self._users[user]
+            del self._passwords[user]
+            for _members in self._members.values():
+                _members.pop(user, None)
+            for _app, _grants in self._authorizations.items():
+                self._authorizations[_app] = [
+                    _g for _g in _grants if _g[0] != user]
+        return (204, None, {})
+
+    ###########################################################################
+    # Organizations
+    ###########################################################################
+    def _new_organization(self, owner, name, description):
+        _org = {
+            'id': str(uuid.uuid4()),
+            'name': name,
+            'description': description,
+            'image': 'default',
+            'website': None
+        }
+        self._organizations[_org['id']] = _org
+        self._members[_org['id']] = {owner: 'owner'}
+        return _org
+
+    def _list_organizations(self, request):
+        with self._lock:
+            _orgs = [{'role': _members[request.user['id']],
+                      'Organization': self._organizations[_id]}
+                     for _id, _members in self._members.items()
+                     if request.user['id'] in _members]
+        if not _orgs:
+            raise IDMError(404, 'Organizations not found')
+        return (200, {'organizations': _orgs}, {})
+
+    def _create_organization(self, request):
+        _payload = request.json().get('organization') or {}
+        if not _payload.get('name'):
+            raise IDMError(400, 'Missing parameter name')
+        with self._lock:
+            _org = self._new_organization(
+                request.user['id'], _payload['name'],
+                _payload.get('description'))
+        return (201, {'organization': _org}, {})
+
+    def _get_organization(self, request, org):
+        with self._lock:
+            return (200, {'organization': self._find(
+                self._organizations, org, 'Organization')}, {})
+
+    def _delete_organization(self, request, org):
+        with self._lock:
+            self._find(self._organizations, org, 'Organization')
+            del self._organizations[org]
+            del self._members[org]
+        return (204, None, {})
+
+    def _list_members(self, request, org):
+        with self._lock:
+            _members = self._find(self._members, org, 'Organization')
+            return (200, {'organization_users': [
+                {'user_id': _user, 'organization_id': org, 'role': _role}
+                for _user, _role in _members.items()]}, {})
+
+    def _get_member(self, request, org, user):
+        with self._lock:
+            _members = self._find(self._members, org, 'Organization')
+            _role = self._find(_members, user, 'User')
+        return (200, {'organization_user': {
+            'user_id': user, 'organization_id': org, 'role': _role}}, {})
+
+    def _add_member(self, request, org, user, role):
+        if role not in ('owner', 'member'):
+            raise IDMError(400, 'Invalid organization role')
+        with self._lock:
+            _members = self._find(self._members, org, 'Organization')
+            self._find(self._users, user, 'User')
+            _members[user] = role
+        return (201, {'user_organization_assignments': {
+            'role': role, 'user_id': user, 'organization_id': org}}, {})
+
+    def _remove_member(self, request, org, user, role):
+        with self._lock:
+            _members = self._find(self._members, org, 'Organization')
+            if _members.get(user) != role:
+                raise IDMError(404, 'User is not in the organization with '
+                                    'this role')
+            del _members[user]
+        return (204, None, {})
+
+    ###########################################################################
+    # Applications
+    ###########################################################################
+    def _new_application(self, owner, payload):
+        _app = {
+            'id': str(uuid.uuid4()),
+            'name': payload['name'],
+            'description': payload.get('description'),
+            'secret': str(uuid.uuid4()),
+            'url': payload.get('url'),
+            'redirect_uri': payload.get('redirect_uri'),
+            'image': 'default',
+            'grant_type': ','.join(payload.get('grant_type') or
+                                   ['password']),
+            'token_types': ','.join(payload.get('token_types') or
+                                    ['bearer']),
+            'response_type': 'code',
+            'client_type': None
+        }
+        self._applications[_app['id']] = _app
+        self._roles[_app['id']] = dict()
+        self._permissions[_app['id']] = dict()
+        self._authorizations[_app['id']] = [(owner, 'provider')]
+        return _app
+
+    def _application(self, app):
+        return self._find(self._applications, app, 'Application')
+
+    def _list_applications(self, request):
+        with self._lock:
+            _apps = [self._applications[_id]
+                     for _id, _grants in self._authorizations.items()
+                     if any(_g[0] == request.user['id'] for _g in _grants)]
+        if not _apps:
+            raise IDMError(404, 'Applications not found')
+        return (200, {'applications': _apps}, {})
+
+    def _create_application(self, request):
+        _payload = request.json().get('application') or {}
+        if not _payload.get('name'):
+            raise IDMError(400, 'Missing parameter name')
+        with self._lock:
+            _app = self._new_application(request.user['id'], _payload)
+        return (201, {'application': _app}, {})
+
+    def _get_application(self, request, app):
+        with self._lock:
+            return (200, {'application': self._application(app)}, {})
+
+    def _delete_application(self, request, app):
+        with self._lock:
+            self._application(app)
+            for _collection in (self._applications, self._roles,
+                                self._permissions, self._authorizations):
+                del _collection[app]
+            self._proxies.pop(app, None)
+            for _key in [_k for _k in self._role_permissions
+                         if _k[0] == app]:
+                del self._role_permissions[_key]
+        return (204, None, {})
+
+    def _list_authorizations(self, request, app, user=None):
+        with self._lock:
+            self._application(app)
+            _grants = [{'user_id': _u, 'role_id': _r}
+                       for _u, _r in self._authorizations[app]
+                       if user is None or _u == user]
+        return (200, {'role_user_assignments': _grants}, {})
+
+    def _authorize(self, request, app, user, role):
+        with self._lock:
+            self._application(app)
+            self._find(self._users, user, 'User')
+            self._role(app, role)
+            if (user, role) not in self._authorizations[app]:
+                self._authorizations[app].append((user, role))
+        return (201, {'role_user_assignments': {
+            'role_id': role, 'user_id': user, 'oauth_client_id': app}}, {})
+
+    def _revoke(self, request, app, user, role):
+        with self._lock:
+            self._application(app)
+            if (user, role) not in self._authorizations[app]:
+                raise IDMError(404, 'Role assignment not found')
+            self._authorizations[app].remove((user, role))
+        return (204, None, {})
+
+    ###########################################################################
+    # PEP proxies
+    ###########################################################################
+    def _get_proxy(self, request, app):
+        with self._lock:
+            self._application(app)
+            _proxy = self._find(self._proxies, app, 'PEP proxy')
+            return (200, {'pep_proxy': {
+                'id': _proxy['id'], 'oauth_client_id': app}}, {})
+
+    def _create_proxy(self, request, app):
+        with self._lock:
+            self._application(app)
+            if app in self._proxies:
+                raise IDMError(409, 'Pep proxy already registered')
+            _proxy = {'id': f'pep_proxy_{uuid.uuid4()}',
+                      'password': f'pep_proxy_{uuid.uuid4()}'}
+            self._proxies[app] = _proxy
+        return (201, {'pep_proxy': dict(_proxy)}, {})
+
+    def _reset_proxy(self, request, app):
+        with self._lock:
+            self._application(app)
+            _proxy = self._find(self._proxies, app, 'PEP proxy')
+            _proxy['password'] = f'pep_proxy_{uuid.uuid4()}'
+        return (200, {'new_password': _proxy['password']}, {})
+
+    def _delete_proxy(self, request, app):
+        with self._lock:
+            self._application(app)
+            self._find(self._proxies, app, 'PEP proxy')
+            del self._proxies[app]
+        return (204, None, {})
+
+    ###########################################################################
+    # Roles
+    ###########################################################################
+    def _new_role(self, app, name):
+        _role = {'id': str(uuid.uuid4()), 'name': name,
+                 'is_internal': False, 'oauth_client_id': app}
+        self._roles[app][_role['id']] = _role
+        return _role
+
+    def _role(self, app, role):
+        for _default in DEFAULT_ROLES:
+            if _default['id'] == role:
+                return dict(_default, is_internal=False, oauth_client_id=app)
+        return self._find(self._roles[app], role, 'Role')
+
+    def _list_roles(self, request, app):
+        with self._lock:
+            self._application(app)
+            return (200, {'roles': [dict(_r) for _r in DEFAULT_ROLES] + [
+                {'id': _r['id'], 'name': _r['name']}
+                for _r in self._roles[app].values()]}, {})
+
+    def _create_role(self, request, app):
+        _payload = request.json().get('role') or {}
+        if not _payload.get('name'):
+            raise IDMError(400, 'Missing parameter name')
+        with self._lock:
+            self._application(app)
+            return (201, {'role': self._new_role(app, _payload['name'])}, {})
+
+    def _get_role(self, request, app, role):
+        with self._lock:
+            self._application(app)
+            return (200, {'role': self._role(app, role)}, {})
+
+    def _delete_role(self, request, app, role):
+        with self._lock:
+            self._application(app)
+            self._find(self._roles[app], role, 'Role')
+            del self._roles[app][role]
+            self._role_permissions.pop((app, role), None)
+            self._authorizations[app] = [
+                _g for _g in self._authorizations[app] if _g[1] != role]
+        return (204, None, {})
+
+    def _list_role_permissions(self, request, app, role):
+        with self._lock:
+            self._application(app)
+            self._role(app, role)
+            _ids = self._role_permissions.get(
+                (app, role), DEFAULT_ROLE_PERMISSIONS.get(role, []))
+            return (200, {'role_permission_assignments': [
+                self._permission(app, _id) for _id in _ids]}, {})
+
+    def _assign_permission(self, request, app, role, perm):
+        with self._lock:
+            self._application(app)
+            self._find(self._roles[app], role, 'Role')
+            self._permission(app, perm)
+            _ids = self._role_permissions.setdefault((app, role), [])
+            if perm not in _ids:
+                _ids.append(perm)
+        return (201, {'role_permission_assignments': {
+            'role_id': role, 'permission_id': perm}}, {})
+
+    def _remove_permission(self, request, app, role, perm):
+        with self._lock:
+            self._application(app)
+            _ids = self._role_permissions.get((app, role), [])
+            if perm not in _ids:
+                raise IDMError(404, 'Permission not assigned to the role')
+            _ids.remove(perm)
+        return (204, None, {})
+
+    ###########################################################################
+    # Permissions
+    ###########################################################################
+    def _new_permission(self, app, payload):
+        _permission = {
+            'id': str(uuid.uuid4()),
+            'name': payload['name'],
+            'description': payload.get('description'),
+            'action': payload.get('action'),
+            'resource': payload.get('resource'),
+            'is_regex': bool(payload.get('is_regex', False)),
+            'xml': payload.get('xml'),
+            'is_internal': False,
+            'oauth_client_id': app
+        }
+        self._permissions[app][_permission['id']] = _permission
+        return _permission
+
+    def _permission(self, app, perm):
+        for _id, _name in DEFAULT_PERMISSIONS:
+            if _id == perm:
+                return {'id': _id, 'name': _name, 'description': None,
+                        'action': None, 'resource': None, 'is_regex': False,
+                        'xml': None, 'is_internal': True,
+                        'oauth_client_id': 'idm_admin_app'}
+        return self._find(self._permissions[app], perm, 'Permission')
+
+    def _list_permissions(self, request, app):
+        with self._lock:
+            self._application(app)
+            return (200, {'permissions': [
+                self._permission(app, _id) for _id, _ in DEFAULT_PERMISSIONS
+            ] + list(self._permissions[app].values())}, {})
+
+    def _create_permission(self, request, app):
+        _payload = request.json().get('permission') or {}
+        with self._lock:
+            self._application(app)
+            for _name in ('name', 'action', 'resource'):
+                if not _payload.get(_name):
+                    raise IDMError(400, f'Missing parameter {_name}')
+            return (201, {'permission': self._new_permission(
+                app, _payload)}, {})
+
+    def _get_permission(self, request, app, perm):
+        with self._lock:
+            self._application(app)
+            return (200, {'permission': self._permission(app, perm)}, {})
+
+    def _delete_permission(self, request, app, perm):
+        with self._lock:
+            self._application(app)
+            self._find(self._permissions[app], perm, 'Permission')
+            del self._permissions[app][perm]
+            for _ids in self._role_permissions.values():
+                if perm in _ids:
+                    _ids.remove(perm)
+        return (204, None, {})
+
+
+class _Request(object):
+    __slots__ = ('headers', 'body', 'query', 'user')
+
+    def __init__(self, headers, body, query):
+        self.headers = headers
+        self.body = body
+        self.query = query
+        self.user = None
+
+    def json(self):
+        try:
+            _payload = json.loads(self.body or b'{}')
+        except ValueError:
+            raise IDMError(400, 'Malformed JSON body') from None
+        if not isinstance(_payload, dict):
+            raise IDMError(400, 'Malformed JSON body')
+        return _payload
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default listen backlog of 5 resets the connections of the clients
+    # that connect together, e.g. the threads of a concurrency test
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # a client that goes away, e.g. after reading part of a listing, is
+        # not an error of the server
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are written separately: without TCP_NODELAY
+    # each small response would wait for the delayed ACK of the client
+    disable_nagle_algorithm = True
+
+    def _serve(self):
+        _fake = self.server.fake
+        _length = int(self.headers.get('Content-Length') or 0)
+        _body = self.rfile.read(_length) if _length else b''
+
+        if _fake.latency:
+            time.sleep(_fake.latency)
+
+        _path = urlsplit(self.path).path
+        _fault = _fake._fault(self.command, _path)
+        if _fault is not None:
+            if _fault.delay:
+                time.sleep(_fault.delay)
+            if not _fault.status:
+                # the connection is dropped without answering
+                self.close_connection = True
+                return
+            _status, _payload, _headers = _fake._error(
+                _fault.status, 'Injected error')
+            _headers = dict(_headers, **_fault.headers)
+        else:
+            _status, _payload, _headers = _fake.handle(
+                self.command, self.path, self.headers, _body)
+
+        _data = b'' if _payload is None else json.dumps(_payload).encode()
+        self.send_response(_status)
+        if _payload is not None:
+            self.send_header('Content-Type',
+                             'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(_data)))
+        for _name, _value in _headers.items():
+            self.send_header(_name, _value)
+        self.end_headers()
+        self.wfile.write(_data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Runs a fake Keyrock IDM with in-memory state.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3005)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to each request')
+    parser.add_argument('--users', type=int, default=0,
+                        help='number of generated users')
+    parser.add_argument('--organizations', type=int, default=0,
+                        help='number of generated organizations')
+    parser.add_argument('--applications', type=int, default=0,
+                        help='number of generated applications')
+    args = parser.parse_args()
+
+    _fake = FakeKeyrock(args.host, args.port, latency=args.latency)
+    _fake.seed(users=args.users, organizations=args.organizations,
+               applications=args.applications)
+    with _fake:
+        print(f"Fake Keyrock listening on {_fake.url}", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+Runs the test suites against the fake Keyrock of keyrock.testing, on
+localhost:3005. Set PYKEYROCK_LIVE_IDM=1 to run them against a real Keyrock
+(e.g. the one of docker-compose.yaml) instead.
+"""
+
+from keyrock.testing import FakeKeyrock
+import os
+import warnings
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def fake_keyrock():
+    if os.environ.get('PYKEYROCK_LIVE_IDM'):
+        yield None
+        return
+
+    _fake = FakeKeyrock(host='localhost', port=3005)
+    try:
+        _fake.start()
+    except OSError as _error:
+        warnings.warn(f"Cannot start the fake Keyrock ({_error}): "
+                      f"using the IDM listening on localhost:3005")
+        yield None
+        return
+    yield _fake
+    _fake.stop()
@@ -32,6 +32,7 @@ from utils import random_permission_name, random_permission_resource
 # from keyrock import IDMApplication
 # from keyrock import IDMProxy
 from keyrock import IDMManager, IDMQuery, get_auth_token
+from keyrock.testing import FakeKeyrock
 
 from requests.exceptions import HTTPError
 
@@ -98,6 +99,61 @@ class TestApplication(unittest.TestCase):
         _apps = self._im.get_application(_app_name, IDMQuery.BY_NAME)
         self.assertEqual(len(_apps), 2, "Duplicated application not created")
 
+    def test_get_application_by_name_indexed(self):
+        """
+        """
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, indexes=True) as _im:
+            _app_name = random_app_name()
+
+            _app_1 = _im.create_application(_app_name)
+            _app_2 = _im.create_application(_app_name)
+            _apps = _im.get_application(_app_name, IDMQuery.BY_NAME)
+            self.assertEqual(len(_apps), 2, "Index not updated on creation")
+
+            _im.delete_application(_app_1.id)
+            _apps = _im.get_application(_app_name, IDMQuery.BY_NAME)
+            self.assertEqual([_a.id for _a in _apps], [_app_2.id],
+                             "Index not updated on deletion")
+
+            _im.refresh_indexes()
+            _apps = _im.get_application(_app_name, IDMQuery.BY_NAME)
+            self.assertEqual(len(_apps), 1, "Wrong number of applications")
+            self.assertEqual(
+                _im.index_stats['applications_by_name']['rebuilds'], 2,
+                "Wrong number of rebuilds")
+
+    def test_name_index_error(self):
+        """
+        """
+        _fake = FakeKeyrock().start()
+        try:
+            _token, _ = get_auth_token(_fake.host, _fake.port,
+                                       self.keyrock_admin, self.keyrock_passw)
+            with IDMManager(_fake.host, _fake.port, _token,
+                            indexes=True) as _im:
+                _app = _im.create_application(random_app_name())
+                _role = _im.create_role(_app.id, random_role_name())
+
+                _fake.inject_error(500, method='GET',
+                                   path='^/v1/applications$')
+                with self.assertRaises(
+                        HTTPError, msg="Not raising error on failed index"):
+                    _im.get_application(_app.name, IDMQuery.BY_NAME)
+                _apps = _im.get_application(_app.name, IDMQuery.BY_NAME)
+                self.assertEqual([_a.id for _a in _apps], [_app.id],
+                                 "Empty application index built")
+
+                _fake.inject_error(500, method='GET', path='/roles$')
+                with self.assertRaises(
+                        HTTPError, msg="Not raising error on failed index"):
+                    _im.get_role(_app.id, _role.name, IDMQuery.BY_NAME)
+                _roles = _im.get_role(_app.id, _role.name, IDMQuery.BY_NAME)
+                self.assertEqual([_r.id for _r in _roles], [_role.id],
+                                 "Empty role index built")
+        finally:
+            _fake.stop()
+
     def test_get_application(self):
         """
         """
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the asyncio version of the IDMManager.
+"""
+
+import asyncio
+import unittest
+import uuid
+
+from utils import random_app_name, random_role_name
+from utils import random_user_name, random_user_email, random_user_password
+
+from keyrock import AsyncIDMManager, IDMManager, IDMQuery, get_auth_token
+from keyrock.models import IDMApplication, IDMRole, IDMUser
+
+
+class TestAsyncIDMManager(unittest.TestCase):
+    """
+    Tests AsyncIDMManager operations.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+    def _manager(self):
+        return AsyncIDMManager(
+            self.keyrock_host, self.keyrock_port, self.auth_token,
+            limit_per_host=8)
+
+    def test_application_and_roles(self):
+        """
+        """
+        async def _run():
+            async with self._manager() as _aim:
+                _app = await _aim.create_application(random_app_name())
+                self.assertIsInstance(_app, IDMApplication)
+
+                _names = [random_role_name() for _ in range(5)]
+                _roles = await asyncio.gather(
+                    *[_aim.create_role(_app.id, _n) for _n in _names])
+                for _role, _name in zip(_roles, _names):
+                    self.assertIsInstance(_role, IDMRole)
+                    self.assertEqual(_role.name, _name, "Wrong name")
+
+                _res = await _aim.get_role(_app.id, _roles[0].id)
+                self.assertEqual(_res.name, _names[0], "Wrong name")
+
+                _res = await _aim.get_role(_app.id, _names[1],
+                                           IDMQuery.BY_NAME)
+                self.assertEqual(len(_res), 1, "Wrong number of roles")
+
+                _res = await _aim.get_application(uuid.uuid4())
+                self.assertEqual(_res, None, "Returns not None object")
+
+                await _aim.delete_application(_app.id)
+                _res = await _aim.get_application(_app.id)
+                self.assertEqual(_res, None, "Application not deleted")
+
+        asyncio.run(_run())
+
+    def test_concurrent_users(self):
+        """
+        """
+        async def _run():
+            async with self._manager() as _aim:
+                _emails = [random_user_email() for _ in range(10)]
+                _users = await asyncio.gather(
+                    *[_aim.create_user(_e, random_user_password(),
+                                       random_user_name())
+                      for _e in _emails])
+
+                _res = await asyncio.gather(
+                    *[_aim.get_user(_u.id) for _u in _users])
+                for _user, _email in zip(_res, _emails):
+                    self.assertIsInstance(_user, IDMUser)
+                    self.assertEqual(_user.email, _email, "Wrong email")
+
+                _res = await _aim.get_user(_emails[0], IDMQuery.BY_LOGIN)
+                self.assertEqual(_res.id, _users[0].id, "Wrong id")
+
+                await asyncio.gather(
+                    *[_aim.delete_user(_u.id) for _u in _users])
+                _res = await _aim.get_user(_users[0].id)
+                self.assertEqual(_res, None, "User not deleted")
+
+        asyncio.run(_run())
+
+    def tearDown(self):
+        _im = IDMManager(
+            self.keyrock_host, self.keyrock_port, self.auth_token)
+        for _app in _im.list_applications():
+            if _app.name.startswith('pykeyrock unittest'.capitalize()):
+                _im.delete_application(_app.id)
+        for _user in _im.list_users():
+            if _user.email.startswith('pykeyrock_unittest'):
+                _im.delete_user(_user.id)
+        _im.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the bulk operations of IDMManager.
+"""
+
+import threading
+import time
+import unittest
+
+import requests
+
+from keyrock import BulkOperation, IDMManager, IDMQuery, get_auth_token
+from keyrock.testing import FakeKeyrock
+
+
+class TestBulkUsers(unittest.TestCase):
+    """
+    Tests IDMManager.create_users against the fake Keyrock.
+    """
+    WORKERS = 8
+
+    def setUp(self):
+        self.fake = FakeKeyrock().start()
+        self.keyrock_host = self.fake.host
+        self.keyrock_port = self.fake.port
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+        self.idm = IDMManager(self.keyrock_host, self.keyrock_port,
+                              self.auth_token, pool_maxsize=self.WORKERS,
+                              indexes=True)
+
+    def tearDown(self):
+        self.idm.close()
+        self.fake.stop()
+
+    def test_create_users(self):
+        """
+        """
+        _users = ({'email': f"pykeyrock_unittest_{_i}@example.com",
+                   'password': 'password', 'username': f"user {_i}"}
+                  for _i in range(50))
+        _bulk = self.idm.create_users(_users, max_workers=self.WORKERS)
+        _results = list(_bulk)
+
+        self.assertEqual(len(_results), 50, "Results lost")
+        self.assertTrue(all(_r.ok for _r in _results), "Creation failed")
+        for _result in _results:
+            self.assertEqual(_result.result.email, _result.item['email'],
+                             "Wrong result")
+        self.assertEqual(len(self.idm.list_users()), 51, "Users not created")
+        self.assertEqual(
+            self.idm.get_user('pykeyrock_unittest_7@example.com',
+                              IDMQuery.BY_LOGIN).name, 'user 7',
+            "Index not updated")
+
+        _stats = _bulk.stats
+        self.assertEqual((_stats['submitted'], _stats['succeeded'],
+                          _stats['failed'], _stats['in_flight']),
+                         (50, 50, 0, 0), "Wrong stats")
+        self.assertGreater(_stats['rate'], 0, "Wrong rate")
+
+    def test_errors_do_not_stop(self):
+        """
+        """
+        self.idm.create_user('pykeyrock_unittest_1@example.com', 'password')
+        _users = [(f"pykeyrock_unittest_{_i}@example.com", 'password')
+                  for _i in range(9)] + [('pykeyrock_unittest_9@example.com',)]
+
+        _failed = {_r.item[0]: _r.error for _r in
+                   self.idm.create_users(_users) if not _r.ok}
+
+        self.assertEqual(len(_failed), 2, "Wrong failures")
+        _error = _failed['pykeyrock_unittest_1@example.com']
+        self.assertIsInstance(_error, requests.HTTPError, "Wrong error")
+        self.assertEqual(_error.response.status_code, 409,
+                         "Duplicate not reported")
+        self.assertIsInstance(_failed['pykeyrock_unittest_9@example.com'],
+                              TypeError, "Invalid item not reported")
+        # the admin, the duplicate and the 8 created
+        self.assertEqual(len(self.idm.list_users()), 10,
+                         "Users not created")
+
+    def test_bounded_parallelism(self):
+        """
+        """
+        self.fake.latency = 0.05
+        _users = [(f"pykeyrock_unittest_{_i}@example.com", 'password')
+                  for _i in range(40)]
+
+        _start = time.perf_counter()
+        _results = list(self.idm.create_users(_users, max_workers=4))
+        _elapsed = time.perf_counter() - _start
+
+        self.assertTrue(all(_r.ok for _r in _results), "Creation failed")
+        # 10 rounds of 4 concurrent requests
+        self.assertGreaterEqual(_elapsed, 0.5, "Too many workers")
+        self.assertLess(_elapsed, 40 * 0.05, "Requests not concurrent")
+
+
+class TestBulkAuthorizations(unittest.TestCase):
+    """
+    Tests IDMManager.authorize_users and revoke_users against the fake
+    Keyrock.
+    """
+    GRANT = 'POST /v1/applications/{app}/users/{user}/roles/{role}'
+    REVOKE = 'DELETE /v1/applications/{app}/users/{user}/roles/{role}'
+
+    def setUp(self):
+        self.fake = FakeKeyrock().start()
+        self.keyrock_host = self.fake.host
+        self.keyrock_port = self.fake.port
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+        self.idm = IDMManager(self.keyrock_host, self.keyrock_port,
+                              self.auth_token)
+
+        _seeded = self.fake.seed(users=20, applications=1, roles=2)
+        self.users = _seeded['users']
+        self.app_id = _seeded['applications'][0]
+        self.roles = _seeded['roles'][self.app_id]
+
+    def tearDown(self):
+        self.idm.close()
+        self.fake.stop()
+
+    def _granted(self):
+        # the admin, who created the application, is its provider
+        return {(_a['user_id'], _a['role_id']) for _a in
+                self.idm.list_application_users(self.app_id)
+                if _a['user_id'] != 'admin'}
+
+    def test_authorize_users(self):
+        """
+        """
+        for _user_id in self.users[:5]:
+            self.idm.authorize_user(self.app_id, self.roles[0], _user_id)
+        self.fake.reset_stats()
+
+        _pairs = [(_user_id, self.roles[0]) for _user_id in self.users]
+        _pairs += [(self.users[0], self.roles[1])] * 3
+        _report = self.idm.authorize_users(self.app_id, _pairs).report()
+
+        self.assertEqual(len(_report['succeeded']), 16, "Wrong grants")
+        # the 5 already granted and the 2 repeated
+        self.assertEqual(len(_report['skipped']), 7, "Wrong skipped")
+        self.assertEqual(_report['failed'], [], "Grants failed")
+        self.assertEqual(self._granted(), set(_pairs), "Wrong assignments")
+        self.assertEqual(self.fake.requests[self.GRANT], 16,
+                         "Skipped pairs sent")
+        # the snapshot and the check above
+        self.assertEqual(
+            self.fake.requests['GET /v1/applications/{app}/users'], 2,
+            "Snapshot not taken once")
+
+    def test_revoke_users(self):
+        """
+        """
+        for _user_id in self.users[:10]:
+            self.idm.authorize_user(self.app_id, self.roles[0], _user_id)
+        self.fake.reset_stats()
+
+        _bulk = self.idm.revoke_users(
+            self.app_id, [(_user_id, self.roles[0])
+                          for _user_id in self.users[5:15]])
+        _results = list(_bulk)
+
+        self.assertEqual(len(_results), 10, "Results lost")
+        self.assertTrue(all(_r.ok for _r in _results), "Revocations failed")
+        self.assertEqual(
+            {_r.item[0] for _r in _results if _r.skipped},
+            set(self.users[10:15]), "Wrong skipped")
+        self.assertEqual(self._granted(),
+                         {(_u, self.roles[0]) for _u in self.users[:5]},
+                         "Wrong assignments")
+        self.assertEqual(self.fake.requests[self.REVOKE], 5,
+                         "Skipped pairs sent")
+        _stats = _bulk.stats
+        self.assertEqual((_stats['succeeded'], _stats['skipped']), (5, 5),
+                         "Wrong stats")
+
+    def test_failures_reported(self):
+        """
+        """
+        _pairs = [(_user_id, self.roles[0]) for _user_id in self.users[:4]]
+        _pairs.append((self.users[4], 'unknown'))
+        _report = self.idm.authorize_users(self.app_id, _pairs).report()
+
+        self.assertEqual(len(_report['succeeded']), 4, "Wrong grants")
+        self.assertEqual([_r.item for _r in _report['failed']],
+                         [(self.users[4], 'unknown')], "Wrong failures")
+        self.assertEqual(_report['failed'][0].error.response.status_code,
+                         404, "Wrong error")
+
+    def test_snapshot_error(self):
+        """
+        """
+        self.fake.inject_error(500, method='GET', path='/users$')
+        with self.assertRaises(requests.HTTPError):
+            self.idm.revoke_users(self.app_id,
+                                  [(self.users[0], self.roles[0])]).report()
+
+    def test_rate_limit(self):
+        """
+        """
+        _pairs = [(_user_id, self.roles[0]) for _user_id in self.users[:10]]
+        _start = time.perf_counter()
+        _report = self.idm.authorize_users(self.app_id, _pairs,
+                                           rate=50).report()
+        self.assertEqual(len(_report['succeeded']), 10, "Wrong grants")
+        # 10 requests spaced by 20 ms
+        self.assertGreaterEqual(time.perf_counter() - _start, 0.18,
+                                "Rate not limited")
+
+
+class TestBulkOperation(unittest.TestCase):
+    """
+    Tests the streaming of the results of BulkOperation.
+    """
+    def test_lazy_iterable(self):
+        """
+        """
+        _read = list()
+        _release = threading.Event()
+
+        def _items():
+            for _i in range(1000):
+                _read.append(_i)
+                yield _i
+
+        def _func(item):
+            _release.wait()
+            return item * 2
+
+        _bulk = BulkOperation(_func, _items(), max_workers=2)
+        _results = iter(_bulk)
+        threading.Timer(0.1, _release.set).start()
+        _first = next(_results)
+        self.assertEqual(_first.result, _first.item * 2, "Wrong result")
+        self.assertLess(len(_read), 10, "Iterable read in advance")
+
+        # leaving early cancels the remaining items
+        _results.close()
+        self.assertLess(_bulk.stats['submitted'], 10, "Items not cancelled")
+        with self.assertRaises(RuntimeError):
+            iter(_bulk)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the IDMCache entity cache.
+"""
+
+import base64
+import time
+import unittest
+import uuid
+
+from utils import random_app_name, random_role_name, random_permission_name
+from utils import random_permission_resource
+from utils import random_user_email, random_user_password
+
+from keyrock import IDMManager, check_auth_token, get_auth_token
+from keyrock.cache import IDMCache, IDMOAuth2TokenCache, IDMTokenCache
+from requests.exceptions import HTTPError
+
+
+class TestIDMCache(unittest.TestCase):
+    """
+    Tests the IDMCache expiration and eviction policies.
+    """
+    def test_lru_eviction(self):
+        """
+        """
+        _cache = IDMCache(max_size=2)
+        _cache.put(('user', '1'), 'one')
+        _cache.put(('user', '2'), 'two')
+        self.assertEqual(_cache.get(('user', '1')), (True, 'one'))
+
+        _cache.put(('user', '3'), 'three')
+        self.assertEqual(_cache.get(('user', '2')), (False, None),
+                         "Least recently used entry not evicted")
+        self.assertEqual(_cache.get(('user', '1')), (True, 'one'))
+        self.assertEqual(_cache.stats['evictions'], 1,
+                         "Wrong number of evictions")
+
+    def test_ttls(self):
+        """
+        """
+        _cache = IDMCache(ttl=60, ttls={'user': 0.05}, negative_ttl=60)
+        _cache.put(('user', '1'), 'one')
+        _cache.put(('role', 'app', '1'), 'role')
+        _cache.put_missing(('user', '2'))
+        time.sleep(0.1)
+
+        self.assertEqual(_cache.get(('user', '1')), (False, None),
+                         "Entry not expired")
+        self.assertEqual(_cache.get(('role', 'app', '1')), (True, 'role'))
+        self.assertEqual(_cache.get(('user', '2')), (True, None),
+                         "Missing entity not cached")
+        self.assertEqual(_cache.stats['expirations'], 1,
+                         "Wrong number of expirations")
+
+    def test_invalidate_prefix(self):
+        """
+        """
+        _cache = IDMCache()
+        _cache.put(('role', 'app1', '1'), 'one')
+        _cache.put(('role', 'app1', '2'), 'two')
+        _cache.put(('role', 'app2', '1'), 'three')
+
+        _cache.invalidate('role', 'app1')
+        self.assertEqual(len(_cache), 1, "Entries not invalidated")
+        self.assertEqual(_cache.get(('role', 'app2', '1')), (True, 'three'))
+
+
+class TestCachedIDMManager(unittest.TestCase):
+    """
+    Tests the IDMManager methods backed by an IDMCache.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+        self._im = IDMManager(
+            self.keyrock_host, self.keyrock_port, self.auth_token,
+            cache=IDMCache())
+        self._app = self._im.create_application(random_app_name())
+
+    def test_get_role(self):
+        """
+        """
+        _role = self._im.create_role(self._app.id, random_role_name())
+
+        _res_1 = self._im.get_role(self._app.id, _role.id)
+        _res_2 = self._im.get_role(self._app.id, _role.id)
+        self.assertIs(_res_1, _res_2, "Role not cached")
+        self.assertEqual(self._im.cache.stats['hits'], 1, "Wrong hits")
+
+        self._im.delete_role(self._app.id, _role.id)
+        _res = self._im.get_role(self._app.id, _role.id)
+        self.assertEqual(_res, None, "Role not invalidated")
+
+    def test_get_not_existing_application(self):
+        """
+        """
+        _app_id = uuid.uuid4()
+        self.assertEqual(self._im.get_application(_app_id), None)
+        self.assertEqual(self._im.get_application(_app_id), None)
+        self.assertEqual(self._im.cache.stats['hits'], 1,
+                         "Missing application not cached")
+
+    def test_permission_invalidation(self):
+        """
+        """
+        _role = self._im.create_role(self._app.id, random_role_name())
+        _permission = self._im.create_permission(
+            random_permission_name(), "GET", random_permission_resource(),
+            False, self._app.id)
+
+        self._im.get_permission(self._app.id, _permission.id)
+        self._im.get_role(self._app.id, _role.id)
+        self._im.assign_permission_to_role(self._app.id, _role.id,
+                                           _permission.id)
+        self._im.remove_permission_from_role(self._app.id, _role.id,
+                                             _permission.id)
+        self.assertEqual(len(self._im.cache), 0, "Entries not invalidated")
+
+        self._im.get_permission(self._app.id, _permission.id)
+        self._im.delete_permission(self._app.id, _permission.id)
+        _res = self._im.get_permission(self._app.id, _permission.id)
+        self.assertEqual(_res, None, "Permission not invalidated")
+
+    def tearDown(self):
+        _apps = self._im.list_applications()
+        for _app in _apps:
+            if _app.name.startswith('pykeyrock unittest'.capitalize()):
+                self._im.delete_application(_app.id)
+
+
+class TestIDMTokenCache(unittest.TestCase):
+    """
+    Tests check_auth_token backed by an IDMTokenCache.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+    def test_valid_token(self):
+        """
+        """
+        _cache = IDMTokenCache()
+        for _ in range(3):
+            _valid, _admin = check_auth_token(
+                self.keyrock_host, self.keyrock_port, self.auth_token,
+                self.auth_token, cache=_cache)
+            self.assertTrue(_valid, "Token not valid")
+            self.assertTrue(_admin, "Token not admin")
+
+        self.assertEqual(_cache.stats['misses'], 1, "Wrong misses")
+        self.assertEqual(_cache.stats['hits'], 2, "Wrong hits")
+
+        _cache.invalidate(self.auth_token)
+        self.assertEqual(len(_cache), 0, "Token not invalidated")
+
+    def test_invalid_token(self):
+        """
+        """
+        _cache = IDMTokenCache(negative_ttl=60)
+        _subj_token = str(uuid.uuid4())
+        for _ in range(2):
+            with self.assertRaises(
+                    HTTPError, msg="Not raising error on invalid token"):
+                check_auth_token(
+                    self.keyrock_host, self.keyrock_port, self.auth_token,
+                    _subj_token, cache=_cache)
+
+        self.assertEqual(_cache.stats['hits'], 1,
+                         "Invalid token not cached")
+
+    def test_invalid_auth_token(self):
+        """
+        """
+        _cache = IDMTokenCache(negative_ttl=60)
+        with self.assertRaises(HTTPError) as _ctx:
+            check_auth_token(
+                self.keyrock_host, self.keyrock_port, str(uuid.uuid4()),
+                self.auth_token, cache=_cache)
+        self.assertEqual(_ctx.exception.response.status_code, 401,
+                         "Invalid authentication token accepted")
+
+        # the rejection of the authentication token is not returned to the
+        # callers with a valid one
+        _valid, _ = check_auth_token(
+            self.keyrock_host, self.keyrock_port, self.auth_token,
+            self.auth_token, cache=_cache)
+        self.assertTrue(_valid, "Token not valid")
+
+
+class TestIDMOAuth2TokenCache(unittest.TestCase):
+    """
+    Tests IDMManager.get_oauth2_token backed by an IDMOAuth2TokenCache.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+        self._im = IDMManager(
+            self.keyrock_host, self.keyrock_port, self.auth_token,
+            oauth2_cache=IDMOAuth2TokenCache())
+        self._app = self._im.create_application(random_app_name())
+        self._secret = base64.b64encode(
+            f"{self._app.id}:{self._app.secret}".encode()).decode()
+
+        self._user_email = random_user_email()
+        self._user_password = random_user_password()
+        self._user = self._im.create_user(self._user_email,
+                                          self._user_password)
+
+    def test_token_reused(self):
+        """
+        """
+        _token, _expires = self._im.get_oauth2_token(
+            self._user_email, self._user_password, self._secret, False)
+        _cached, _ = self._im.get_oauth2_token(
+            self._user_email, self._user_password, self._secret, False)
+
+        self.assertEqual(_token, _cached, "Token not reused")
+        self.assertIsInstance(_expires, int, "Wrong expiration")
+
+    def test_wrong_password(self):
+        """
+        """
+        self._im.get_oauth2_token(
+            self._user_email, self._user_password, self._secret, False)
+        with self.assertRaises(
+                HTTPError, msg="Cached token returned for wrong password"):
+            self._im.get_oauth2_token(
+                self._user_email, 'wrong password', self._secret, False)
+
+    def tearDown(self):
+        self._im.delete_user(self._user.id)
+        self._im.delete_application(self._app.id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the JSON codecs.
+"""
+
+import json
+import unittest
+
+import requests
+
+from keyrock.codec import JSONCodec, decode_response, get_codec, orjson
+
+
+class _CountingCodec(JSONCodec):
+    def __init__(self):
+        self.calls = 0
+
+    def loads(self, data):
+        self.calls += 1
+        return super().loads(data)
+
+
+class TestCodec(unittest.TestCase):
+    """
+    Tests keyrock.codec.
+    """
+    def _response(self, content):
+        _response = requests.Response()
+        _response.status_code = 200
+        _response._content = content
+        return _response
+
+    def test_get_codec(self):
+        """
+        """
+        self.assertEqual(get_codec('json').name, 'json', "Wrong codec")
+        self.assertEqual(get_codec().name,
+                         'orjson' if orjson is not None else 'json',
+                         "Wrong default codec")
+        _codec = JSONCodec()
+        self.assertIs(get_codec(_codec), _codec, "Codec not used")
+        with self.assertRaises(ValueError, msg="Unknown codec"):
+            get_codec('yaml')
+
+    def test_decode_once(self):
+        """
+        """
+        _doc = {'users': [{'id': 1, 'name': 'José'}]}
+        _codec = _CountingCodec()
+        _response = self._response(json.dumps(_doc).encode())
+        self.assertEqual(decode_response(_response, _codec), _doc,
+                         "Wrong document")
+        self.assertEqual(decode_response(_response, _codec), _doc,
+                         "Wrong document")
+        self.assertEqual(_codec.calls, 1, "Body decoded more than once")
+
+    def test_round_trip(self):
+        """
+        """
+        _doc = {'name': 'José', 'list': [1, 2.5, None, True]}
+        for _name in ('json', 'orjson') if orjson is not None else ('json',):
+            _codec = get_codec(_name)
+            self.assertEqual(_codec.loads(_codec.dumps(_doc)), _doc,
+                             f"Wrong {_name} round trip")
+            with self.assertRaises(ValueError, msg="Invalid JSON"):
+                _codec.loads(b'{"a":')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests an IDMManager shared by many threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+
+from keyrock import (IDMCache, IDMCredentials, IDMManager, IDMMetrics,
+                     IDMQuery, SingleFlight)
+from keyrock.testing import FakeKeyrock
+
+
+def _workflow(im, index):
+    # Goes through all the endpoints, creating and deleting its own entities.
+    _email = f"pykeyrock_unittest_{index}@example.com"
+    _user = im.create_user(_email, 'password', f"pykeyrock user {index}")
+    assert im.get_user(_user.id).email == _email
+    assert im.get_user(_email, IDMQuery.BY_LOGIN).id == _user.id
+
+    _org = im.create_organization(f"Pykeyrock unittest org {index}")
+    assert im.get_organization(_org.id).id == _org.id
+    im.add_user_to_organization(_org.id, _user.id)
+    assert im.get_organization_member(_org.id, _user.id) is not None
+    assert len(im.list_organization_members(_org.id)) == 2
+    im.remove_user_from_organization(_org.id, _user.id)
+
+    _app = im.create_application(f"Pykeyrock unittest app {index}")
+    assert im.get_application(_app.id).id == _app.id
+    _role = im.create_role(_app.id, f"PykeyrockUnittestRole{index}")
+    assert [_r.id for _r in im.get_role(
+        _app.id, _role.name, IDMQuery.BY_NAME)] == [_role.id]
+    _perm = im.create_permission(f"Pykeyrock permission {index}", 'GET',
+                                 f'pykeyrock/{index}',
+                                 application_id=_app.id)
+    assert im.get_permission(_app.id, _perm.id).id == _perm.id
+    im.assign_permission_to_role(_app.id, _role.id, _perm.id)
+    assert len(im.list_role_permissions(_app.id, _role.id)) == 1
+    im.authorize_user(_app.id, _role.id, _user.id)
+    assert _user.id in [_a['user_id'] for _a in
+                        im.list_application_users(_app.id)]
+    im.revoke_user(_app.id, _role.id, _user.id)
+
+    im.create_proxy(_app.id)
+    assert im.get_proxy(_app.id) is not None
+    im.reset_proxy(_app.id)
+    im.delete_proxy(_app.id)
+
+    assert len(im.list_roles(_app.id)) == 3
+    assert len(im.list_permissions(_app.id)) == 7
+    assert im.list_users()
+    assert sum(1 for _ in im.iter_users()) > 0
+    assert im.list_applications()
+    assert im.list_organizations()
+
+    im.remove_permission_from_role(_app.id, _role.id, _perm.id)
+    im.delete_permission(_app.id, _perm.id)
+    im.delete_role(_app.id, _role.id)
+    im.delete_application(_app.id)
+    im.delete_organization(_org.id)
+    im.delete_user(_user.id)
+    assert im.get_user(_user.id) is None
+
+
+class TestConcurrency(unittest.TestCase):
+    """
+    Runs all the endpoint methods from many threads on a shared IDMManager,
+    with the caches, the indexes, the metrics and the token renewal enabled.
+    """
+    THREADS = 16
+    ROUNDS = 3
+
+    def setUp(self):
+        self.fake = FakeKeyrock().start()
+        self.keyrock_host = self.fake.host
+        self.keyrock_port = self.fake.port
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.credentials = IDMCredentials(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+    def tearDown(self):
+        self.credentials.close()
+        self.fake.stop()
+
+    def _hammer(self, im):
+        _start = threading.Barrier(self.THREADS)
+
+        def _run(index):
+            _start.wait()
+            for _round in range(self.ROUNDS):
+                _workflow(im, index * self.ROUNDS + _round)
+
+        with ThreadPoolExecutor(self.THREADS) as _executor:
+            for _future in [_executor.submit(_run, _i)
+                            for _i in range(self.THREADS)]:
+                # re-raises the failures of the threads
+                _future.result()
+
+        # only the admin user is left
+        self.assertEqual([_u.id for _u in im.list_users()], ['admin'],
+                         "Entities left behind")
+
+    def test_shared_session(self):
+        """
+        """
+        _metrics = IDMMetrics()
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.credentials, pool_maxsize=self.THREADS,
+                        indexes=True, cache=IDMCache(), metrics=_metrics,
+                        single_flight=SingleFlight()) as _im:
+            self._hammer(_im)
+
+        _snapshot = _metrics.snapshot()
+        self.assertEqual(_snapshot['create_user']['requests'],
+                         self.THREADS * self.ROUNDS, "Requests lost")
+        self.assertEqual(self.credentials.refreshes, 1,
+                         "Token requested more than once")
+
+    def test_per_thread_session(self):
+        """
+        """
+        _sessions = set()
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.credentials, per_thread_session=True,
+                        hooks={'before_request': lambda _call: None}) as _im:
+            self._hammer(_im)
+            _sessions.add(id(_im.session))
+
+            def _session(_):
+                return id(_im.session)
+            with ThreadPoolExecutor(4) as _executor:
+                _sessions.update(_executor.map(_session, range(4)))
+
+        self.assertGreater(len(_sessions), 1, "Session shared by threads")
+
+    def test_session_option_conflict(self):
+        """
+        """
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        'token') as _im:
+            with self.assertRaises(ValueError):
+                IDMManager(self.keyrock_host, self.keyrock_port, 'token',
+                           session=_im.session, per_thread_session=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the auto-refreshing IDM credentials.
+"""
+
+from datetime import datetime, timedelta, timezone
+import unittest
+
+from keyrock import IDMCredentials, IDMManager
+from requests.exceptions import HTTPError
+
+
+class TestCredentials(unittest.TestCase):
+    """
+    Tests IDMCredentials and its use by IDMManager.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+        self._credentials = IDMCredentials(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+    def test_token(self):
+        """
+        """
+        _token = self._credentials.token
+        self.assertNotEqual(_token, None, "Token not requested")
+        self.assertIsInstance(self._credentials.expires, datetime,
+                              "Expiration not parsed")
+        self.assertEqual(self._credentials.token, _token, "Token renewed")
+        self.assertEqual(self._credentials.refreshes, 1,
+                         "Wrong number of renewals")
+
+        # a refresh for an already replaced token does not contact the IDM
+        _new_token = self._credentials.refresh(_token)
+        self.assertEqual(self._credentials.refresh(_token), _new_token,
+                         "Token renewed twice")
+        self.assertEqual(self._credentials.refreshes, 2,
+                         "Wrong number of renewals")
+
+    def test_retry_on_unauthorized(self):
+        """
+        """
+        _im = IDMManager(
+            self.keyrock_host, self.keyrock_port, self._credentials)
+        self.assertNotEqual(len(_im.list_users()), 0, "No users found")
+
+        # simulates a token revoked before its expiration
+        _expires = datetime.now(timezone.utc) + timedelta(hours=1)
+        self._credentials._current = ('not-a-token', _expires, _expires)
+        self.assertNotEqual(len(_im.list_users()), 0,
+                            "Request not retried with a new token")
+        self.assertNotEqual(self._credentials.token, 'not-a-token',
+                            "Token not renewed")
+
+    def test_renewal_after_close(self):
+        """
+        """
+        _token = self._credentials.token
+        self._credentials.close()
+        self.assertIsNone(self._credentials._thread, "Renewal not stopped")
+
+        # the token is still fresh: the renewal restarts anyway
+        self.assertEqual(self._credentials.token, _token, "Token renewed")
+        self.assertTrue(self._credentials._thread.is_alive(),
+                        "Renewal not restarted")
+
+    def test_wrong_password(self):
+        """
+        """
+        _credentials = IDMCredentials(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            'wrong password', background=False)
+        with self.assertRaises(
+                HTTPError, msg="Not raising error on wrong password"):
+            _credentials.token
+
+    def tearDown(self):
+        self._credentials.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
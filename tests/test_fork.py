@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests an IDMManager created before forking worker processes.
+"""
+
+import json
+import os
+import signal
+import time
+import unittest
+
+from keyrock import (IDMCache, IDMCredentials, IDMManager, IDMMetrics,
+                     IDMQuery, SingleFlight)
+from keyrock.testing import FakeKeyrock
+
+
+def _in_child(func, timeout=10):
+    # Runs 'func' in a forked child process and returns its result, that
+    # must be JSON serializable, or None if it raised an exception.
+    _read, _write = os.pipe()
+    _pid = os.fork()
+    if _pid == 0:
+        _status = 1
+        try:
+            os.close(_read)
+            with os.fdopen(_write, 'w') as _out:
+                json.dump(func(), _out)
+            _status = 0
+        finally:
+            os._exit(_status)
+
+    os.close(_write)
+    _deadline = time.monotonic() + timeout
+    while os.waitpid(_pid, os.WNOHANG)[0] == 0:
+        if time.monotonic() > _deadline:
+            os.kill(_pid, signal.SIGKILL)
+            os.waitpid(_pid, 0)
+            raise AssertionError("Child process deadlocked")
+        time.sleep(0.01)
+    with os.fdopen(_read) as _in:
+        return json.loads(_in.read() or 'null')
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), "os.fork is not available")
+class TestFork(unittest.TestCase):
+    """
+    Uses in forked child processes an IDMManager warmed up by the parent.
+    """
+    def setUp(self):
+        self.fake = FakeKeyrock().start()
+        self.keyrock_host = self.fake.host
+        self.keyrock_port = self.fake.port
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.seeded = self.fake.seed(users=3, applications=1)
+        self.credentials = IDMCredentials(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+    def tearDown(self):
+        self.credentials.close()
+        self.fake.stop()
+
+    def test_warmed_up_manager(self):
+        """
+        """
+        _app_id = self.seeded['applications'][0]
+        _cache = IDMCache()
+        _metrics = IDMMetrics()
+        _im = IDMManager(self.keyrock_host, self.keyrock_port,
+                         self.credentials, indexes=True, cache=_cache,
+                         metrics=_metrics, single_flight=SingleFlight())
+        _im.get_application(_app_id)
+        _user_id = self.seeded['users'][0]
+        _login = _im.get_user(_user_id).login
+        self.assertEqual(_im.get_user(_login, IDMQuery.BY_LOGIN).id,
+                         _user_id, "Wrong user")
+        _parent_session = _im.session
+
+        def _child():
+            return {
+                'application': _im.get_application(_app_id).id,
+                'user': _im.get_user(_login, IDMQuery.BY_LOGIN).id,
+                'users': len(_im.list_users()),
+                'new_session': _im.session is not _parent_session,
+                'refresher': self.credentials._thread is not None and
+                self.credentials._thread.is_alive(),
+                'operations': sorted(_metrics.snapshot())
+            }
+
+        # the locks held by the threads of the parent stay held in the child
+        # unless they are replaced
+        with _cache._lock, self.credentials._lock:
+            self.fake.reset_stats()
+            _result = _in_child(_child)
+
+        self.assertIsNotNone(_result, "Child process failed")
+        self.assertEqual(_result['application'], _app_id, "Wrong application")
+        self.assertEqual(_result['user'], _user_id, "Wrong user")
+        self.assertEqual(_result['users'], 4, "Wrong users")
+        self.assertTrue(_result['new_session'], "Session inherited")
+        self.assertTrue(_result['refresher'], "Token renewal not restarted")
+        self.assertEqual(_result['operations'], ['list_users'],
+                         "Metrics inherited")
+        # the warmed up cache and index served the child
+        self.assertEqual(self.fake.requests,
+                         {'GET /v1/users': 1}, "Warm-up lost")
+
+        # the parent is not affected
+        self.assertIs(_im.session, _parent_session, "Parent session changed")
+        self.assertEqual(len(_im.list_users()), 4, "Parent request failed")
+        _im.close()
+
+    def test_cache_not_kept(self):
+        """
+        """
+        _app_id = self.seeded['applications'][0]
+        _cache = IDMCache(keep_on_fork=False)
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.credentials, cache=_cache) as _im:
+            _im.get_application(_app_id)
+
+            _sizes = _in_child(lambda: [len(_cache),
+                                        _im.get_application(_app_id).id])
+
+            self.assertEqual(_sizes, [0, _app_id], "Cache kept")
+            self.assertEqual(len(_cache), 1, "Parent cache cleared")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the request hooks of IDMManager.
+"""
+
+import unittest
+
+import requests
+
+from keyrock import IDMManager, get_auth_token
+from keyrock.hooks import url_template
+
+
+class TestHooks(unittest.TestCase):
+    """
+    Tests the before_request, after_response and on_error hooks.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+    def test_url_template(self):
+        """
+        """
+        self.assertEqual(
+            url_template('http://idm:3005/v1/applications/a1/users/u1/'
+                         'roles/r1'),
+            ('/v1/applications/{application_id}/users/{user_id}/roles/'
+             '{role_id}',
+             {'application_id': 'a1', 'user_id': 'u1', 'role_id': 'r1'}),
+            "Wrong template")
+        self.assertEqual(url_template('http://idm:3005/v1/users'),
+                         ('/v1/users', {}), "Wrong template")
+
+    def test_hooks(self):
+        """
+        """
+        _events = list()
+
+        def _before(call):
+            call.context['started'] = True
+            _events.append(('before', call.operation, call.status))
+
+        def _after(call):
+            self.assertTrue(call.context['started'], "Context not shared")
+            _events.append(('after', call.operation, call.status))
+
+        def _failing(call):
+            raise RuntimeError("hook failure")
+
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token,
+                        hooks={'before_request': [_before, _failing],
+                               'after_response': _after}) as _im:
+            _user = _im.get_user('admin')
+            self.assertIsNotNone(_user, "Request stopped by a hook")
+            _im.get_user('pykeyrock_unittest_missing_user')
+
+            _im.remove_hook('after_response', _after)
+            _im.list_users()
+
+        self.assertEqual(_events, [
+            ('before', 'get_user', None), ('after', 'get_user', 200),
+            ('before', 'get_user', None), ('after', 'get_user', 404),
+            ('before', 'list_users', None)], "Wrong hook calls")
+
+    def test_result_and_elapsed(self):
+        """
+        """
+        _calls = list()
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token) as _im:
+            _im.add_hook('after_response', _calls.append)
+            _im.get_user('admin')
+
+        _call = _calls[0]
+        self.assertEqual(_call.url_template, '/v1/users/{user_id}',
+                         "Wrong URL template")
+        self.assertEqual(_call.params, {'user_id': 'admin'}, "Wrong params")
+        self.assertEqual(_call.result['user']['id'], 'admin', "Wrong result")
+        self.assertGreater(_call.elapsed, 0, "Elapsed time not set")
+
+    def test_on_error(self):
+        """
+        """
+        _errors = list()
+        with IDMManager('localhost', 1, self.auth_token,
+                        hooks={'on_error': _errors.append}) as _im:
+            with self.assertRaises(requests.ConnectionError):
+                _im.list_users()
+
+        self.assertEqual(len(_errors), 1, "on_error hook not called")
+        self.assertIsInstance(_errors[0].error, requests.ConnectionError,
+                              "Wrong error")
+        self.assertIsNone(_errors[0].result, "Unexpected result")
+
+    def test_invalid_event(self):
+        """
+        """
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token) as _im:
+            with self.assertRaises(ValueError, msg="Invalid event accepted"):
+                _im.add_hook('after_request', print)
+            with self.assertRaises(ValueError, msg="Missing hook removed"):
+                _im.remove_hook('on_error', print)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module checks the cost of 'import keyrock' with 'python -X importtime'.
+"""
+
+import subprocess
+import sys
+import unittest
+
+# cumulative microseconds allowed for 'import keyrock'; the heavy
+# dependencies alone take far more
+IMPORT_BUDGET_US = 100000
+
+HEAVY_MODULES = ('requests', 'urllib3', 'aiohttp', 'dateutil', 'orjson')
+
+
+def import_times(statement: str):
+    """
+    Runs 'statement' in a new interpreter with '-X importtime' and returns
+    a dictionary of module name and cumulative import time in microseconds.
+    """
+    _result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    _times = dict()
+    for _line in _result.stderr.splitlines():
+        if not _line.startswith('import time:'):
+            continue
+        _fields = _line[len('import time:'):].split('|')
+        try:
+            _times[_fields[2].strip()] = int(_fields[1])
+        except (IndexError, ValueError):
+            # the header line
+            continue
+    return _times
+
+
+class TestImportTime(unittest.TestCase):
+    """
+    Tests that 'import keyrock' only defines names.
+    """
+    def test_no_heavy_dependencies(self):
+        """
+        """
+        _times = import_times('import keyrock')
+        _loaded = [_m for _m in _times
+                   if _m.split('.')[0] in HEAVY_MODULES]
+        self.assertEqual(_loaded, [],
+                         "Dependencies imported by 'import keyrock'")
+
+    def test_import_budget(self):
+        """
+        """
+        _times = import_times('import keyrock')
+        self.assertLess(_times['keyrock'], IMPORT_BUDGET_US,
+                        "'import keyrock' too slow")
+
+    def test_lazy_names(self):
+        """
+        """
+        _times = import_times('from keyrock import IDMTokenCache')
+        self.assertNotIn('requests', _times,
+                         "requests imported by the token cache")
+        _times = import_times('from keyrock import IDMManager')
+        self.assertIn('requests', _times, "IDMManager not imported")
+        self.assertNotIn('aiohttp', _times,
+                         "aiohttp imported by IDMManager")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the request metrics.
+"""
+
+import asyncio
+import base64
+import math
+import unittest
+from urllib.parse import urlencode
+
+from utils import random_app_name, random_user_email, random_user_password
+
+from keyrock import AsyncIDMManager, IDMManager, IDMMetrics, get_auth_token
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Tests keyrock.metrics.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+    def test_snapshot(self):
+        """
+        """
+        _metrics = IDMMetrics(buckets=(0.1, 1))
+        _metrics.record('get_user', 200, 0.05, 100, 0)
+        _metrics.record('get_user', 200, 0.5, 100, 0)
+        _metrics.record('get_user', 404, 2, 50, 0)
+        _metrics.record('get_user', 0, 0.01)
+
+        _user = _metrics.snapshot()['get_user']
+        self.assertEqual(_user['requests'], 4, "Wrong request count")
+        self.assertEqual(_user['errors'], 2, "Wrong error count")
+        self.assertEqual(_user['bytes_in'], 250, "Wrong bytes in")
+        self.assertEqual(_user['latency']['buckets'],
+                         {0.1: 2, 1: 3, math.inf: 4}, "Wrong histogram")
+        self.assertEqual(_user['statuses'][200]['latency']['buckets'],
+                         {0.1: 1, 1: 2, math.inf: 2}, "Wrong histogram")
+        self.assertAlmostEqual(_user['latency']['sum'], 2.56,
+                               msg="Wrong latency sum")
+
+        _metrics.reset()
+        self.assertEqual(_metrics.snapshot(), {}, "Metrics not reset")
+
+    def test_prometheus(self):
+        """
+        """
+        _metrics = IDMMetrics(buckets=(0.1,))
+        _metrics.record('list_users', 200, 0.05, 10, 0)
+        _text = _metrics.prometheus()
+        for _line in (
+                'pykeyrock_requests_total{operation="list_users",'
+                'status="200"} 1',
+                'pykeyrock_errors_total{operation="list_users"} 0',
+                'pykeyrock_request_duration_seconds_bucket{'
+                'operation="list_users",status="200",le="0.1"} 1',
+                'pykeyrock_request_duration_seconds_bucket{'
+                'operation="list_users",status="200",le="+Inf"} 1',
+                'pykeyrock_request_duration_seconds_count{'
+                'operation="list_users",status="200"} 1'):
+            self.assertIn(_line, _text.splitlines(), "Sample missing")
+
+    def test_manager_metrics(self):
+        """
+        """
+        _metrics = IDMMetrics()
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, metrics=_metrics) as _im:
+            self.assertIs(_im.metrics, _metrics, "Metrics not used")
+            _im.list_users()
+            _im.get_user('pykeyrock_unittest_missing_user')
+
+        _snapshot = _metrics.snapshot()
+        self.assertEqual(_snapshot['list_users']['statuses'][200]['requests'],
+                         1, "list_users not recorded")
+        self.assertGreater(_snapshot['list_users']['bytes_in'], 0,
+                           "Bytes in not recorded")
+        self.assertEqual(_snapshot['get_user']['errors'], 1,
+                         "get_user error not recorded")
+
+    def test_bytes_in_without_length(self):
+        """
+        """
+        def _drop_length(response, **kwargs):
+            # simulates a chunked response, without Content-Length
+            del response.headers['Content-Length']
+
+        _metrics = IDMMetrics()
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, metrics=_metrics) as _im:
+            _im.session.hooks['response'].append(_drop_length)
+            _users = _im.session.get(
+                f"{_im._idm_url}/v1/users",
+                headers={'X-Auth-token': self.auth_token}).content
+            _im.list_users()
+
+        self.assertEqual(_metrics.snapshot()['list_users']['bytes_in'],
+                         len(_users), "Wrong bytes in")
+
+    def test_async_manager_metrics(self):
+        """
+        """
+        _email = random_user_email()
+        _password = random_user_password()
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token) as _im:
+            _app = _im.create_application(random_app_name())
+            _user = _im.create_user(_email, _password)
+        _secret = base64.b64encode(
+            f"{_app.id}:{_app.secret}".encode()).decode()
+
+        async def _run(metrics):
+            async with AsyncIDMManager(
+                    self.keyrock_host, self.keyrock_port, self.auth_token,
+                    metrics=metrics) as _aim:
+                await _aim.get_oauth2_token(_email, _password, _secret, False)
+
+        _metrics = IDMMetrics()
+        try:
+            asyncio.run(_run(_metrics))
+        finally:
+            with IDMManager(self.keyrock_host, self.keyrock_port,
+                            self.auth_token) as _im:
+                _im.delete_user(_user.id)
+                _im.delete_application(_app.id)
+
+        # the form is sent url-encoded
+        _form = urlencode({'username': _email, 'password': _password,
+                           'grant_type': 'password'})
+        _snapshot = _metrics.snapshot()['get_oauth2_token']
+        self.assertEqual(_snapshot['statuses'][200]['requests'], 1,
+                         "get_oauth2_token not recorded")
+        self.assertEqual(_snapshot['bytes_out'], len(_form.encode()),
+                         "Wrong bytes out")
+        self.assertGreater(_snapshot['bytes_in'], 0, "Bytes in not recorded")
+
+
+if __name__ == '__main__':
+    unittest.main()
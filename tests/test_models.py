@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the model classes.
+"""
+
+import unittest
+
+from keyrock.models import IDMRole, IDMPermission, IDMUser
+from keyrock.models import LazyIDMRole, LazyIDMPermission
+
+
+class TestModels(unittest.TestCase):
+    """
+    Tests the compact and the lazy model classes.
+    """
+    def setUp(self):
+        self._role = {'id': 'role-1', 'name': 'role one'}
+        self._permission = {'id': 'perm-1', 'name': 'perm one',
+                            'action': 'GET', 'resource': '/one',
+                            'is_regex': False}
+
+    def test_without_dict(self):
+        """
+        """
+        _user = IDMUser(user_dict={'id': 'user-1', 'email': 'a@test.com',
+                                   'username': 'a', 'extra': 1},
+                        keep_dict=False)
+        self.assertFalse(hasattr(_user, '__dict__'),
+                         "Model with a per-instance dictionary")
+        self.assertEqual(_user.dict['email'], 'a@test.com',
+                         "Wrong rebuilt dictionary")
+        self.assertNotIn('extra', _user.dict, "Optional attribute kept")
+
+    def test_lazy_role(self):
+        """
+        """
+        _eager = IDMRole(role_dict=self._role, application_id='app')
+        _lazy = LazyIDMRole(self._role, 'app')
+        self.assertIsInstance(_lazy, IDMRole, "Not an IDMRole")
+        self.assertEqual(_lazy.id, _eager.id, "Wrong id")
+        self.assertEqual(repr(_lazy), repr(_eager), "Wrong attributes")
+        self.assertIs(_lazy.dict, self._role, "Wrong dictionary")
+
+    def test_lazy_permission(self):
+        """
+        """
+        _eager = IDMPermission(permission_dict=self._permission,
+                               application_id='app')
+        _lazy = LazyIDMPermission(self._permission, 'app')
+        self.assertIsInstance(_lazy, IDMPermission, "Not an IDMPermission")
+        for _name in ('id', 'name', 'action', 'resource', 'is_regex',
+                      'app_id'):
+            self.assertEqual(getattr(_lazy, _name), getattr(_eager, _name),
+                             f"Wrong {_name}")
+        with self.assertRaises(AttributeError, msg="Unknown attribute"):
+            _lazy.missing
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,7 @@ import unittest
 from utils import random_org_name, random_org_description
 
 from keyrock import IDMManager, IDMQuery, get_auth_token
+from keyrock.testing import FakeKeyrock
 from requests.exceptions import HTTPError
 
 
@@ -94,6 +95,53 @@ class TestOrganization(unittest.TestCase):
         _orgs = self._im.get_organization(_org_name, IDMQuery.BY_NAME)
         self.assertEqual(len(_orgs), 2, "Duplicated organizations not created")
 
+    def test_get_organization_by_name_indexed(self):
+        """
+        """
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, indexes=True) as _im:
+            _org_name = random_org_name()
+
+            _org_1 = _im.create_organization(_org_name)
+            _orgs = _im.get_organization(_org_name, IDMQuery.BY_NAME)
+            self.assertEqual(len(_orgs), 1, "Organization not indexed")
+
+            _org_2 = _im.create_organization(_org_name)
+            _orgs = _im.get_organization(_org_name, IDMQuery.BY_NAME)
+            self.assertEqual(len(_orgs), 2, "Index not updated on creation")
+
+            _im.delete_organization(_org_1.id)
+            _orgs = _im.get_organization(_org_name, IDMQuery.BY_NAME)
+            self.assertEqual([_o.id for _o in _orgs], [_org_2.id],
+                             "Index not updated on deletion")
+            self.assertEqual(
+                _im.index_stats['organizations_by_name']['rebuilds'], 1,
+                "Index rebuilt more than once")
+
+    def test_name_index_error(self):
+        """
+        """
+        _fake = FakeKeyrock().start()
+        try:
+            _token, _ = get_auth_token(_fake.host, _fake.port,
+                                       self.keyrock_admin, self.keyrock_passw)
+            with IDMManager(_fake.host, _fake.port, _token,
+                            indexes=True) as _im:
+                _org = _im.create_organization(random_org_name())
+
+                _fake.inject_error(500, method='GET',
+                                   path='^/v1/organizations$')
+                with self.assertRaises(
+                        HTTPError, msg="Not raising error on failed index"):
+                    _im.get_organization(_org.name, IDMQuery.BY_NAME)
+
+                # the failed listing is not kept as an empty index
+                _orgs = _im.get_organization(_org.name, IDMQuery.BY_NAME)
+                self.assertEqual([_o.id for _o in _orgs], [_org.id],
+                                 "Empty index built")
+        finally:
+            _fake.stop()
+
     def test_get_organization(self):
         """
         """
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the retry policy and the circuit breaker.
+"""
+
+import time
+import unittest
+
+import requests
+
+from keyrock import CircuitBreaker, IDMManager, RetryPolicy, get_auth_token
+from keyrock.retry import CircuitOpenError
+from keyrock.testing import FakeKeyrock
+
+
+class TestRetry(unittest.TestCase):
+    """
+    Tests the retries of IDMManager against the fake Keyrock.
+    """
+    def setUp(self):
+        self.fake = FakeKeyrock().start()
+        self.keyrock_host = self.fake.host
+        self.keyrock_port = self.fake.port
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+        self.retry = RetryPolicy(backoff_base=0.001)
+        self.idm = IDMManager(self.keyrock_host, self.keyrock_port,
+                              self.auth_token, retry=self.retry)
+
+    def tearDown(self):
+        self.idm.close()
+        self.fake.stop()
+
+    def test_retry_get(self):
+        """
+        """
+        self.fake.inject_error(502, method='GET', count=2)
+        self.fake.inject_error(0, method='GET', count=1)
+        self.assertEqual(len(self.idm.list_users()), 1, "Request failed")
+        self.assertEqual(self.retry.stats['retries'], 3, "Wrong retries")
+
+    def test_give_up(self):
+        """
+        """
+        self.fake.inject_error(503, method='GET', count=None)
+        _start = time.perf_counter()
+        self.assertIsNone(self.idm.get_user('admin'), "Request succeeded")
+        self.assertEqual(self.retry.stats,
+                         {'retries': 3, 'give_ups': 1}, "Wrong stats")
+        # full jitter: at most 1 + 2 + 4 ms of backoff
+        self.assertLess(time.perf_counter() - _start, 1, "Backoff too long")
+
+    def test_retry_after(self):
+        """
+        """
+        self.fake.inject_error(429, headers={'Retry-After': '0.2'})
+        _start = time.perf_counter()
+        self.assertEqual(len(self.idm.list_users()), 1, "Request failed")
+        self.assertGreaterEqual(time.perf_counter() - _start, 0.2,
+                                "Retry-After not respected")
+
+        self.fake.inject_error(429, headers={'Retry-After': '3600'})
+        self.assertEqual(self.idm.list_users(), [], "Long delay retried")
+
+    def test_post_retried_only_when_safe(self):
+        """
+        """
+        # the request may have been processed: not retried
+        self.fake.inject_error(502, method='POST', path='^/v1/users$')
+        with self.assertRaises(requests.HTTPError):
+            self.idm.create_user('pykeyrock_unittest_a@example.com', 'pwd')
+
+        # rejected before being processed: retried
+        self.fake.inject_error(503, method='POST', path='^/v1/users$')
+        _user = self.idm.create_user('pykeyrock_unittest_b@example.com',
+                                     'pwd')
+        self.assertIsNotNone(_user, "User not created")
+
+        # an idempotent POST operation
+        _app = self.idm.create_application('pykeyrock unittest app')
+        _role = self.idm.create_role(_app.id, 'PykeyrockUnittestRole')
+        self.fake.inject_error(502, method='POST', path='/roles/')
+        self.idm.authorize_user(_app.id, _role.id, _user.id)
+        self.assertIn(
+            _user.id,
+            [_a['user_id'] for _a in
+             self.idm.list_application_users(_app.id)],
+            "User not authorized")
+
+    def test_circuit_breaker(self):
+        """
+        """
+        _breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+        _host = f"http://{self.keyrock_host}:{self.keyrock_port}"
+        _im = IDMManager(self.keyrock_host, self.keyrock_port,
+                         self.auth_token, circuit_breaker=_breaker)
+
+        self.fake.inject_error(500, count=2)
+        _im.list_users()
+        _im.list_users()
+        self.assertEqual(_breaker.state(_host), CircuitBreaker.OPEN,
+                         "Circuit not open")
+        _requests = self.fake.request_count
+        with self.assertRaises(CircuitOpenError):
+            _im.list_users()
+        self.assertEqual(self.fake.request_count, _requests,
+                         "Request sent with the circuit open")
+
+        time.sleep(0.1)
+        self.assertEqual(_breaker.state(_host), CircuitBreaker.HALF_OPEN,
+                         "Circuit not half-open")
+        self.assertEqual(len(_im.list_users()), 1, "Probe failed")
+        self.assertEqual(_breaker.state(_host), CircuitBreaker.CLOSED,
+                         "Circuit not closed")
+        self.assertEqual(_breaker.stats['opened'], 1, "Wrong stats")
+        _im.close()
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """
+    Tests the backoff of RetryPolicy.
+    """
+    def test_full_jitter(self):
+        """
+        """
+        _policy = RetryPolicy(backoff_base=1, backoff_max=5)
+        for _attempt, _limit in ((0, 1), (1, 2), (2, 4), (6, 5)):
+            _delays = [_policy.backoff(_attempt) for _ in range(200)]
+            self.assertTrue(all(0 <= _d <= _limit for _d in _delays),
+                            "Backoff out of range")
+            self.assertGreater(len(set(_delays)), 1, "Backoff not jittered")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,7 @@ import unittest
 import uuid
 
 from keyrock import IDMManager, IDMQuery, get_auth_token
+from keyrock.models import LazyIDMRole
 from utils import random_role_name, random_app_name, random_permission_name
 from utils import random_permission_resource
 
@@ -55,6 +56,22 @@ class TestRole(unittest.TestCase):
 
         self.assertNotEqual(len(_roles), 0, "No roles found")
 
+    def test_list_roles_lazy(self):
+        """
+        """
+        _new_role = self._im.create_role(self._app.id, random_role_name())
+        _im = IDMManager(self.keyrock_host, self.keyrock_port,
+                         self.auth_token, lazy_models=True)
+        _roles = {_r.id: _r for _r in _im.list_roles(self._app.id)}
+        _eager = {_r.id: _r for _r in self._im.list_roles(self._app.id)}
+
+        self.assertIsInstance(_roles[_new_role.id], LazyIDMRole,
+                              "Role not lazy")
+        self.assertEqual(_roles[_new_role.id].name, _new_role.name,
+                         "Wrong role name")
+        self.assertEqual(sorted(_roles), sorted(_eager), "Wrong roles")
+        _im.close()
+
     def test_create_role(self):
         """
         """
@@ -88,6 +105,31 @@ class TestRole(unittest.TestCase):
         self.assertEqual(len(_roles), 2,
                          "Wrong number of roles found for the same name")
 
+    def test_get_role_by_name_indexed(self):
+        """
+        """
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, indexes=True) as _im:
+            _role_name = random_role_name()
+
+            _role_1 = _im.create_role(self._app.id, _role_name)
+            _roles = _im.get_role(self._app.id, _role_name, IDMQuery.BY_NAME)
+            self.assertEqual(len(_roles), 1, "Role not indexed")
+
+            _role_2 = _im.create_role(self._app.id, _role_name)
+            _roles = _im.get_role(self._app.id, _role_name, IDMQuery.BY_NAME)
+            self.assertEqual(len(_roles), 2, "Index not updated on creation")
+
+            _im.delete_role(self._app.id, _role_1.id)
+            _roles = _im.get_role(self._app.id, _role_name, IDMQuery.BY_NAME)
+            self.assertEqual([_r.id for _r in _roles], [_role_2.id],
+                             "Index not updated on deletion")
+
+            _stats = _im.index_stats['roles_by_name']
+            self.assertEqual(_stats['rebuilds'], 1,
+                             "Index rebuilt more than once")
+            self.assertEqual(_stats['hits'], 3, "Wrong number of hits")
+
     def test_create_empty_role(self):
         """
         """
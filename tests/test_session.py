@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the connection pool shared by IDMManager and the module
+level functions.
+"""
+
+import unittest
+
+from keyrock import IDMManager, create_session, get_auth_token
+from keyrock.idm import check_auth_token
+
+
+class TestSession(unittest.TestCase):
+    """
+    Tests the IDMManager connection pool and lifecycle.
+    """
+    def setUp(self):
+        self.keyrock_host = "localhost"
+        self.keyrock_port = 3005
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+    def test_shared_session(self):
+        """
+        """
+        _session = create_session(pool_maxsize=2)
+        _token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw, session=_session)
+
+        with IDMManager(self.keyrock_host, self.keyrock_port, _token,
+                        session=_session) as _im:
+            self.assertIs(_im.session, _session, "Session not shared")
+            _valid, _admin = check_auth_token(
+                self.keyrock_host, self.keyrock_port, _token, _token,
+                session=_im.session)
+            self.assertTrue(_valid, "Token not valid")
+            self.assertNotEqual(len(_im.list_users()), 0, "No users found")
+
+        # the shared session is not owned by the manager and stays usable
+        _valid, _ = check_auth_token(
+            self.keyrock_host, self.keyrock_port, _token, _token,
+            session=_session)
+        self.assertTrue(_valid, "Shared session closed by the manager")
+        _session.close()
+
+    def test_context_manager(self):
+        """
+        """
+        _token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+
+        with IDMManager(self.keyrock_host, self.keyrock_port, _token,
+                        pool_maxsize=4, keep_alive=False) as _im:
+            _users = _im.list_users()
+            self.assertNotEqual(len(_users), 0, "No users found")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the coalescing of the concurrent identical requests.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+
+import requests
+
+from keyrock import IDMManager, SingleFlight, get_auth_token
+from keyrock.idm import check_auth_token
+from keyrock.testing import FakeKeyrock
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    Tests the single_flight option of IDMManager and check_auth_token.
+    """
+    THREADS = 8
+
+    def setUp(self):
+        self.fake = FakeKeyrock().start()
+        self.keyrock_host = self.fake.host
+        self.keyrock_port = self.fake.port
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+        self.app_id = self.fake.seed(applications=1)['applications'][0]
+        self.flights = SingleFlight()
+        # the requests stay in flight long enough to overlap
+        self.fake.latency = 0.2
+        self.fake.reset_stats()
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def _concurrently(self, func):
+        _barrier = threading.Barrier(self.THREADS)
+
+        def _call(_):
+            _barrier.wait()
+            try:
+                return func()
+            except Exception as _error:
+                return _error
+
+        with ThreadPoolExecutor(self.THREADS) as _executor:
+            return list(_executor.map(_call, range(self.THREADS)))
+
+    def test_coalesced_get(self):
+        """
+        """
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, pool_maxsize=self.THREADS,
+                        single_flight=self.flights) as _im:
+            _apps = self._concurrently(
+                lambda: _im.get_application(self.app_id))
+
+        self.assertTrue(all(_app.id == self.app_id for _app in _apps),
+                        "Wrong results")
+        self.assertEqual(
+            self.fake.requests['GET /v1/applications/{app}'], 1,
+            "Requests not coalesced")
+        self.assertEqual(self.flights.stats['coalesced'], self.THREADS - 1,
+                         "Wrong coalesced count")
+
+    def test_shared_exception(self):
+        """
+        """
+        _results = self._concurrently(
+            lambda: check_auth_token(
+                self.keyrock_host, self.keyrock_port, self.auth_token,
+                'invalid', single_flight=self.flights))
+
+        self.assertTrue(
+            all(isinstance(_r, requests.HTTPError) for _r in _results),
+            "Exception not shared")
+        self.assertEqual(self.fake.requests['GET /v1/auth/tokens'], 1,
+                         "Requests not coalesced")
+
+    def test_mutations_not_coalesced(self):
+        """
+        """
+        self.fake.latency = 0
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, pool_maxsize=self.THREADS,
+                        single_flight=self.flights) as _im:
+            self._concurrently(
+                lambda: _im.create_role(self.app_id, 'PykeyrockUnittest'))
+            _roles = _im.list_roles(self.app_id)
+
+        # the two default roles and the created ones
+        self.assertEqual(len(_roles), 2 + self.THREADS, "Roles coalesced")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the incremental parsing of the IDM listings.
+"""
+
+import json
+import random
+import unittest
+
+from keyrock.stream import iter_json_array
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """
+    Tests keyrock.stream.iter_json_array.
+    """
+    def _chunks(self, data, count):
+        _cuts = sorted(random.sample(range(1, len(data)), count))
+        return [data[_i:_j] for _i, _j in
+                zip([0] + _cuts, _cuts + [len(data)])]
+
+    def test_random_chunks(self):
+        """
+        """
+        _doc = {
+            "meta": {"nested": [1, {"brace": "}]"}]},
+            "users": [{"id": _i, "email": f"user_{_i}@example.com",
+                       "name": "José \U0001F600", "enabled": _i % 2 == 0,
+                       "score": _i * 1.5} for _i in range(200)] + [12345],
+            "tail": None
+        }
+        _data = json.dumps(_doc, ensure_ascii=False).encode()
+
+        for _ in range(50):
+            _items = list(iter_json_array(self._chunks(_data, 40), 'users'))
+            self.assertEqual(_items, _doc['users'], "Wrong items")
+
+    def test_missing_or_empty(self):
+        """
+        """
+        self.assertEqual(list(iter_json_array([b'{}'], 'users')), [])
+        self.assertEqual(list(iter_json_array([b'{"users": []}'], 'users')),
+                         [])
+        self.assertEqual(list(iter_json_array([b'{"roles": [1]}'], 'users')),
+                         [])
+
+    def test_truncated(self):
+        """
+        """
+        with self.assertRaises(ValueError, msg="Truncated document parsed"):
+            list(iter_json_array([b'{"users": [{"id": 1}, {"id"'], 'users'))
+        with self.assertRaises(ValueError, msg="Array parsed as object"):
+            list(iter_json_array([b'[1, 2]'], 'users'))
+
+
+if __name__ == '__main__':
+    unittest.main()
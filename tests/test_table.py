@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the columnar storage of the user listings.
+"""
+
+from datetime import datetime, timezone
+import math
+import unittest
+
+from keyrock import UserTable
+
+
+def _user(index):
+    return {
+        'id': f'id-{index}',
+        'email': f'user_{index}@example.com',
+        'username': f'José {index}' if index % 3 else None,
+        'enabled': index % 4 != 0,
+        'date_password': f'2021-{index % 12 + 1:02d}-01T10:00:00.000Z',
+        'description': 'not stored'
+    }
+
+
+class TestUserTable(unittest.TestCase):
+    """
+    Tests keyrock.UserTable.
+    """
+    def setUp(self):
+        self._users = [_user(_i) for _i in range(100)]
+        self._table = UserTable(self._users)
+
+    def test_rows(self):
+        """
+        """
+        self.assertEqual(len(self._table), 100, "Wrong length")
+        for _index in (0, 1, 42, 99, -1):
+            _expected = {_k: self._users[_index][_k]
+                         for _k in UserTable.COLUMNS}
+            self.assertEqual(self._table.row(_index), _expected,
+                             "Wrong row")
+        self.assertEqual(self._table[5].email, 'user_5@example.com',
+                         "Wrong user")
+        self.assertEqual([_u.id for _u in self._table],
+                         [_u['id'] for _u in self._users], "Wrong users")
+        with self.assertRaises(IndexError, msg="Index out of range"):
+            self._table.row(100)
+
+    def test_columns(self):
+        """
+        """
+        self.assertEqual(self._table.column('username'),
+                         [_u['username'] for _u in self._users],
+                         "Wrong column")
+        _dates = self._table.column('date_password')
+        self.assertEqual(
+            _dates[0], datetime(2021, 1, 1, 10, tzinfo=timezone.utc)
+            .timestamp(), "Wrong timestamp")
+        with self.assertRaises(KeyError, msg="Not existing column"):
+            self._table.column('description')
+
+    def test_filters(self):
+        """
+        """
+        _disabled = self._table.disabled()
+        self.assertEqual(_disabled.column('id'),
+                         [_u['id'] for _u in self._users
+                          if not _u['enabled']], "Wrong disabled users")
+
+        _expiring = self._table.expiring_before(datetime(2021, 3, 1))
+        self.assertEqual(_expiring.column('id'),
+                         [_u['id'] for _u in self._users
+                          if _u['date_password'] < '2021-03'],
+                         "Wrong expiring users")
+        self.assertEqual(_expiring.row(0), self._table.row(0),
+                         "Row changed by the filter")
+
+        _selected = self._table.select(
+            _e.endswith('7@example.com')
+            for _e in self._table.column('email'))
+        self.assertEqual(len(_selected), 10, "Wrong selection")
+        self.assertEqual(len(self._table[10:20]), 10, "Wrong slice")
+
+    def test_missing_date(self):
+        """
+        """
+        _table = UserTable([{'email': 'a@example.com'}])
+        self.assertTrue(math.isnan(_table.column('date_password')[0]))
+        self.assertIsNone(_table.row(0)['date_password'])
+        self.assertEqual(len(_table.expiring_before(datetime.now())), 0,
+                         "User without date expiring")
+
+
+if __name__ == '__main__':
+    unittest.main()
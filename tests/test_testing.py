@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+#
+#  Copyright 2021 CRS4 - Center for Advanced Studies, Research and Development
+#  in Sardinia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+This module tests the fake Keyrock of keyrock.testing.
+"""
+
+import time
+import unittest
+
+import requests
+
+from keyrock import IDMManager, get_auth_token
+from keyrock.testing import FakeKeyrock
+
+
+class TestFakeKeyrock(unittest.TestCase):
+    """
+    Tests the seeding, latency and error injection of the fake Keyrock.
+    """
+    def setUp(self):
+        self.fake = FakeKeyrock().start()
+        self.keyrock_host = self.fake.host
+        self.keyrock_port = self.fake.port
+        self.keyrock_admin = "admin@test.com"
+        self.keyrock_passw = "1234"
+
+        self.auth_token, _ = get_auth_token(
+            self.keyrock_host, self.keyrock_port, self.keyrock_admin,
+            self.keyrock_passw)
+        self.idm = IDMManager(
+            self.keyrock_host, self.keyrock_port, self.auth_token)
+
+    def tearDown(self):
+        self.idm.close()
+        self.fake.stop()
+
+    def test_seed(self):
+        """
+        """
+        _seeded = self.fake.seed(users=100, applications=2, roles=3,
+                                 permissions=4)
+        self.assertEqual(len(self.idm.list_users()), 101,
+                         "Wrong number of users")
+
+        _app_id = _seeded['applications'][0]
+        # default roles and permissions included
+        self.assertEqual(len(self.idm.list_roles(_app_id)), 5,
+                         "Wrong number of roles")
+        self.assertEqual(len(self.idm.list_permissions(_app_id)), 10,
+                         "Wrong number of permissions")
+
+    def test_latency(self):
+        """
+        """
+        self.fake.latency = 0.05
+        _start = time.perf_counter()
+        self.idm.list_users()
+        self.assertGreaterEqual(time.perf_counter() - _start, 0.05,
+                                "Latency not applied")
+
+    def test_inject_error(self):
+        """
+        """
+        self.fake.inject_error(503, method='GET', path='^/v1/users$',
+                               headers={'Retry-After': '1'})
+        with self.assertRaises(requests.HTTPError) as _ctx:
+            list(self.idm.iter_users())
+        self.assertEqual(_ctx.exception.response.status_code, 503,
+                         "Wrong status code")
+        self.assertEqual(_ctx.exception.response.headers['Retry-After'],
+                         '1', "Injected header missing")
+
+        # the error is injected once
+        self.assertEqual(len(self.idm.list_users()), 1, "Error not expired")
+
+    def test_drop_connection(self):
+        """
+        """
+        self.fake.inject_error(0, path='^/v1/users$')
+        with self.assertRaises(requests.ConnectionError):
+            self.idm.list_users()
+
+    def test_request_counters(self):
+        """
+        """
+        self.fake.reset_stats()
+        self.idm.list_users()
+        self.idm.get_user('admin')
+        self.assertEqual(self.fake.requests, {
+            'GET /v1/users': 1,
+            'GET /v1/users/{user}': 1}, "Wrong request counters")
+        self.assertEqual(self.fake.request_count, 2, "Wrong request count")
+
+    def test_invalid_token(self):
+        """
+        """
+        _im = IDMManager(self.keyrock_host, self.keyrock_port, 'invalid')
+        with self.assertRaises(requests.HTTPError) as _ctx:
+            list(_im.iter_users())
+        self.assertEqual(_ctx.exception.response.status_code, 401,
+                         "Wrong status code")
+        _im.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
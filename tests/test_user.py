@@ -26,7 +26,8 @@ import unittest
 
 from utils import random_user_name, random_user_email, random_user_password
 
-from keyrock import IDMManager, IDMQuery, get_auth_token
+from keyrock import IDMManager, IDMQuery, UserTable, get_auth_token
+from keyrock.testing import FakeKeyrock
 from requests.exceptions import HTTPError
 
 
@@ -93,6 +94,119 @@ class TestUser(unittest.TestCase):
         self.assertEqual(_user.description, _res.description,
                          "Wrong description")
 
+    def test_23_get_user_by_login_indexed(self):
+        """
+        """
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, indexes=True) as _im:
+            _user_email = random_user_email()
+            _user = _im.create_user(_user_email, random_user_password(),
+                                    random_user_name())
+
+            _res = _im.get_user(_user_email, IDMQuery.BY_LOGIN)
+            self.assertEqual(_user.id, _res.id, "Wrong id")
+            _res = _im.get_user(_user_email, IDMQuery.BY_LOGIN)
+            self.assertEqual(_user.id, _res.id, "Wrong id")
+
+            _stats = _im.index_stats['users_by_login']
+            self.assertEqual(_stats['rebuilds'], 1,
+                             "Index rebuilt more than once")
+            self.assertEqual(_stats['hits'], 2, "Wrong number of hits")
+
+            # the index is patched by the same manager
+            _new_email = random_user_email()
+            _new_user = _im.create_user(_new_email, random_user_password())
+            _res = _im.get_user(_new_email, IDMQuery.BY_LOGIN)
+            self.assertEqual(_new_user.id, _res.id, "Index not updated")
+
+            _im.delete_user(_new_user.id)
+            _res = _im.get_user(_new_email, IDMQuery.BY_LOGIN)
+            self.assertEqual(_res, None, "Deleted user still indexed")
+            self.assertEqual(_im.index_stats['users_by_login']['misses'], 1,
+                             "Wrong number of misses")
+            self.assertEqual(_im.index_stats['users_by_login']['rebuilds'], 1,
+                             "Index rebuilt more than once")
+
+    def test_23_user_index_error(self):
+        """
+        """
+        _fake = FakeKeyrock().start()
+        try:
+            _token, _ = get_auth_token(_fake.host, _fake.port,
+                                       self.keyrock_admin, self.keyrock_passw)
+            with IDMManager(_fake.host, _fake.port, _token,
+                            indexes=True) as _im:
+                _fake.inject_error(500, method='GET', path='^/v1/users$')
+                with self.assertRaises(
+                        HTTPError, msg="Not raising error on failed index"):
+                    _im.get_user(self.keyrock_admin, IDMQuery.BY_LOGIN)
+
+                # the failed listing is not kept as an empty index
+                _res = _im.get_user(self.keyrock_admin, IDMQuery.BY_LOGIN)
+                self.assertNotEqual(_res, None, "Empty index built")
+                self.assertEqual(_im.index_stats['users_by_login']['rebuilds'],
+                                 1, "Wrong number of rebuilds")
+        finally:
+            _fake.stop()
+
+    def test_24_iter_users(self):
+        """
+        """
+        _user_email = random_user_email()
+        _user = self._im.create_user(_user_email, random_user_password(),
+                                     random_user_name())
+
+        _listed = [_u.id for _u in self._im.list_users()]
+        _iterated = [_u.id for _u in self._im.iter_users()]
+        self.assertEqual(_listed, _iterated, "Different users iterated")
+        self.assertIn(_user.id, _iterated, "User not iterated")
+
+    def test_25_list_users_without_dicts(self):
+        """
+        """
+        _user = self._im.create_user(random_user_email(),
+                                     random_user_password(),
+                                     random_user_name())
+        with IDMManager(self.keyrock_host, self.keyrock_port,
+                        self.auth_token, keep_dicts=False) as _im:
+            _found = [_u for _u in _im.list_users() if _u.id == _user.id]
+            self.assertEqual(len(_found), 1, "User not listed")
+            self.assertFalse(hasattr(_found[0], '__dict__'),
+                             "Model with a per-instance dictionary")
+            self.assertEqual(_found[0].dict['email'], _user.email,
+                             "Wrong rebuilt dictionary")
+
+    def test_26_list_users_as_table(self):
+        """
+        """
+        _user = self._im.create_user(random_user_email(),
+                                     random_user_password(),
+                                     random_user_name())
+        _table = self._im.list_users(as_table=True)
+        self.assertEqual(len(_table), len(self._im.list_users()),
+                         "Wrong number of users")
+        _ids = _table.column('id')
+        self.assertIn(_user.id, _ids, "User not listed")
+        self.assertEqual(_table[_ids.index(_user.id)].email, _user.email,
+                         "Wrong user row")
+
+    def test_27_list_users_error(self):
+        """
+        """
+        _fake = FakeKeyrock().start()
+        try:
+            _token, _ = get_auth_token(_fake.host, _fake.port,
+                                       self.keyrock_admin, self.keyrock_passw)
+            with IDMManager(_fake.host, _fake.port, _token) as _im:
+                _fake.inject_error(500, method='GET', path='^/v1/users$',
+                                   count=2)
+                self.assertEqual(_im.list_users(), [], "Users listed")
+                _table = _im.list_users(as_table=True)
+                self.assertIsInstance(_table, UserTable, "Wrong table")
+                self.assertEqual(len(_table), 0, "Users listed")
+        finally:
+            _fake.stop()
+
     def test_22_get_not_existing_user(self):
         _res = self._im.get_application(uuid.uuid4())
         self.assertEqual(_res, None,